@@ -0,0 +1,227 @@
+# ================================================================================
+#   Keyframe animation
+#
+#   A clip is a list of timed target angles. When a clip is loaded every
+#   joint's rotation at every keyframe is turned into a quaternion, the
+#   in-betweens are sampled with slerp at the clip's frame rate and the result
+#   is stored as contiguous (frames, 16) flexion/abduction arrays. Playback is
+#   then only an array index per timer tick.
+#
+#   clip file (JSON), angles keyed by hand_kinematics.DOF_NAMES, in degrees:
+#   {"fps": 60, "loop": false,
+#    "keyframes": [{"time": 0.0, "pose": {}},
+#                  {"time": 1.5, "pose": {"ring_jnt1": -80, "index_jnt1_spread": 10}}]}
+#   A keyframe only lists the angles it changes; the others keep their value
+#   from the keyframe before (0 for the first one).
+# ================================================================================
+
+import json
+import time
+
+import numpy as np
+
+import hand_kinematics
+
+
+# ---- quaternions, (..., 4) arrays in (w, x, y, z) order ---------------------------
+
+def _axis_quaternions(angle, axis):
+    half = np.radians(angle) / 2
+    q = np.zeros(np.shape(angle) + (4,))
+    q[..., 0] = np.cos(half)
+    q[..., axis] = np.sin(half)
+    return q
+
+
+def _multiply(a, b):
+    w1, x1, y1, z1 = np.moveaxis(a, -1, 0)
+    w2, x2, y2, z2 = np.moveaxis(b, -1, 0)
+    return np.stack([w1 * w2 - x1 * x2 - y1 * y2 - z1 * z2,
+                     w1 * x2 + x1 * w2 + y1 * z2 - z1 * y2,
+                     w1 * y2 - x1 * z2 + y1 * w2 + z1 * x2,
+                     w1 * z2 + x1 * y2 - y1 * x2 + z1 * w2], axis=-1)
+
+
+def slerp(q0, q1, t):
+    # spherical interpolation of unit quaternions, broadcast over leading axes
+    dot = np.sum(q0 * q1, axis=-1, keepdims=True)
+    q1 = np.where(dot < 0, -q1, q1)             # take the short way round
+    dot = np.abs(dot)
+    t = np.asarray(t)[..., None]
+
+    theta = np.arccos(np.clip(dot, -1.0, 1.0))
+    sin = np.sin(theta)
+    close = sin < 1e-6                            # nearly equal: lerp is exact enough
+    safe = np.where(close, 1.0, sin)
+    w0 = np.where(close, 1 - t, np.sin((1 - t) * theta) / safe)
+    w1 = np.where(close, t, np.sin(t * theta) / safe)
+    q = w0 * q0 + w1 * q1
+    return q / np.linalg.norm(q, axis=-1, keepdims=True)
+
+
+def joint_quaternions(flexion, abduction):
+    # rotation of every joint as Joint.update() builds it: Rz(base + abduction + c * flexion) Rx(flexion)
+    angle_z = hand_kinematics.JOINT_BASE_ANGLES + abduction + hand_kinematics.JOINT_COUPLING * flexion
+    return _multiply(_axis_quaternions(angle_z, 3), _axis_quaternions(flexion, 1))
+
+
+def joint_angles(q):
+    # back to (flexion, abduction) by splitting the rotation into Rz(a) Rx(b)
+    w, x, y, z = np.moveaxis(q, -1, 0)
+    r00 = 1 - 2 * (y * y + z * z)
+    r10 = 2 * (x * y + w * z)
+    r21 = 2 * (y * z + w * x)
+    r22 = 1 - 2 * (x * x + y * y)
+    flexion = np.degrees(np.arctan2(r21, r22))
+    angle_z = np.degrees(np.arctan2(r10, r00))
+    abduction = angle_z - hand_kinematics.JOINT_BASE_ANGLES - hand_kinematics.JOINT_COUPLING * flexion
+    abduction = (abduction + 180) % 360 - 180
+    return flexion, abduction
+
+
+# ---- clips -------------------------------------------------------------------------
+
+# joints without a spread angle (hand_kinematics.split_pose): the wrist, jnt2 and jnt3
+_FIXED_JOINTS = np.r_[0, 6:len(hand_kinematics.JOINT_NAMES)]
+
+class Clip:
+
+    def __init__(self, times, poses, fps=60, loop=False):
+        # times: (K,) increasing seconds, poses: (K, DOF) keyframe angles
+        self.times = np.asarray(times, dtype=float)
+        self.keyposes = np.asarray(poses, dtype=float)
+        self.fps = fps
+        self.loop = loop
+        if len(self.times) == 0 or np.any(np.diff(self.times) <= 0):
+            raise ValueError('keyframe times must be increasing')
+        self.precompute()
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            data = json.load(f)
+
+        times, poses = [], []
+        pose = np.zeros(hand_kinematics.DOF)
+        for key in sorted(data['keyframes'], key=lambda k: k['time']):
+            pose = pose.copy()
+            for name, angle in key.get('pose', {}).items():
+                if name not in hand_kinematics.DOF_NAMES:
+                    raise ValueError('unknown joint angle {!r} in {}'.format(name, path))
+                pose[hand_kinematics.DOF_NAMES.index(name)] = angle
+            times.append(key['time'])
+            poses.append(pose)
+        return cls(times, poses, data.get('fps', 60), data.get('loop', False))
+
+    @property
+    def duration(self):
+        return self.times[-1] - self.times[0]
+
+    def __len__(self):
+        return len(self.flexion)
+
+    def frame_at(self, seconds):
+        # index of the frame shown `seconds` after the clip started
+        return int(seconds * self.fps)
+
+    def angles(self, frame):
+        return self.flexion[frame], self.abduction[frame]
+
+    def time_of(self, frame):
+        return frame / self.fps
+
+    def precompute(self):
+        # slerp every joint between the keyframes around each frame time
+        count = int(round(self.duration * self.fps)) + 1
+        t = self.times[0] + np.arange(count) / self.fps
+
+        key_q = joint_quaternions(*hand_kinematics.split_pose(self.keyposes))     # (K, 16, 4)
+        if len(self.times) == 1:
+            q = np.repeat(key_q, count, axis=0)
+        else:
+            k = np.clip(np.searchsorted(self.times, t, side='right') - 1, 0, len(self.times) - 2)
+            u = np.clip((t - self.times[k]) / (self.times[k + 1] - self.times[k]), 0.0, 1.0)
+            q = slerp(key_q[k], key_q[k + 1], np.repeat(u[:, None], key_q.shape[1], axis=1))
+
+        flexion, abduction = joint_angles(q)
+        # slerp of two Rz Rx rotations is not exactly of that form again; only the
+        # jnt1 of every finger can spread, so the small abduction it leaves on the
+        # other joints is dropped
+        abduction[..., _FIXED_JOINTS] = 0.0
+        self.flexion = np.ascontiguousarray(flexion)
+        self.abduction = np.ascontiguousarray(abduction)
+        self.poses = hand_kinematics.join_pose(self.flexion, self.abduction)
+
+
+class AnimationPlayer:
+    # Plays a clip on a repeating interactor timer. apply(flexion, abduction) sets
+    # one frame of (16,) angles on the scene, request_render() asks for a frame.
+    # Anything with fps, loop, len(), frame_at(), time_of() and angles() plays.
+    # A clip without frames (e.g. an empty recording) loads but never plays.
+
+    def __init__(self, interactor, apply, request_render):
+        self.interactor = interactor
+        self.apply = apply
+        self.request_render = request_render
+        self.clip = None
+        self.timer_id = None
+        self.started = None
+        self.frame = -1
+        self.interactor.AddObserver('TimerEvent', self.onTimer)
+
+    @property
+    def playing(self):
+        return self.timer_id is not None
+
+    def play(self, clip=None):
+        if clip is not None:
+            self.clip = clip
+        if not self.clip or self.playing:
+            return
+        self.timer_id = self.interactor.CreateRepeatingTimer(max(1, int(1000 / self.clip.fps)))
+        # resume from the frame we stopped at
+        self.started = time.perf_counter() - self.clip.time_of(max(self.frame, 0))
+
+    def stop(self):
+        if self.playing:
+            self.interactor.DestroyTimer(self.timer_id)
+            self.timer_id = None
+
+    def seek(self, seconds):
+        # jump to `seconds` into the clip and show that frame right away
+        if not self.clip:
+            return
+        seconds = min(max(seconds, 0.0), self.clip.time_of(len(self.clip) - 1))
+        self.frame = self.clip.frame_at(seconds)
+        self.started = time.perf_counter() - seconds
+        self.apply(*self.clip.angles(self.frame))
+        self.request_render()
+
+    def position(self):
+        # seconds into the clip of the frame on screen
+        return self.clip.time_of(max(self.frame, 0)) if self.clip else 0.0
+
+    def toggle(self):
+        if self.playing:
+            self.stop()
+        else:
+            if self.clip is not None and self.frame >= len(self.clip) - 1:
+                self.frame = -1
+            self.play()
+
+    def onTimer(self, obj, event):
+        if not self.playing or self.interactor.GetTimerEventId() != self.timer_id:
+            return
+        # frame from wall time, so a slow frame skips ahead instead of slowing down
+        clip = self.clip
+        frame = clip.frame_at(time.perf_counter() - self.started)
+        if frame >= len(clip):
+            if clip.loop:
+                frame %= len(clip)
+            else:
+                frame = len(clip) - 1
+                self.stop()
+        if frame != self.frame:
+            self.frame = frame
+            self.apply(*clip.angles(frame))
+            self.request_render()
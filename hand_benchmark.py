@@ -0,0 +1,353 @@
+# ================================================================================
+#   Headless benchmark suite
+#
+#   Times the paths that decide how the hand feels, without a display:
+#
+#   scene      building the app the way main() does, and its first frame
+#   chain      evaluating the VTK transform chain vs. hand_kinematics, and the
+#              self-collision check of one key step
+#   picking    leftButtonPressEvent on joints and on empty background
+#   keys       keyPressEvent under sustained key repeat, frames drawn by the scheduler
+#   render     offscreen frame time at several window sizes
+#   object     distance field of a 1M triangle object, and the contacts per frame
+#
+#   Every metric is a median in milliseconds (lower is better). Results are
+#   written as JSON; against a stored baseline a metric fails when it is more
+#   than its tolerance (default 25 %) slower, and the exit status is 1.
+#
+#   python hand_benchmark.py -o results.json
+#   python hand_benchmark.py --baseline benchmarks/baseline.json
+#   python hand_benchmark.py --save-baseline benchmarks/baseline.json
+# ================================================================================
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+import numpy as np
+
+import hand_kinematics
+import hand_robot_final
+
+SIZES = ((320, 240), (640, 480), (1280, 720), (1920, 1080))
+
+# relative slowdown a metric may show before it counts as a regression
+TOLERANCE = 0.25
+
+# absolute slack in ms, so sub-millisecond metrics do not fail on timer noise
+SLACK_MS = 0.05
+
+
+def _median_ms(samples):
+    return statistics.median(samples) * 1000
+
+
+def _quiet():
+    # the handlers print every click and key press
+    return contextlib.redirect_stdout(io.StringIO())
+
+
+def _app(size=(640, 480)):
+    # the interactive app as main() builds it, offscreen and with a generic interactor
+    args = hand_robot_final.make_parser().parse_args([])
+    with _quiet():
+        renwin, interactor, style = hand_robot_final.build_app(args, offscreen=True)
+    renwin.SetSize(*size)
+    renwin.Render()
+    return renwin, interactor, style
+
+
+def _random_poses(count, seed=0):
+    # in-limit poses for the default hand
+    return np.random.default_rng(seed).uniform(-28, 10, (count, hand_kinematics.DOF))
+
+
+def bench_scene(repeat):
+    build, first = [], []
+    args = hand_robot_final.make_parser().parse_args([])
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        with _quiet():
+            renwin, interactor, style = hand_robot_final.build_app(args, offscreen=True)
+        t1 = time.perf_counter()
+        renwin.Render()
+        t2 = time.perf_counter()
+        build.append(t1 - t0)
+        first.append(t2 - t1)
+        renwin.Finalize()
+    return {'build_ms': _median_ms(build), 'first_render_ms': _median_ms(first)}
+
+
+def bench_chain(repeat):
+    # per pose: set the joints and read back all 16 world matrices from the VTK chain,
+    # vs. the same matrices from hand_kinematics (per 1000 poses of a 10000 batch)
+    renwin, interactor, style = _app()
+    hand = style.Hand
+    poses = _random_poses(200)
+    transforms = [hand.joints[name].transform for name in hand_kinematics.JOINT_NAMES]
+
+    vtk_times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for pose in poses:
+            hand.set_pose(pose)
+            for transform in transforms:
+                transform.GetMatrix()
+        vtk_times.append((time.perf_counter() - t0) / len(poses))
+
+    batch = _random_poses(10000, seed=1)
+    numpy_times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        hand_kinematics.joint_transforms(*hand_kinematics.split_pose(batch))
+        numpy_times.append((time.perf_counter() - t0) / len(batch) * 1000)
+
+    # a 2 degree key step of every pose angle in turn, the check Hand.rotate() runs
+    collisions = hand.collisions
+    start = np.zeros(hand_kinematics.DOF)
+    steps = start - 2 * np.identity(hand_kinematics.DOF)
+    collision_times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for end in steps:
+            collisions.fraction(start, end)
+        collision_times.append((time.perf_counter() - t0) / len(steps))
+    renwin.Finalize()
+    return {'vtk_pose_ms': _median_ms(vtk_times), 'numpy_1000_poses_ms': _median_ms(numpy_times),
+            'collision_step_ms': _median_ms(collision_times)}
+
+
+def _display_points(renderer, points):
+    # world points -> display coordinates (pixels)
+    out = []
+    for point in points:
+        renderer.SetWorldPoint(*point, 1.0)
+        renderer.WorldToDisplay()
+        x, y, _ = renderer.GetDisplayPoint()
+        out.append((int(round(x)), int(round(y))))
+    return out
+
+
+def _click(interactor, x, y):
+    # seconds spent in the press handler; the release (the trackball's end-of-rotate
+    # render) is not counted
+    interactor.SetEventPosition(x, y)
+    t0 = time.perf_counter()
+    interactor.InvokeEvent('LeftButtonPressEvent')
+    spent = time.perf_counter() - t0
+    interactor.InvokeEvent('LeftButtonReleaseEvent')
+    return spent
+
+
+def bench_picking(repeat):
+    renwin, interactor, style = _app()
+    renderer = style.GetDefaultRenderer()
+    targets = _display_points(renderer, hand_kinematics.rest_positions())
+
+    hits, misses = [], []
+    with _quiet():
+        for _ in range(repeat):
+            hits.append(sum(_click(interactor, x, y) for x, y in targets) / len(targets))
+            misses.append(sum(_click(interactor, 2, 2) for _ in targets) / len(targets))
+    renwin.Finalize()
+    return {'hit_ms': _median_ms(hits), 'miss_ms': _median_ms(misses)}
+
+
+def bench_keys(repeat, presses=90, repeat_rate=30.0, fps=60.0):
+    # a joint held under key auto-repeat: the handler per press, and the wall time of
+    # presses plus the frames the scheduler draws at its tick rate (one tick per 1/fps
+    # of simulated time)
+    renwin, interactor, style = _app()
+    scheduler = style.Scheduler
+    renderer = style.GetDefaultRenderer()
+    x, y = _display_points(renderer, [hand_kinematics.rest_positions()[2]])[0]    # index_jnt2
+    with _quiet():
+        _click(interactor, x, y)
+    if style.LastPickedActor is None:
+        raise RuntimeError('no joint under the test click')
+
+    handler, total = [], []
+    ticks_per_press = fps / repeat_rate
+    with _quiet():
+        for _ in range(repeat):
+            spent = 0.0
+            t_start = time.perf_counter()
+            ticks = 0.0
+            for i in range(presses):
+                interactor.SetKeySym('Up' if (i // 45) % 2 == 0 else 'Down')
+                t0 = time.perf_counter()
+                interactor.InvokeEvent('KeyPressEvent')
+                spent += time.perf_counter() - t0
+                ticks += ticks_per_press
+                while ticks >= 1.0:
+                    ticks -= 1.0
+                    if scheduler.dirty:
+                        scheduler.render_now()
+            handler.append(spent / presses)
+            total.append((time.perf_counter() - t_start) / presses)
+    p50, p95, worst = scheduler.latency_stats()
+    renwin.Finalize()
+    return {'handler_ms': _median_ms(handler), 'press_with_frames_ms': _median_ms(total),
+            'latency_p95_ms': p95}
+
+
+def bench_render(repeat, frames=20):
+    renwin, interactor, style = _app()
+    hand = style.Hand
+    poses = _random_poses(frames)
+    results = {}
+    for width, height in SIZES:
+        renwin.SetSize(width, height)
+        renwin.Render()
+        times = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            for pose in poses:
+                hand.set_pose(pose)
+                renwin.Render()
+            times.append((time.perf_counter() - t0) / frames)
+        results['frame_{}x{}_ms'.format(width, height)] = _median_ms(times)
+    renwin.Finalize()
+    return results
+
+
+def bench_object(repeat, frames=100):
+    # the field is built once (it takes seconds); the contact query runs per frame
+    from vtkmodules.vtkFiltersSources import vtkSphereSource
+    from hand_object import DistanceField, ObjectContacts
+
+    sphere = vtkSphereSource()
+    sphere.SetCenter(0.0, 12.0, -7.0)
+    sphere.SetRadius(5.0)
+    sphere.SetThetaResolution(1000)
+    sphere.SetPhiResolution(500)
+    sphere.Update()
+    t0 = time.perf_counter()
+    contacts = ObjectContacts(DistanceField(sphere.GetOutput()))
+    build = time.perf_counter() - t0
+
+    poses = _random_poses(frames)
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for pose in poses:
+            contacts.depth(pose)
+        times.append((time.perf_counter() - t0) / frames)
+    return {'field_1m_triangles_ms': build * 1000, 'contacts_ms': _median_ms(times)}
+
+
+BENCHMARKS = {
+    'scene': bench_scene,
+    'chain': bench_chain,
+    'picking': bench_picking,
+    'keys': bench_keys,
+    'render': bench_render,
+    'object': bench_object,
+}
+
+
+def machine():
+    from vtkmodules.vtkCommonCore import vtkVersion
+    return {
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'vtk': vtkVersion.GetVTKVersion(),
+        'numpy': np.__version__,
+        'cpus': os.cpu_count(),
+    }
+
+
+def run(names, repeat, log=print):
+    # {benchmark: {metric: ms}}
+    results = {}
+    for name in names:
+        t0 = time.perf_counter()
+        results[name] = {metric: round(value, 4) for metric, value in BENCHMARKS[name](repeat).items()}
+        log('{:8s} {}  ({:.1f} s)'.format(name, ', '.join(
+            '{} {:.3f}'.format(metric, value) for metric, value in results[name].items()),
+            time.perf_counter() - t0))
+    return results
+
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    # (rows, regressions); a baseline metric may carry its own tolerance:
+    # {"value": 1.2, "tolerance": 0.5} instead of a plain number
+    rows, regressions = [], []
+    for name, metrics in results.items():
+        for metric, value in metrics.items():
+            reference = baseline.get('results', {}).get(name, {}).get(metric)
+            if reference is None:
+                rows.append((name, metric, value, None, None, 'new'))
+                continue
+            allowed = tolerance
+            if isinstance(reference, dict):
+                allowed = reference.get('tolerance', tolerance)
+                reference = reference['value']
+            limit = reference * (1 + allowed) + SLACK_MS
+            status = 'FAIL' if value > limit else 'ok'
+            rows.append((name, metric, value, reference, limit, status))
+            if status == 'FAIL':
+                regressions.append('{}.{}: {:.3f} ms > {:.3f} ms (baseline {:.3f} ms + {:.0f} %)'.format(
+                    name, metric, value, limit, reference, allowed * 100))
+    return rows, regressions
+
+
+def format_rows(rows):
+    lines = ['{:28s} {:>10s} {:>10s} {:>10s}  {}'.format('metric', 'ms', 'baseline', 'limit', '')]
+    for name, metric, value, reference, limit, status in rows:
+        lines.append('{:28s} {:10.3f} {:>10s} {:>10s}  {}'.format(
+            name + '.' + metric, value,
+            '-' if reference is None else '{:.3f}'.format(reference),
+            '-' if limit is None else '{:.3f}'.format(limit), status))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Headless benchmarks of the hand app.')
+    parser.add_argument('names', nargs='*', metavar='NAME',
+                        help='benchmarks to run ({}; default all)'.format(', '.join(BENCHMARKS)))
+    parser.add_argument('-o', '--output', help='write the results as JSON')
+    parser.add_argument('--baseline', help='JSON results to compare against; regressions exit with status 1')
+    parser.add_argument('--save-baseline', metavar='PATH', help='write the results as a new baseline')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE,
+                        help='allowed slowdown vs. the baseline, as a fraction (default %(default)s)')
+    parser.add_argument('--repeat', type=int, default=5, help='runs per benchmark, the median is kept')
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error('unknown benchmark(s) {}'.format(', '.join(unknown)))
+
+    names = args.names or list(BENCHMARKS)
+    report = {'machine': machine(), 'repeat': args.repeat, 'results': run(names, args.repeat)}
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w') as f:
+                json.dump(report, f, indent=2)
+                f.write('\n')
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get('machine') != report['machine']:
+            print('note: the baseline was measured on another machine or software versions')
+        rows, regressions = compare(report['results'], baseline, args.tolerance)
+        print(format_rows(rows))
+        if regressions:
+            print('{} regression(s):'.format(len(regressions)))
+            for line in regressions:
+                print('  ' + line)
+            sys.exit(1)
+        print('no regressions')
+
+
+if __name__ == '__main__':
+    main()
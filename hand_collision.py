@@ -0,0 +1,154 @@
+# ================================================================================
+#   Capsule self-collision
+#
+#   Every phalanx is a cylinder capped by the joint spheres at both ends,
+#   i.e. exactly a capsule: the segment from a joint to the next one (or to
+#   the finger tip) with the joint's radius. The carpal bars are capsules
+#   along their long axis. Capsule pairs that already touch at rest
+#   (neighbours in a chain, a knuckle on its own carpal bar) are left out;
+#   every other pair is checked with one vectorized segment-segment distance.
+#
+#   fraction() is what the arrow keys use: the largest part of a joint step
+#   (checked at a few points along it, all in one batch) that keeps every
+#   pair apart, so rotations stop at the first contact. Only pairs whose
+#   relative placement depends on a joint that moves are checked: a key on
+#   index_jnt2 looks at the pairs of two capsules, not all of them.
+# ================================================================================
+
+import itertools
+
+import numpy as np
+
+import hand_kinematics
+from hand_skeleton import FINGERS, JOINT_NAMES, NODE_NAMES
+
+
+def _dot(u, v):
+    # row-wise dot product of (..., 3) arrays
+    return (u[..., None, :] @ v[..., :, None])[..., 0, 0]
+
+
+def _unit(x):
+    return np.minimum(np.maximum(x, 0.0), 1.0)
+
+
+def segment_distance(p1, q1, p2, q2):
+    # closest distance between segments p1-q1 and p2-q2, all (..., 3) (Ericson,
+    # Real-Time Collision Detection 5.1.9, without branches); segments have length > 0
+    d1, d2, r = q1 - p1, q2 - p2, p1 - p2
+    a, e, b = _dot(d1, d1), _dot(d2, d2), _dot(d1, d2)
+    c, f = _dot(d1, r), _dot(d2, r)
+    # parallel segments (denominator 0) start from s = 0
+    s = _unit((b * f - c * e) / np.maximum(a * e - b * b, 1e-12))
+    t = (b * s + f) / e
+    s = np.where(t < 0.0, _unit(-c / a), np.where(t > 1.0, _unit((b - c) / a), s))
+    t = _unit(t)
+    closest = r + d1 * s[..., None] - d2 * t[..., None]
+    return np.sqrt(_dot(closest, closest))
+
+
+class Capsules:
+    # the phalanges and carpal bars as capsules, in rest coordinates; owner is the
+    # index into JOINT_NAMES of the joint that moves each one
+
+    def __init__(self, skeleton=None):
+        skeleton = skeleton or hand_kinematics.SKELETON
+        self.skeleton = skeleton
+
+        owner, start, end, radius, names = [], [], [], [], []
+        rest = skeleton.rest
+        for finger in FINGERS:
+            nodes = ['{}_jnt{}'.format(finger, k) for k in (1, 2, 3)] + [finger + '_tip']
+            for k in range(3):
+                joint = skeleton.joint(nodes[k])
+                owner.append(JOINT_NAMES.index(nodes[k]))
+                start.append(rest[NODE_NAMES.index(nodes[k])])
+                end.append(rest[NODE_NAMES.index(nodes[k + 1])])
+                radius.append(joint['radius'])
+                names.append(joint['bone_name'])
+        for i, bar in enumerate(skeleton.carpals):
+            # the bar's long axis, shortened by the capsule radius at both ends
+            x, y, z = bar['size']
+            r = min(x, z) / 2
+            M = skeleton.part_matrix({'position': (0.0, 0.0, 0.0), 'pivot': bar['pivot'], 'angle': bar['angle']})
+            owner.append(0)
+            start.append(M[:3, :3] @ (0.0, -y / 2 + r, 0.0) + M[:3, 3])
+            end.append(M[:3, :3] @ (0.0, y / 2 - r, 0.0) + M[:3, 3])
+            radius.append(r)
+            names.append('carpal{}'.format(i))
+
+        self.owner = np.array(owner)
+        self.start = np.array(start)
+        self.end = np.array(end)
+        self.radius = np.array(radius)
+        self.names = names
+
+    def segments(self, poses):
+        # (..., DOF) poses -> posed axis end points, each (..., capsules, 3)
+        W = hand_kinematics.joint_transforms(*hand_kinematics.split_pose(poses), self.skeleton)
+        W = W[..., self.owner, :, :]
+        R, T = W[..., :3, :3], W[..., :3, 3]
+        return (R @ self.start[:, :, None])[..., 0] + T, (R @ self.end[:, :, None])[..., 0] + T
+
+
+class SelfCollision(Capsules):
+
+    def __init__(self, skeleton=None, margin=0.0, steps=8):
+        # margin: extra gap kept between capsules; steps: points checked along a move
+        super().__init__(skeleton)
+        skeleton = self.skeleton
+        self.steps = steps
+
+        # pairs that are apart at rest; touching ones are connected, not colliding
+        pairs = np.array(list(itertools.combinations(range(len(self.owner)), 2)))
+        gap = segment_distance(self.start[pairs[:, 0]], self.end[pairs[:, 0]],
+                               self.start[pairs[:, 1]], self.end[pairs[:, 1]]) \
+            - self.radius[pairs[:, 0]] - self.radius[pairs[:, 1]]
+        self.pairs = pairs[gap > margin]
+        self.reach = self.radius[self.pairs[:, 0]] + self.radius[self.pairs[:, 1]] + margin
+
+        # joints between the two capsules of a pair in the joint tree: the ones that
+        # are an ancestor (or owner) of exactly one of them move them relative to each other
+        chains = np.zeros((len(JOINT_NAMES), len(JOINT_NAMES)), dtype=bool)
+        for index, joint in enumerate(skeleton.joints):
+            name = joint['name']
+            while name is not None:
+                chains[index, JOINT_NAMES.index(name)] = True
+                name = skeleton.joint(name)['parent']
+        self.between = chains[self.owner[self.pairs[:, 0]]] ^ chains[self.owner[self.pairs[:, 1]]]
+        # the same per pose angle (DOF_NAMES), so a step needs no split_pose() to find its pairs
+        dof_joint = hand_kinematics.join_pose(np.arange(len(JOINT_NAMES)), np.arange(len(JOINT_NAMES)))
+        self.moves = self.between[:, dof_joint.astype(int)]
+
+    def clearance(self, poses, pairs=None):
+        # (..., DOF) poses -> (..., pairs) gap between the capsule surfaces (negative:
+        # overlap); pairs: indices into self.pairs to check, default all
+        return self.segment_clearance(*self.segments(poses), pairs)
+
+    def segment_clearance(self, start, end, pairs=None):
+        # clearance() of already posed capsules, from segments()
+        pairs = slice(None) if pairs is None else pairs
+        i, j = self.pairs[pairs, 0], self.pairs[pairs, 1]
+        return segment_distance(start[..., i, :], end[..., i, :], start[..., j, :], end[..., j, :]) \
+            - self.reach[pairs]
+
+    def fraction(self, start, end):
+        # largest t in [0, 1] so that start + t (end - start) is reached without a new
+        # contact; pairs that already overlap at start may not get any deeper
+        start = np.asarray(start, dtype=float)
+        end = np.asarray(end, dtype=float)
+        pairs = np.flatnonzero(self.moves[:, start != end].any(axis=1))
+        if not pairs.size:
+            return 1.0
+        t = np.arange(1, self.steps + 1) / self.steps
+        gaps = self.clearance(np.vstack([start, start + t[:, None] * (end - start)]), pairs)
+        floor = np.minimum(gaps[0], 0.0) - 1e-9
+        blocked = np.flatnonzero((gaps[1:] < floor).any(axis=-1))
+        if not blocked.size:
+            return 1.0
+        return t[blocked[0] - 1] if blocked[0] else 0.0
+
+    def contacts(self, pose):
+        # names of the capsule pairs that touch at pose
+        gaps = self.clearance(pose)
+        return [(self.names[i], self.names[j]) for (i, j), gap in zip(self.pairs, gaps) if gap < 0]
@@ -0,0 +1,383 @@
+# ================================================================================
+#   Local control server for streaming joint commands
+#
+#   An asyncio server on its own thread accepts JSON lines over localhost TCP
+#   while the VTK loop keeps the main thread. Commands never queue up: each
+#   one is merged into a single pending slot (the latest pose wins), and an
+#   interactor timer takes the slot at most once per tick, poses the hand and
+#   asks the scheduler for a frame. A client sending faster than frames are
+#   drawn only replaces what the next frame shows; one that does not read its
+#   replies stops being read (TCP backpressure) instead of growing buffers.
+#
+#   -> {"id": 1, "pose": [21 angles]}                 the whole pose (DOF_NAMES)
+#   -> {"id": 2, "angles": {"index_jnt2": -40}}       some angles, the rest stays
+#   -> {"id": 3, "poses": [[21 angles], ...], "fps": 120}   played at fps
+#   -> {"id": 4, "get": "pose"}
+#   <- {"id": 1, "frame": 812, "latency_ms": 9.4}    shown by frame 812
+#   <- {"id": 2, "coalesced": true}                  replaced before any frame showed it
+#   <- {"id": 4, "pose": [21 angles]}
+#   <- {"id": 5, "error": "..."}
+#
+#   "id" is optional, commands without one get no reply. Run the app with
+#   --control and measure command-to-frame latency with the bundled client:
+#
+#   python hand_robot_final.py --control
+#   python hand_control.py --count 2000 --rate 1000
+# ================================================================================
+
+import argparse
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+import hand_kinematics
+
+DEFAULT_PORT = 7450
+
+
+def _pose(value):
+    # a JSON pose -> (DOF,) array, or ValueError
+    pose = np.array(value, dtype=float)
+    if pose.shape != (hand_kinematics.DOF,) or not np.isfinite(pose).all():
+        raise ValueError('a pose is {} finite angles'.format(hand_kinematics.DOF))
+    return pose
+
+
+def _angles(value):
+    # {"dof name": degrees} -> {index into the pose: degrees}
+    angles = {}
+    for name, angle in dict(value).items():
+        if name not in hand_kinematics.DOF_NAMES:
+            raise ValueError('unknown angle {!r}'.format(name))
+        angles[hand_kinematics.DOF_NAMES.index(name)] = float(angle)
+    if not all(np.isfinite(list(angles.values()))):
+        raise ValueError('angles must be finite')
+    return angles
+
+
+class ControlServer:
+
+    def __init__(self, port=DEFAULT_PORT, host='127.0.0.1', line_limit=1 << 24, write_limit=1 << 20):
+        # line_limit: longest command (bytes, pose batches included); write_limit: replies
+        # buffered for a client that does not read them before further ones are dropped
+        self.host = host
+        self.port = port
+        self.line_limit = line_limit
+        self.write_limit = write_limit
+        self.loop = None
+        self.thread = None
+        self.stopping = None
+        self.ready = threading.Event()
+        self.error = None
+        self.connections = {}       # writer -> the task serving it
+
+        # the pending slot, written by the server thread and taken by the UI timer
+        self.lock = threading.Lock()
+        self.pose = None            # (DOF,) whole pose
+        self.angles = {}            # pose index -> degrees, on top of self.pose or the pose on screen
+        self.trajectory = None      # ((n, DOF) poses, fps)
+        self.waiting = []           # (writer, id, received) of the commands in the slot
+
+        # UI side
+        self.interactor = None
+        self.timer_id = None
+        self.playing = None         # [poses, fps, started, frame] of the trajectory on screen
+        self.showing = []           # (writer, id, received) acknowledged by the next frame
+        self.current = None         # the pose last applied, for "get"
+        self.frames = 0
+
+        self.clients = 0
+        self.commands = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.unsent = 0
+        self.latencies = deque(maxlen=1000)   # seconds, command received -> frame done
+
+    # ---- server thread ----
+
+    def start(self):
+        # binds the port and serves on a daemon thread; raises OSError if it cannot bind
+        self.thread = threading.Thread(target=asyncio.run, args=(self._serve(),), name='hand-control',
+                                       daemon=True)
+        self.thread.start()
+        self.ready.wait()
+        if self.error is not None:
+            raise self.error
+        return self
+
+    def close(self):
+        if self.loop is not None and self.thread.is_alive():
+            self.loop.call_soon_threadsafe(self.stopping.set)
+            self.thread.join()
+        if self.timer_id is not None:
+            self.interactor.DestroyTimer(self.timer_id)
+            self.timer_id = None
+
+    async def _serve(self):
+        self.loop = asyncio.get_running_loop()
+        self.stopping = asyncio.Event()
+        try:
+            server = await asyncio.start_server(self._handle, self.host, self.port, limit=self.line_limit)
+        except OSError as e:
+            self.error = e
+            self.ready.set()
+            return
+        self.port = server.sockets[0].getsockname()[1]
+        self.ready.set()
+        await self.stopping.wait()
+        server.close()
+        for writer in list(self.connections):
+            writer.close()
+        # let the handlers see their end of stream before the loop goes away
+        await asyncio.gather(*self.connections.values(), return_exceptions=True)
+        await server.wait_closed()
+
+    async def _handle(self, reader, writer):
+        self.clients += 1
+        self.connections[writer] = asyncio.current_task()
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # longer than line_limit: the rest of the stream cannot be framed
+                    self.errors += 1
+                    self._send(writer, {'error': 'command longer than {} bytes'.format(self.line_limit)})
+                    break
+                if not line:
+                    break
+                if line.strip():
+                    reply = self._command(line, writer)
+                    if reply is not None:
+                        self._send(writer, reply)
+                # a client that does not read its replies is not read either
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.connections.pop(writer, None)
+            writer.close()
+
+    def _command(self, line, writer):
+        # handles one command line; returns the immediate reply, if any
+        try:
+            message = json.loads(line)
+            if not isinstance(message, dict):
+                raise ValueError('a command is a JSON object')
+        except ValueError as e:
+            self.errors += 1
+            return {'error': str(e)}
+        ident = message.get('id')
+
+        try:
+            if 'get' in message:
+                if message['get'] != 'pose':
+                    raise ValueError('only "pose" can be read')
+                return {'id': ident, 'pose': self.current}
+            if 'pose' in message:
+                pose, angles, trajectory = _pose(message['pose']), {}, None
+            elif 'angles' in message:
+                pose, angles, trajectory = None, _angles(message['angles']), None
+            elif 'poses' in message:
+                poses = np.array([_pose(p) for p in message['poses']])
+                if not len(poses):
+                    raise ValueError('no poses')
+                fps = float(message.get('fps', 60.0))
+                if not fps > 0:
+                    raise ValueError('fps must be positive')
+                pose, angles, trajectory = None, {}, (poses, fps)
+            else:
+                raise ValueError('expected "pose", "angles", "poses" or "get"')
+        except (TypeError, ValueError) as e:
+            self.errors += 1
+            return {'id': ident, 'error': str(e)} if ident is not None else None
+
+        waiting = (writer, ident, time.perf_counter()) if ident is not None else None
+        superseded = self._submit(pose, angles, trajectory, waiting)
+        self.coalesced += len(superseded)
+        for old_writer, old_ident, _ in superseded:
+            self._send(old_writer, {'id': old_ident, 'coalesced': True})
+        return None
+
+    def _submit(self, pose, angles, trajectory, waiting):
+        # merges a command into the slot; returns the waiting commands it replaces
+        superseded = []
+        with self.lock:
+            self.commands += 1
+            if pose is not None or trajectory is not None:
+                superseded, self.waiting = self.waiting, []
+                self.pose, self.angles, self.trajectory = pose, {}, trajectory
+            else:
+                if self.trajectory is not None:
+                    # angles on top of a trajectory no frame has started: its end pose
+                    self.pose, self.trajectory = self.trajectory[0][-1].copy(), None
+                self.angles.update(angles)
+            if waiting is not None:
+                self.waiting.append(waiting)
+        return superseded
+
+    def _send(self, writer, message):
+        # queues one reply line; replies beyond write_limit are dropped, not buffered
+        if writer.is_closing():
+            return
+        if writer.transport.get_write_buffer_size() > self.write_limit:
+            self.unsent += 1
+            return
+        writer.write((json.dumps(message) + '\n').encode())
+
+    def _acknowledge(self, acks):
+        for writer, message in acks:
+            self._send(writer, message)
+
+    # ---- UI thread ----
+
+    def attach(self, interactor, renderer, get_pose, apply, request_render, max_fps=60):
+        # get_pose() -> the (DOF,) pose on screen; apply(flexion, abduction) poses the hand
+        # (the style's applyAngles, so commands are recorded); call after Initialize()
+        self.interactor = interactor
+        self.get_pose = get_pose
+        self.apply = apply
+        self.request_render = request_render
+        self.current = get_pose().tolist()
+        interactor.AddObserver('TimerEvent', self.onTimer)
+        renderer.AddObserver('EndEvent', self.onEndRender)
+        self.timer_id = interactor.CreateRepeatingTimer(max(1, int(1000 / max_fps)))
+
+    def onTimer(self, obj, event):
+        if self.interactor.GetTimerEventId() != self.timer_id:
+            return
+        with self.lock:
+            pose, angles, trajectory, waiting = self.pose, self.angles, self.trajectory, self.waiting
+            self.pose, self.angles, self.trajectory, self.waiting = None, {}, None, []
+
+        now = time.perf_counter()
+        target = None
+        if trajectory is not None:
+            self.playing = [trajectory[0], trajectory[1], now, -1]
+        elif pose is not None or angles:
+            self.playing = None
+            target = pose if pose is not None else self.get_pose()
+            for index, angle in angles.items():
+                target[index] = angle
+
+        if self.playing is not None:
+            # frame from wall time, like AnimationPlayer
+            poses, fps, started, shown = self.playing
+            frame = min(int((now - started) * fps), len(poses) - 1)
+            if frame != shown:
+                target = poses[frame]
+                self.playing[3] = frame
+            if frame == len(poses) - 1:
+                self.playing = None
+
+        if target is not None:
+            self.apply(*hand_kinematics.split_pose(target))
+            self.current = np.asarray(target).tolist()
+            self.showing.extend(waiting)
+            self.request_render()
+
+    def onEndRender(self, obj, event):
+        self.frames += 1
+        if not self.showing:
+            return
+        now = time.perf_counter()
+        acks = []
+        for writer, ident, received in self.showing:
+            self.latencies.append(now - received)
+            acks.append((writer, {'id': ident, 'frame': self.frames,
+                                  'latency_ms': round((now - received) * 1000, 3)}))
+        self.showing = []
+        if self.loop is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self._acknowledge, acks)
+
+    def latency_stats(self):
+        # (p50, p95, max) command-to-frame latency in milliseconds, as FrameScheduler
+        if not self.latencies:
+            return 0.0, 0.0, 0.0
+        values = sorted(self.latencies)
+        pick = lambda q: values[min(len(values) - 1, int(q * len(values)))] * 1000
+        return pick(0.5), pick(0.95), values[-1] * 1000
+
+    def summary(self):
+        p50, p95, worst = self.latency_stats()
+        return ('{} commands from {} clients ({} coalesced, {} errors), command-to-frame latency '
+                'p50 {:.1f} ms, p95 {:.1f} ms, max {:.1f} ms').format(
+                    self.commands, self.clients, self.coalesced, self.errors, p50, p95, worst)
+
+
+def wave(i, rate):
+    # a test pose: the fingers close and open once per second, one after another
+    pose = np.zeros(hand_kinematics.DOF)
+    for f in range(5):
+        curl = 0.5 - 0.5 * np.cos(2 * np.pi * (i / rate - 0.1 * f))
+        pose[1 + 4 * f:5 + 4 * f] = (-60 * curl, 0.0, -70 * curl, -50 * curl)
+    return pose
+
+
+async def run_client(host, port, count, rate, timeout=5.0):
+    # sends `count` pose commands at `rate` per second (0: as fast as the socket takes
+    # them) and waits for their replies; returns (latencies in s, coalesced, errors)
+    reader, writer = await asyncio.open_connection(host, port)
+    sent = {}
+    latencies, result = [], {'coalesced': 0, 'errors': 0}
+
+    async def receive():
+        while sent or not sending.done():
+            line = await reader.readline()
+            if not line:
+                break
+            message = json.loads(line)
+            t = sent.pop(message.get('id'), None)
+            if 'frame' in message and t is not None:
+                latencies.append(time.perf_counter() - t)
+            elif message.get('coalesced'):
+                result['coalesced'] += 1
+            elif 'error' in message:
+                result['errors'] += 1
+
+    async def send():
+        t0 = time.perf_counter()
+        for i in range(count):
+            if rate:
+                await asyncio.sleep(max(0.0, t0 + i / rate - time.perf_counter()))
+            line = json.dumps({'id': i, 'pose': [round(a, 3) for a in wave(i, rate or 1000)]})
+            sent[i] = time.perf_counter()
+            writer.write((line + '\n').encode())
+            await writer.drain()
+
+    sending = asyncio.ensure_future(send())
+    receiving = asyncio.ensure_future(receive())
+    await sending
+    try:
+        await asyncio.wait_for(receiving, timeout)
+    except asyncio.TimeoutError:
+        pass
+    writer.close()
+    return latencies, result['coalesced'], result['errors']
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Test client for hand_robot_final.py --control: streams '
+                                                 'poses and reports command-to-frame latency.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--count', type=int, default=1000, help='pose commands to send')
+    parser.add_argument('--rate', type=float, default=500, help='commands per second, 0: as fast as possible')
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    latencies, coalesced, errors = asyncio.run(run_client(args.host, args.port, args.count, args.rate))
+    seconds = time.perf_counter() - t0
+    print('{} commands in {:.1f} s: {} shown, {} coalesced, {} errors, {} unanswered'.format(
+        args.count, seconds, len(latencies), coalesced, errors, args.count - len(latencies) - coalesced - errors))
+    if latencies:
+        p50, p95, worst = np.percentile(latencies, [50, 95, 100]) * 1000
+        print('command-to-frame latency p50 {:.1f} ms, p95 {:.1f} ms, max {:.1f} ms'.format(p50, p95, worst))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,260 @@
+# ================================================================================
+#   Instanced crowds of hands
+#
+#   Hundreds of hands in one scene without hundreds x 41 actors: every distinct
+#   part mesh (per color) is drawn by one vtkGlyph3DMapper, which the OpenGL
+#   backend renders with instanced draw calls. Each hand contributes one
+#   instance per part; the instance positions and orientations (quaternions)
+#   come from the batched joint matrices of hand_kinematics and are written in
+#   place into the arrays the mappers read, once per frame.
+#
+#   Crowd windows render without multisampling by default: with software
+#   OpenGL the 8x MSAA of a default vtkRenderWindow costs more than the hands.
+#
+#   python hand_crowd.py --hands 500                   interactive, animated
+#   python hand_crowd.py --hands 500 --frames 200      offscreen frame time
+# ================================================================================
+
+import argparse
+import math
+import time
+
+import numpy as np
+from vtkmodules.util import numpy_support
+from vtkmodules.vtkCommonCore import vtkPoints
+from vtkmodules.vtkCommonDataModel import vtkPolyData
+from vtkmodules.vtkRenderingCore import vtkActor, vtkGlyph3DMapper
+
+import hand_kinematics
+from hand_geometry import GeometryCache
+from hand_lod import INTERACTION_BIAS, TIERS, LevelOfDetail
+
+# the hand_lod tiers plus one for parts under a pixel: the coarsest meshes that still have
+# volume, about half the triangles of the last hand_lod tier (a crowd seen whole is all there)
+RESOLUTIONS = TIERS['sphere'] + (3,)
+
+
+def _quaternions(R):
+    # rotation matrices (..., 3, 3) -> unit quaternions (..., 4) as w, x, y, z
+    q = np.empty(R.shape[:-2] + (4,))
+    m00, m11, m22 = R[..., 0, 0], R[..., 1, 1], R[..., 2, 2]
+    q[..., 0] = np.sqrt(np.maximum(0.0, 1 + m00 + m11 + m22)) / 2
+    q[..., 1] = np.copysign(np.sqrt(np.maximum(0.0, 1 + m00 - m11 - m22)) / 2, R[..., 2, 1] - R[..., 1, 2])
+    q[..., 2] = np.copysign(np.sqrt(np.maximum(0.0, 1 - m00 + m11 - m22)) / 2, R[..., 0, 2] - R[..., 2, 0])
+    q[..., 3] = np.copysign(np.sqrt(np.maximum(0.0, 1 - m00 - m11 + m22)) / 2, R[..., 1, 0] - R[..., 0, 1])
+    return q
+
+
+class HandCrowd:
+
+    def __init__(self, renderer, count, skeleton=None, resolution=8, spacing=(20.0, 40.0), columns=None):
+        # count hands on a grid in the XY plane; resolution overrides the spec's
+        # sphere/cylinder tessellation (see set_resolution and CrowdDetail)
+        from hand_robot_final import colors
+
+        self.count = count
+        self.skeleton = skeleton or hand_kinematics.SKELETON
+        self.geometry = GeometryCache()
+        columns = columns or int(math.ceil(math.sqrt(count)))
+        cells = np.arange(count)
+        self.offsets = np.zeros((count, 3))
+        self.offsets[:, 0] = (cells % columns) * spacing[0]
+        self.offsets[:, 1] = -(cells // columns) * spacing[1]
+
+        parts = self.skeleton.parts()
+        self.owner = np.array([part['joint'] for part in parts])
+        self.placement = np.array([self.skeleton.part_matrix(part) for part in parts])
+
+        # one glyph mapper per (mesh, color): its instances are that part of every hand
+        groups = {}
+        for i, part in enumerate(parts):
+            res = resolution if part['resolution'] else 0
+            groups.setdefault((part['kind'], part['size'], res, part['color']), []).append(i)
+
+        self.groups = []            # (part indices, point view, orientation view, points, orientations)
+        self.meshes = []            # (glyph mapper, kind, size) of the tessellated parts
+        self.actors = []
+        self.joint_actors = []      # the joint spheres, see set_resolution()
+        for (kind, size, res, color), members in groups.items():
+            instances = count * len(members)
+            points = numpy_support.numpy_to_vtk(np.zeros((instances, 3)), deep=1)
+            orientations = numpy_support.numpy_to_vtk(np.tile((1.0, 0.0, 0.0, 0.0), (instances, 1)), deep=1)
+            orientations.SetName('orientation')
+            vtk_points = vtkPoints()
+            vtk_points.SetData(points)
+            instances_data = vtkPolyData()
+            instances_data.SetPoints(vtk_points)
+            instances_data.GetPointData().AddArray(orientations)
+
+            mapper = vtkGlyph3DMapper()
+            mapper.SetInputData(instances_data)
+            mapper.SetSourceConnection(self.geometry.get(kind, size, res)[0].GetOutputPort())
+            mapper.ScalingOff()
+            mapper.ScalarVisibilityOff()
+            mapper.OrientOn()
+            mapper.SetOrientationModeToQuaternion()
+            mapper.SetOrientationArray('orientation')
+
+            if res:
+                self.meshes.append((mapper, kind, size))
+
+            actor = vtkActor()
+            actor.SetMapper(mapper)
+            actor.GetProperty().SetColor(colors.GetColor3d(self.skeleton.colors[color]))
+            renderer.AddActor(actor)
+            self.actors.append(actor)
+            if kind == 'sphere' and color == 'joint':
+                self.joint_actors.append(actor)
+            self.groups.append((np.array(members), numpy_support.vtk_to_numpy(points),
+                                numpy_support.vtk_to_numpy(orientations), points, orientations))
+
+        self.set_poses(np.zeros((count, hand_kinematics.DOF)))
+
+    def set_poses(self, poses):
+        # poses: (count, DOF) in the hand_kinematics.DOF_NAMES layout, clamped to the limits
+        flexion, abduction = self.skeleton.clamp(*hand_kinematics.split_pose(poses))
+        W = hand_kinematics.joint_transforms(flexion, abduction, self.skeleton)
+        # world matrix of every part of every hand, (count, parts, 4, 4)
+        M = W[:, self.owner] @ self.placement
+        position = M[..., :3, 3] + self.offsets[:, None, :]
+        orientation = _quaternions(M[..., :3, :3])
+        for members, point_view, orientation_view, points, orientations in self.groups:
+            point_view[:] = position[:, members].reshape(-1, 3)
+            orientation_view[:] = orientation[:, members].reshape(-1, 4)
+            points.Modified()
+            orientations.Modified()
+
+    def set_resolution(self, resolution, joints=True):
+        # swap the glyph source of every sphere and cylinder; meshes are cached per resolution.
+        # joints=False hides the joint spheres (a third of the triangles), which sit between
+        # the bones and are lost in them once a hand is only a few pixels tall
+        for mapper, kind, size in self.meshes:
+            mapper.SetSourceConnection(self.geometry.get(kind, size, resolution)[0].GetOutputPort())
+        for actor in self.joint_actors:
+            actor.SetVisibility(bool(joints))
+
+    @property
+    def instances(self):
+        return self.count * len(self.owner)
+
+
+class CrowdDetail(LevelOfDetail):
+    # Level of detail for a HandCrowd. The frame budget and interaction bias work as in
+    # hand_lod, but one tier applies to the whole crowd: the one the hand nearest to the
+    # camera needs. Tiers change the glyph source instead of the actor's mapper.
+
+    def __init__(self, crowd, renderer, frame_budget=1 / 30.0):
+        super().__init__(renderer, frame_budget)
+        self.crowd = crowd
+        self.tier = None
+        self.radius = crowd.skeleton.radius.max()
+        self.center = crowd.skeleton.rest.mean(axis=0)
+
+    def onStartRender(self, obj, event):
+        eye = np.array(self.renderer.GetActiveCamera().GetPosition())
+        distance = np.linalg.norm(self.crowd.offsets + self.center - eye, axis=1).min()
+        extra = self.bias + (INTERACTION_BIAS if self.interacting else 0)
+        pixels = self.radius * self.pixels_per_unit(distance)
+        tier = self.tier_for(pixels) + extra + (pixels < 1.0)
+        tier = min(tier, len(RESOLUTIONS) - 1)
+        if tier != self.tier:
+            self.crowd.set_resolution(RESOLUTIONS[tier], joints=tier < len(RESOLUTIONS) - 1)
+            self.tier = tier
+
+    def tier_counts(self):
+        counts = [0] * len(RESOLUTIONS)
+        counts[self.tier or 0] = self.crowd.count
+        return counts
+
+
+def wave_poses(count, seconds, seed=0):
+    # every hand opens and closes its fingers with its own phase and speed
+    rng = np.random.default_rng(seed)
+    phase = rng.uniform(0, 2 * np.pi, (count, 1))
+    speed = rng.uniform(1.0, 3.0, (count, 1))
+    curl = rng.uniform(-90, 0, (count, hand_kinematics.DOF))
+    curl[:, 0] = rng.uniform(-30, 30, count)                # wrist
+    curl[:, 2::4] = rng.uniform(-15, 15, (count, 5))        # jnt1 spread
+    return curl * (0.5 - 0.5 * np.cos(speed * seconds + phase))
+
+
+def benchmark(count, frames, resolution=None, size=(800, 600), frame_budget=1 / 30.0, multisamples=0):
+    # resolution None picks it with CrowdDetail
+    from hand_robot_final import create_window
+
+    renwin, renderer = create_window(size, offscreen=True)
+    renwin.SetMultiSamples(multisamples)
+    t0 = time.perf_counter()
+    crowd = HandCrowd(renderer, count, resolution=resolution or RESOLUTIONS[0])
+    detail = CrowdDetail(crowd, renderer, frame_budget) if resolution is None else None
+    build = time.perf_counter() - t0
+    renderer.ResetCamera()
+    renwin.Render()
+
+    update = render = 0.0
+    for frame in range(frames):
+        t0 = time.perf_counter()
+        crowd.set_poses(wave_poses(count, frame / 30.0))
+        t1 = time.perf_counter()
+        renwin.Render()
+        t2 = time.perf_counter()
+        update += t1 - t0
+        render += t2 - t1
+    print('{} hands, {} instances in {} actors, built in {:.0f} ms'.format(
+        count, crowd.instances, len(crowd.actors), build * 1000))
+    if detail:
+        print('detail tier {} (resolution {})'.format(detail.tier, RESOLUTIONS[detail.tier]))
+    print('per frame: pose update {:.2f} ms, render {:.2f} ms ({:.1f} fps)'.format(
+        update / frames * 1000, render / frames * 1000, frames / (update + render)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Many animated hands drawn with instanced glyph mappers.')
+    parser.add_argument('--hands', type=int, default=500)
+    parser.add_argument('--resolution', type=int,
+                        help='fixed sphere/cylinder tessellation (default: picked from the projected size)')
+    parser.add_argument('--frame-budget', type=float, default=33.0, metavar='MS',
+                        help='frame time the automatic level of detail aims for')
+    parser.add_argument('--multisamples', type=int, default=0,
+                        help='MSAA samples of the window (VTK default: 8, slow with software OpenGL)')
+    parser.add_argument('--frames', type=int, help='render this many frames offscreen and print the frame time')
+    parser.add_argument('--max-fps', type=float, default=30)
+    args = parser.parse_args(argv)
+
+    if args.frames:
+        benchmark(args.hands, args.frames, args.resolution, frame_budget=args.frame_budget / 1000,
+                  multisamples=args.multisamples)
+        return
+
+    from vtkmodules.vtkRenderingCore import vtkRenderWindowInteractor
+    from vtkmodules.vtkInteractionStyle import vtkInteractorStyleTrackballCamera
+    from hand_robot_final import create_window
+    from hand_scheduler import FrameScheduler
+
+    renwin, renderer = create_window((1024, 768))
+    renwin.SetMultiSamples(args.multisamples)
+    crowd = HandCrowd(renderer, args.hands, resolution=args.resolution or RESOLUTIONS[0])
+    renderer.ResetCamera()
+    interactor = vtkRenderWindowInteractor()
+    interactor.SetRenderWindow(renwin)
+    style = vtkInteractorStyleTrackballCamera()
+    interactor.SetInteractorStyle(style)
+    scheduler = FrameScheduler(interactor, args.max_fps)
+    if args.resolution is None:
+        CrowdDetail(crowd, renderer, args.frame_budget / 1000).attach(style, scheduler.request_render)
+    start = time.perf_counter()
+
+    def onTimer(obj, event):
+        crowd.set_poses(wave_poses(args.hands, time.perf_counter() - start))
+        scheduler.request_render()
+
+    interactor.Initialize()
+    scheduler.start()
+    interactor.AddObserver('TimerEvent', onTimer)
+    renwin.Render()
+    interactor.Start()
+    print(scheduler.summary())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+# ================================================================================
+#   Shared geometry cache
+#
+#   Parts with the same shape, dimensions and resolution (the twenty radius 1.5
+#   spheres, the four height-2 distal phalanges, the carpal bars, ...) share
+#   one source, one vtkPolyData and one mapper, so each distinct mesh is
+#   generated, stored and uploaded to the GPU once per scene.
+# ================================================================================
+
+from vtkmodules.vtkFiltersSources import vtkCubeSource, vtkCylinderSource, vtkSphereSource
+from vtkmodules.vtkRenderingCore import vtkPolyDataMapper
+
+
+class GeometryCache:
+
+    def __init__(self):
+        self.entries = {}           # (kind, params, resolution) -> (source, mapper)
+        self.sizes = {}             # same key -> bytes of the mesh
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+
+    def get(self, kind, params, resolution=0):
+        # kind 'sphere' params (radius,), 'cylinder' (radius, height), 'cube' (x, y, z)
+        key = (kind, tuple(float(p) for p in params), int(resolution))
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            # every hit is one mesh that did not have to be built and stored again
+            self.bytes_saved += self.sizes[key]
+            return entry
+
+        self.misses += 1
+        source = self._source(kind, params, resolution)
+        source.Update()
+        mapper = vtkPolyDataMapper()
+        mapper.SetInputConnection(source.GetOutputPort())
+        self.entries[key] = (source, mapper)
+        self.sizes[key] = source.GetOutput().GetActualMemorySize() * 1024
+        return source, mapper
+
+    def _source(self, kind, params, resolution):
+        if kind == 'sphere':
+            source = vtkSphereSource()
+            source.SetRadius(params[0])
+            source.SetPhiResolution(resolution)
+            source.SetThetaResolution(resolution)
+        elif kind == 'cylinder':
+            source = vtkCylinderSource()
+            source.SetRadius(params[0])
+            source.SetHeight(params[1])
+            source.SetResolution(resolution)
+        elif kind == 'cube':
+            source = vtkCubeSource()
+            source.SetXLength(params[0])
+            source.SetYLength(params[1])
+            source.SetZLength(params[2])
+        else:
+            raise ValueError('unknown part shape {!r}'.format(kind))
+        return source
+
+    def sphere(self, radius, resolution=20):
+        return self.get('sphere', (radius,), resolution)
+
+    def cylinder(self, radius, height, resolution=20):
+        return self.get('cylinder', (radius, height), resolution)
+
+    def cube(self, x, y, z):
+        return self.get('cube', (x, y, z))
+
+    def mapper(self, kind, params, resolution):
+        # mapper factory for hand_lod.LevelOfDetail
+        return self.get(kind, params, resolution)[1]
+
+    def summary(self):
+        return '{} meshes built, {} reused ({} hits / {} misses), {:.1f} KiB of geometry saved'.format(
+            len(self.entries), self.hits, self.hits, self.misses, self.bytes_saved / 1024)
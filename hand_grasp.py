@@ -0,0 +1,207 @@
+# ================================================================================
+#   Grasp search on a process pool
+#
+#   Finds hand poses that hold an object (hand_object): the object stays
+#   where --object-offset puts it, and the wrist and the five jnt1..3 chains
+#   are searched. A pose is scored from the same capsules the app checks:
+#
+#     touching     fingers whose distal phalanx is within `tolerance` of the
+#                  surface (the thumb counts twice: no grasp without it); the
+#                  app counts contacts the same way
+#     reach        how far the other finger tips are from touching
+#     penetration  how far capsules are inside the object, beyond tolerance
+#     collision    how far capsules of the hand overlap each other
+#
+#   score = touching - reach - weight * (penetration + collision), higher is
+#   better. Random batches are sampled the way fingers close (one curl per
+#   finger plus noise) and scored in chunks on the workers; the best are
+#   refined by local random search, again one candidate per task. The top
+#   poses are saved as .npy, ready for the app:
+#
+#   python hand_grasp.py ball.stl --object-offset 0 12 -7 -o grasps.npy
+#   python hand_robot_final.py --object ball.stl --object-offset 0 12 -7 --grasps grasps.npy
+# ================================================================================
+
+import argparse
+import multiprocessing
+import os
+import time
+
+import numpy as np
+
+import hand_kinematics
+from hand_collision import SelfCollision
+from hand_object import CONTACT_TOLERANCE, DistanceField, ObjectContacts, load_mesh
+from hand_skeleton import FINGERS, Skeleton
+
+# state of the worker process, set up once by _init_worker
+_worker = {}
+
+
+class GraspScorer:
+
+    def __init__(self, field, skeleton=None, tolerance=CONTACT_TOLERANCE, weight=10.0, chunk_size=1024):
+        # tolerance: gap or depth that still counts as touching; weight: penalty per unit
+        # of penetration and self-collision; chunk_size: poses scored at once (memory)
+        self.collisions = SelfCollision(skeleton)
+        self.contacts = ObjectContacts(field, self.collisions.skeleton)
+        self.tolerance = tolerance
+        self.weight = weight
+        self.chunk_size = chunk_size
+        self.lower, self.upper = hand_kinematics.dof_limits(self.collisions.skeleton)
+        # the distal phalanx of every finger, in FINGERS order: contacts are made with the tips
+        self.tips = np.array([self.collisions.names.index(finger + '3') for finger in FINGERS])
+        self.thumb = FINGERS.index('thumb')
+
+    def score(self, poses):
+        # (N, DOF) poses -> (score (N,), touching (N, 5) per finger, penetration (N,))
+        poses = np.asarray(poses, dtype=float)
+        results = [self._score(poses[i:i + self.chunk_size]) for i in range(0, len(poses), self.chunk_size)]
+        return tuple(np.concatenate(column) for column in zip(*results))
+
+    def _score(self, poses):
+        start, end = self.collisions.segments(poses)
+        depth = self.contacts.segment_depth(start, end)
+        overlap = np.maximum(-self.collisions.segment_clearance(start, end), 0.0).sum(axis=-1)
+
+        # the gap of each finger tip to the surface (negative: inside)
+        gap = -depth[:, self.tips]
+        touching = gap <= self.tolerance
+        reach = np.maximum(gap - self.tolerance, 0.0).sum(axis=-1)
+        penetration = np.maximum(depth - self.tolerance, 0.0).sum(axis=-1)
+        count = touching.sum(axis=-1) + touching[:, self.thumb]
+        return count - reach - self.weight * (penetration + overlap), touching, penetration
+
+    def sample(self, count, rng, noise=15.0):
+        # (count, DOF) poses: the wrist and the thumb's spread anywhere in their range, every
+        # finger closed by one random amount on all three joints, plus per-angle noise; the
+        # other spreads stay near rest, where neighbouring fingers do not overlap
+        poses = rng.uniform(self.lower, self.upper, (count, hand_kinematics.DOF))
+        curl = rng.uniform(0.0, 1.0, (count, len(FINGERS)))
+        for f, finger in enumerate(FINGERS):
+            for k in (0, 2, 3):
+                dof = 1 + 4 * f + k
+                poses[:, dof] = curl[:, f] * self.lower[dof] + rng.normal(0.0, noise, count)
+            if finger != 'thumb':
+                poses[:, 2 + 4 * f] = rng.normal(0.0, noise / 3, count)
+        return np.clip(poses, self.lower, self.upper)
+
+    def refine(self, pose, rng, iterations=30, population=64, sigma=10.0):
+        # local random search around pose: perturbations of all angles, the best one is kept;
+        # sigma (degrees) shrinks whenever an iteration finds nothing better
+        best = np.asarray(pose, dtype=float)
+        best_score = self.score(best[None])[0][0]
+        for _ in range(iterations):
+            candidates = np.clip(best + rng.normal(0.0, sigma, (population, hand_kinematics.DOF)),
+                                 self.lower, self.upper)
+            scores = self.score(candidates)[0]
+            i = np.argmax(scores)
+            if scores[i] > best_score:
+                best, best_score = candidates[i], scores[i]
+            else:
+                sigma *= 0.7
+        return best, best_score
+
+
+def _init_worker(field, hand, tolerance):
+    _worker['scorer'] = GraspScorer(field, Skeleton.load(hand) if hand else None, tolerance)
+
+
+def _sample_batch(task):
+    # scores one batch of random poses; returns (poses, scores) of its best `keep`
+    seed, count, keep = task
+    scorer = _worker['scorer']
+    poses = scorer.sample(count, np.random.default_rng(seed))
+    scores = scorer.score(poses)[0]
+    best = np.argsort(-scores)[:keep]
+    return poses[best], scores[best]
+
+
+def _refine_candidate(task):
+    pose, seed, iterations = task
+    return _worker['scorer'].refine(pose, np.random.default_rng(seed), iterations)
+
+
+def distinct(poses, scores, count, min_difference=10.0):
+    # indices of the best `count` poses, skipping any within min_difference degrees
+    # (on every angle) of a better one already taken
+    taken = []
+    for i in np.argsort(-scores):
+        if all(np.abs(poses[i] - poses[j]).max() >= min_difference for j in taken):
+            taken.append(i)
+            if len(taken) == count:
+                break
+    return np.array(taken, dtype=int)
+
+
+def search(field, samples=100000, batch_size=5000, top=10, refine_iterations=30, workers=None,
+           hand=None, tolerance=CONTACT_TOLERANCE, seed=0, log=print):
+    # (poses (top, DOF), report): sampling and refinement both spread over the pool
+    workers = workers or os.cpu_count()
+    candidates = 4 * top
+    batches = [(seed * 100003 + i, min(batch_size, samples - start), candidates)
+               for i, start in enumerate(range(0, samples, batch_size))]
+
+    # spawn like hand_render_pool: no inherited VTK or OpenGL state in the workers
+    ctx = multiprocessing.get_context('spawn')
+    report = {'samples': samples, 'workers': workers}
+    t0 = time.perf_counter()
+    with ctx.Pool(workers, initializer=_init_worker, initargs=(field, hand, tolerance)) as pool:
+        found, scores = [], []
+        for poses, batch_scores in pool.imap_unordered(_sample_batch, batches):
+            found.append(poses)
+            scores.append(batch_scores)
+        found, scores = np.concatenate(found), np.concatenate(scores)
+        best = distinct(found, scores, candidates)
+        report['sample_seconds'] = time.perf_counter() - t0
+        log('{} poses sampled in {:.1f} s, best score {:.2f}'.format(samples, report['sample_seconds'],
+                                                                     scores[best[0]]))
+
+        t1 = time.perf_counter()
+        tasks = [(found[i], seed * 100003 + len(batches) + n, refine_iterations) for n, i in enumerate(best)]
+        refined = pool.map(_refine_candidate, tasks)
+        report['refine_seconds'] = time.perf_counter() - t1
+
+    poses = np.array([pose for pose, _ in refined])
+    scores = np.array([score for _, score in refined])
+    keep = distinct(poses, scores, top)
+    log('{} candidates refined in {:.1f} s, best score {:.2f}'.format(len(refined), report['refine_seconds'],
+                                                                      scores[keep[0]]))
+    report['seconds'] = time.perf_counter() - t0
+    return poses[keep], report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Search grasp poses for an object on a process pool.')
+    parser.add_argument('mesh', help='object mesh: STL, OBJ or VTP')
+    parser.add_argument('--object-offset', type=float, nargs=3, default=(0.0, 0.0, 0.0), metavar=('X', 'Y', 'Z'),
+                        help='move the object by this much (hand coordinates), as in hand_robot_final.py')
+    parser.add_argument('--hand', help='skeleton spec (JSON) or the name of one in hands/')
+    parser.add_argument('-o', '--output', default='grasps.npy', help='the top poses, best first')
+    parser.add_argument('--samples', type=int, default=100000, help='random poses to score')
+    parser.add_argument('--batch-size', type=int, default=5000, help='poses per pool task')
+    parser.add_argument('--top', type=int, default=10, help='poses to keep')
+    parser.add_argument('--refine', type=int, default=30, help='local search iterations per candidate')
+    parser.add_argument('--tolerance', type=float, default=CONTACT_TOLERANCE,
+                        help='gap that counts as touching, pass the same --contact-tolerance to the app')
+    parser.add_argument('--workers', type=int, default=None, help='processes, default: all cores')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    field = DistanceField(load_mesh(args.mesh, args.object_offset), band=6.0)
+    print('distance field {} built in {:.1f} s'.format('x'.join(map(str, field.shape)), time.perf_counter() - t0))
+    poses, report = search(field, args.samples, args.batch_size, args.top, args.refine, args.workers,
+                           args.hand, args.tolerance, args.seed)
+
+    scorer = GraspScorer(field, Skeleton.load(args.hand) if args.hand else None, args.tolerance)
+    scores, touching, penetration = scorer.score(poses)
+    for rank, (score, fingers, depth) in enumerate(zip(scores, touching, penetration)):
+        print('  {:2d}  score {:6.2f}  penetration {:.2f}  touching: {}'.format(
+            rank, score, depth, ' '.join(f for f, touches in zip(FINGERS, fingers) if touches)))
+    np.save(args.output, poses)
+    print('{} grasps written to {} in {:.1f} s'.format(len(poses), args.output, report['seconds']))
+
+
+if __name__ == '__main__':
+    main()
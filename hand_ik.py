@@ -0,0 +1,164 @@
+# ================================================================================
+#   Inverse kinematics for fingertip targets
+#
+#   Damped least squares per finger chain: jnt1 flexion, jnt1 spread, jnt2
+#   and jnt3 flexion move the fingertip towards its target. All five fingers
+#   (and any number of hands) are solved together: one batched forward
+#   kinematics call per iteration evaluates the current tips and, for the
+#   Jacobian, the tips with each of the four angles nudged, so the thumb's
+#   coupled Z/X rotation needs no special case. Steps that would leave the
+#   joint limits are clamped, and angles pinned at a limit are dropped from
+#   the step.
+#
+#   Every solve starts from the previous solution (or the pose it is given),
+#   so a target dragged with the mouse converges in a few iterations per
+#   frame: Shift + drag a finger tip in hand_robot_final.py.
+# ================================================================================
+
+import numpy as np
+
+import hand_kinematics
+from hand_skeleton import FINGERS, NODE_NAMES
+
+TIPS = [NODE_NAMES.index(finger + '_tip') for finger in FINGERS]
+
+# a finger's four angles are consecutive in the pose vector: jnt1, spread, jnt2, jnt3
+CHAIN = 4
+
+
+def _probes(epsilon):
+    # row 0 is the pose itself, row 1 + k nudges angle k of every finger at once;
+    # the fingers are independent chains, so each tip only sees its own nudge
+    probes = np.zeros((1 + CHAIN, hand_kinematics.DOF))
+    for k in range(CHAIN):
+        probes[1 + k, 1 + k::CHAIN] = epsilon
+    return probes
+
+
+class FingerIK:
+
+    def __init__(self, skeleton=None, damping=0.5, iterations=10, tolerance=1e-3, max_step=45.0,
+                 epsilon=1e-3):
+        # damping in world units; tolerance: tip distance that counts as reached;
+        # max_step: largest change of any angle per iteration, degrees
+        self.skeleton = skeleton
+        self.damping = damping
+        self.iterations = iterations
+        self.tolerance = tolerance
+        self.max_step = max_step
+        self.epsilon = epsilon
+        lower, upper = hand_kinematics.dof_limits(skeleton)
+        self.lower = lower[1:].reshape(len(FINGERS), CHAIN)
+        self.upper = upper[1:].reshape(len(FINGERS), CHAIN)
+        self.probes = _probes(epsilon)
+        self.last = None            # the previous solution, the default warm start
+
+    def tips(self, poses):
+        # (..., DOF) poses -> (..., 5, 3) fingertip positions
+        frames = hand_kinematics.forward_kinematics(*hand_kinematics.split_pose(poses), skeleton=self.skeleton)
+        return frames[..., :3, 3][..., TIPS, :]
+
+    def solve(self, targets, pose=None, iterations=None):
+        # targets: (..., 5, 3) fingertip positions in FINGERS order, NaN rows for
+        # fingers that keep their angles. pose: (..., DOF) start, by default the
+        # previous solution. Returns (pose, distance of each tip to its target).
+        targets = np.asarray(targets, dtype=float)
+        batch = targets.shape[:-2]
+        if pose is None:
+            pose = self.last if self.last is not None and self.last.shape[:-1] == batch else \
+                np.zeros(batch + (hand_kinematics.DOF,))
+        pose = np.array(np.broadcast_to(pose, batch + (hand_kinematics.DOF,)), dtype=float)
+        iterations = self.iterations if iterations is None else iterations
+
+        active = ~np.isnan(targets).any(axis=-1)
+        goal = np.where(active[..., None], targets, 0.0)
+        identity = np.identity(3) * self.damping ** 2
+        to_radians = np.radians(1.0)
+
+        for iteration in range(iterations + 1):
+            tips = self.tips(pose[..., None, :] + self.probes)
+            error = np.where(active[..., None], goal - tips[..., 0, :, :], 0.0)
+            if iteration == iterations or np.abs(error).max(initial=0.0) < self.tolerance:
+                break
+
+            # (..., 5, 3, 4) tip motion per radian of each angle
+            J = np.moveaxis(tips[..., 1:, :, :] - tips[..., :1, :, :], -3, -1) / (self.epsilon * to_radians)
+            angles = pose[..., 1:].reshape(batch + (len(FINGERS), CHAIN))
+            step = self._step(J, error, identity)
+            # angles at a limit that the step pushes further out do not move; solve again without them
+            blocked = ((angles <= self.lower) & (step < 0)) | ((angles >= self.upper) & (step > 0))
+            if blocked.any():
+                step = self._step(np.where(blocked[..., None, :], 0.0, J), error, identity)
+
+            largest = np.abs(step).max(axis=-1, keepdims=True)
+            step *= np.minimum(1.0, self.max_step / np.maximum(largest, 1e-12))
+            angles = np.clip(angles + step, self.lower, self.upper)
+            pose[..., 1:] = angles.reshape(batch + (len(FINGERS) * CHAIN,))
+
+        self.last = pose
+        distance = np.where(active, np.linalg.norm(error, axis=-1), np.nan)
+        return pose, distance
+
+    def _step(self, J, error, identity):
+        # damped least squares J^T (J J^T + d^2 I)^-1 e, in degrees
+        Jt = np.swapaxes(J, -1, -2)
+        step = Jt @ np.linalg.solve(J @ Jt + identity, error[..., None])
+        return np.degrees(step[..., 0])
+
+
+class IKDrag:
+    # Shift + left drag on a finger moves its tip with the mouse: the tip follows the
+    # point under the cursor on the plane through the tip that faces the camera.
+    # Flexion moves a tip out of the palm plane, so curling is dragged from a side or
+    # oblique view; straight on, a straight finger can only spread.
+
+    def __init__(self, renderer, hand, apply_angles, request_render, iterations=4):
+        # apply_angles(flexion, abduction) poses the hand (the style's applyAngles, so
+        # drags are recorded); iterations per mouse move, warm-started from the hand
+        self.renderer = renderer
+        self.hand = hand
+        self.apply_angles = apply_angles
+        self.request_render = request_render
+        self.iterations = iterations
+        self.solver = FingerIK(hand.skeleton)
+        self.finger = None          # index into FINGERS while dragging
+        self.targets = None
+
+    @property
+    def active(self):
+        return self.finger is not None
+
+    def begin(self, actor):
+        # starts a drag when actor belongs to a finger; returns whether it did
+        name = actor.GetObjectName() if actor is not None else ''
+        finger = next((i for i, f in enumerate(FINGERS) if name.startswith(f)), None)
+        if finger is None:
+            return False
+        self.finger = finger
+        self.targets = np.full((len(FINGERS), 3), np.nan)
+        return True
+
+    def move(self, x, y):
+        start = self.hand.get_pose_vector()
+        tip = self.solver.tips(start)[self.finger]
+        self.targets[self.finger] = self._display_to_world(x, y, tip)
+        pose, _ = self.solver.solve(self.targets, start, self.iterations)
+        if self.hand.collisions is not None:
+            # the finger stops where it would touch another one
+            pose = start + self.hand.collisions.fraction(start, pose) * (pose - start)
+        self.apply_angles(*hand_kinematics.split_pose(pose))
+        self.request_render()
+
+    def end(self):
+        self.finger = None
+
+    def _display_to_world(self, x, y, anchor):
+        # the point under display (x, y) at the depth of anchor
+        renderer = self.renderer
+        renderer.SetWorldPoint(*anchor, 1.0)
+        renderer.WorldToDisplay()
+        depth = renderer.GetDisplayPoint()[2]
+        renderer.SetDisplayPoint(x, y, depth)
+        renderer.DisplayToWorld()
+        point = np.array(renderer.GetWorldPoint())
+        return point[:3] / point[3]
@@ -0,0 +1,171 @@
+# ================================================================================
+#   Forward kinematics of the hand in pure NumPy
+#
+#   Evaluates the same skeleton spec Hand in hand_robot_final.py builds
+#   with VTK (hand_skeleton, hands/default.json unless use_skeleton() picks
+#   another) so joint world positions can be computed without touching the
+#   render pipeline.
+#
+#   Angles are in degrees and use the same convention as Joint in
+#   hand_robot_final.py: flexion rotates about X (arrow Up is negative),
+#   abduction rotates about Z, both about the joint's own pivot.
+# ================================================================================
+
+import numpy as np
+
+import hand_skeleton
+from hand_skeleton import FINGERS, JOINT_NAMES, NODE_NAMES
+
+# the skeleton every table below is derived from, see use_skeleton()
+SKELETON = None
+
+
+def use_skeleton(skeleton):
+    # make skeleton (a hand_skeleton.Skeleton) the hand all functions here evaluate
+    global SKELETON, _REST, _PIVOTS, JOINT_BASE_ANGLES, JOINT_COUPLING
+    SKELETON = skeleton
+    _REST = skeleton.rest
+    _PIVOTS = skeleton.pivots
+    # fixed Z rotation and flexion coupling of every joint, in JOINT_NAMES order
+    JOINT_BASE_ANGLES = skeleton.base_angles
+    JOINT_COUPLING = skeleton.coupling
+
+
+def rest_positions(skeleton=None):
+    # (21, 3) world positions of NODE_NAMES at the rest pose (every angle zero); unlike
+    # the skeleton's rest coordinates these include the fixed base rotations (thumb)
+    return forward_kinematics(np.zeros(len(JOINT_NAMES)), skeleton=skeleton)[:, :3, 3]
+
+
+use_skeleton(hand_skeleton.Skeleton.load())
+
+# index into JOINT_NAMES of the joint that moves each node
+_OWNER = np.array([0] + [1 + 5 * min(n, 2) + f for f in range(5) for n in range(4)])
+
+
+def _rotations(flexion, abduction, skeleton=None):
+    # Rz(base + abduction + coupling * flexion) @ Rx(flexion), shape (..., 16, 3, 3)
+    base, coupling = (JOINT_BASE_ANGLES, JOINT_COUPLING) if skeleton is None else \
+        (skeleton.base_angles, skeleton.coupling)
+    ax = np.radians(flexion)
+    az = np.radians(base + abduction + coupling * flexion)
+    cx, sx = np.cos(ax), np.sin(ax)
+    cz, sz = np.cos(az), np.sin(az)
+
+    R = np.empty(np.shape(ax) + (3, 3))
+    R[..., 0, 0] = cz
+    R[..., 0, 1] = -sz * cx
+    R[..., 0, 2] = sz * sx
+    R[..., 1, 0] = sz
+    R[..., 1, 1] = cz * cx
+    R[..., 1, 2] = -cz * sx
+    R[..., 2, 0] = 0.0
+    R[..., 2, 1] = sx
+    R[..., 2, 2] = cx
+    return R
+
+
+def _local_transforms(R, pivots):
+    # T(p) R T(-p) for every joint pivot p, shape (..., 16, 4, 4)
+    L = np.zeros(R.shape[:-2] + (4, 4))
+    L[..., :3, :3] = R
+    L[..., :3, 3] = pivots - np.einsum('...ij,...j->...i', R, pivots)
+    L[..., 3, 3] = 1.0
+    return L
+
+
+def joint_transforms(flexion, abduction=None, skeleton=None):
+    # World transforms of the 16 joints, exactly what the chained vtkTransforms
+    # (palm -> jnt1 -> jnt2 -> jnt3) hold: they map rest coordinates to posed ones.
+    # flexion/abduction: (..., 16) in JOINT_NAMES order. Returns (..., 16, 4, 4).
+    # skeleton: a hand_skeleton.Skeleton other than the one in use_skeleton()
+    flexion = np.asarray(flexion, dtype=float)
+    if abduction is None:
+        abduction = np.zeros_like(flexion)
+    pivots = _PIVOTS if skeleton is None else skeleton.pivots
+    L = _local_transforms(_rotations(flexion, np.asarray(abduction, dtype=float), skeleton), pivots)
+
+    W = np.empty_like(L)
+    W[..., 0, :, :] = L[..., 0, :, :]
+    parent = W[..., :1, :, :]
+    for k in range(3):
+        level = slice(1 + 5 * k, 6 + 5 * k)
+        W[..., level, :, :] = parent @ L[..., level, :, :]
+        parent = W[..., level, :, :]
+    return W
+
+
+def forward_kinematics(flexion, abduction=None, skeleton=None):
+    # World frames of NODE_NAMES: rotation is the node's orientation, translation
+    # its world position. flexion/abduction: (..., 16). Returns (..., 21, 4, 4).
+    W = joint_transforms(flexion, abduction, skeleton)
+
+    # a node's frame is the transform that moves it (tips ride on jnt3),
+    # evaluated at the node's rest position
+    frames = W[..., _OWNER, :, :]
+    rest = _REST if skeleton is None else skeleton.rest
+    frames[..., :3, 3] += np.einsum('...ij,...j->...i', frames[..., :3, :3], rest)
+    return frames
+
+
+# ---- batched pose evaluation -------------------------------------------------------
+
+# one pose is a flat vector of DOF angles: the wrist flexion, then for every finger
+# jnt1 flexion, jnt1 spread (abduction), jnt2 flexion and jnt3 flexion
+DOF_NAMES = ['wrist_jnt'] + ['{}_{}'.format(f, d) for f in FINGERS
+                             for d in ('jnt1', 'jnt1_spread', 'jnt2', 'jnt3')]
+DOF = len(DOF_NAMES)
+
+_FLEX_DOF = np.array([0] + [1 + 4 * f + (0, 2, 3)[k] for k in range(3) for f in range(5)])
+_SPREAD_DOF = np.array([1 + 4 * f + 1 for f in range(5)])
+
+
+def split_pose(poses):
+    # (..., DOF) pose vectors -> (..., 16) flexion and abduction in JOINT_NAMES order
+    poses = np.asarray(poses, dtype=float)
+    if poses.shape[-1] != DOF:
+        raise ValueError('expected poses with {} angles, got shape {}'.format(DOF, poses.shape))
+    flexion = poses[..., _FLEX_DOF]
+    abduction = np.zeros_like(flexion)
+    abduction[..., 1:6] = poses[..., _SPREAD_DOF]
+    return flexion, abduction
+
+
+def join_pose(flexion, abduction):
+    # inverse of split_pose
+    flexion = np.asarray(flexion, dtype=float)
+    poses = np.zeros(flexion.shape[:-1] + (DOF,))
+    poses[..., _FLEX_DOF] = flexion
+    poses[..., _SPREAD_DOF] = np.asarray(abduction, dtype=float)[..., 1:6]
+    return poses
+
+
+def dof_limits(skeleton=None):
+    # (DOF,) lower and upper limits of every pose angle, in degrees
+    skeleton = skeleton or SKELETON
+    lower = join_pose(skeleton.flexion_limits[:, 0], skeleton.abduction_limits[:, 0])
+    upper = join_pose(skeleton.flexion_limits[:, 1], skeleton.abduction_limits[:, 1])
+    return lower, upper
+
+
+def evaluate_poses(poses, orientations=True, chunk_size=65536, dtype=np.float64, skeleton=None):
+    # World positions (N, 21, 3) and orientations (N, 21, 3, 3) of NODE_NAMES for
+    # N poses of shape (N, DOF). Evaluated in chunks so millions of poses do not
+    # need the full (N, 21, 4, 4) intermediate in memory at once.
+    poses = np.asarray(poses, dtype=float)
+    if poses.ndim != 2:
+        raise ValueError('expected an (N, {}) array of poses, got shape {}'.format(DOF, poses.shape))
+    n = len(poses)
+
+    positions = np.empty((n, len(NODE_NAMES), 3), dtype=dtype)
+    rotations = np.empty((n, len(NODE_NAMES), 3, 3), dtype=dtype) if orientations else None
+    for start in range(0, n, chunk_size):
+        stop = min(start + chunk_size, n)
+        frames = forward_kinematics(*split_pose(poses[start:stop]), skeleton=skeleton)
+        positions[start:stop] = frames[..., :3, 3]
+        if orientations:
+            rotations[start:stop] = frames[..., :3, :3]
+
+    if orientations:
+        return positions, rotations
+    return positions
@@ -0,0 +1,179 @@
+# ================================================================================
+#   Adaptive level of detail for joint spheres and phalanx cylinders
+#
+#   Every sphere and cylinder gets a few tessellation tiers (tier 0 is the
+#   original 20 x 20 / 20 resolution). Before each render the tier of every
+#   part is chosen from its projected size on screen, then shifted coarser
+#   while the last frames ran over the frame-time budget and while the
+#   trackball is being dragged. When the view goes idle full detail comes back.
+#
+#   The frame time is the wall time of the whole window render, buffer swap
+#   included: on software GL the renderer's own timer sees a few ms of a
+#   100 ms frame. Once no frame has been drawn for IDLE_MS (whatever drove
+#   the frames: keys, clips, remote control) one full-detail frame is drawn.
+# ================================================================================
+
+import math
+import time
+
+from vtkmodules.vtkFiltersSources import vtkCylinderSource, vtkSphereSource
+from vtkmodules.vtkRenderingCore import vtkPolyDataMapper
+
+# resolution per tier, finest first
+TIERS = {
+    'sphere': (20, 12, 8, 5),
+    'cylinder': (20, 12, 8, 5),
+}
+
+# projected radius in pixels needed to keep a tier (tier 0, 1, 2; smaller gets tier 3)
+MIN_PIXELS = (24.0, 10.0, 4.0)
+
+# tiers dropped while the trackball is dragged
+INTERACTION_BIAS = 2
+
+# ms without a frame after which the view counts as idle
+IDLE_MS = 200
+
+
+def make_mapper(kind, params, resolution):
+    # a fresh source + mapper; kind 'sphere' params (radius,), 'cylinder' (radius, height)
+    if kind == 'sphere':
+        source = vtkSphereSource()
+        source.SetRadius(params[0])
+        source.SetPhiResolution(resolution)
+        source.SetThetaResolution(resolution)
+    else:
+        source = vtkCylinderSource()
+        source.SetRadius(params[0])
+        source.SetHeight(params[1])
+        source.SetResolution(resolution)
+    mapper = vtkPolyDataMapper()
+    mapper.SetInputConnection(source.GetOutputPort())
+    return mapper
+
+
+class LevelOfDetail:
+
+    def __init__(self, renderer, frame_budget=1 / 60.0, mapper_factory=make_mapper):
+        self.renderer = renderer
+        self.frame_budget = frame_budget    # seconds per frame we aim for
+        self.mapper_factory = mapper_factory
+        self.bias = 0                       # tiers dropped for frame time
+        self.interacting = False
+        self.started = None                 # perf_counter() at the start of the window render
+        self.settling = False               # drawing the full-detail frame of an idle view
+        self.interactor = None
+        self.request_render = None
+        self.idle_timer = None
+        self.parts = []                     # [actor, radius, tier mappers, current tier]
+
+        actors = renderer.GetActors()
+        actors.InitTraversal()
+        for _ in range(actors.GetNumberOfItems()):
+            actor = actors.GetNextActor()
+            source = actor.GetMapper().GetInputAlgorithm()
+            if source is None:
+                continue
+            if source.IsA('vtkSphereSource'):
+                kind, params = 'sphere', (source.GetRadius(),)
+            elif source.IsA('vtkCylinderSource'):
+                kind, params = 'cylinder', (source.GetRadius(), source.GetHeight())
+            else:
+                continue
+            # tier 0 keeps the actor's own mapper, coarser ones are built once up front
+            mappers = [actor.GetMapper()] + [mapper_factory(kind, params, res) for res in TIERS[kind][1:]]
+            self.parts.append([actor, params[0], mappers, 0])
+
+        renderer.AddObserver('StartEvent', self.onStartRender)
+        renwin = renderer.GetRenderWindow()
+        renwin.AddObserver('StartEvent', self.onStartFrame)
+        renwin.AddObserver('EndEvent', self.onEndFrame)
+
+    def attach(self, style, request_render):
+        # coarser while the trackball drags the camera, full detail once it stops
+        # or once frames stop coming for IDLE_MS
+        self.request_render = request_render
+        self.interactor = style.GetInteractor()
+        style.AddObserver('StartInteractionEvent', self.onStartInteraction)
+        style.AddObserver('EndInteractionEvent', self.onEndInteraction)
+        self.interactor.AddObserver('TimerEvent', self.onTimer)
+
+    def onStartInteraction(self, obj, event):
+        self.interacting = True
+
+    def onEndInteraction(self, obj, event):
+        self.interacting = False
+        self.settle()
+
+    def settle(self):
+        # one frame at full detail, which does not count towards the frame-time bias
+        self.bias = 0
+        self.settling = True
+        self.request_render()
+
+    def onTimer(self, obj, event):
+        if self.idle_timer is None or self.interactor.GetTimerEventId() != self.idle_timer:
+            return
+        self.idle_timer = None
+        if not self.interacting and self.bias:
+            self.settle()
+
+    def pixels_per_unit(self, distance):
+        camera = self.renderer.GetActiveCamera()
+        height = self.renderer.GetSize()[1] or 1
+        if camera.GetParallelProjection():
+            return height / (2 * camera.GetParallelScale())
+        return height / (2 * max(distance, 1e-6) * math.tan(math.radians(camera.GetViewAngle()) / 2))
+
+    def tier_for(self, pixels):
+        for tier, needed in enumerate(MIN_PIXELS):
+            if pixels >= needed:
+                return tier
+        return len(MIN_PIXELS)
+
+    def onStartRender(self, obj, event):
+        if not self.renderer.IsActiveCameraCreated():
+            # the reset the renderer would do after this event, done first so the
+            # tiers are picked for the camera of this frame
+            self.renderer.ResetCamera()
+        camera = self.renderer.GetActiveCamera()
+        eye = camera.GetPosition()
+        extra = self.bias + (INTERACTION_BIAS if self.interacting else 0)
+        for part in self.parts:
+            actor, radius, mappers, current = part
+            center = actor.GetCenter()
+            distance = math.sqrt(sum((c - e) ** 2 for c, e in zip(center, eye)))
+            tier = min(self.tier_for(radius * self.pixels_per_unit(distance)) + extra, len(mappers) - 1)
+            if tier != current:
+                actor.SetMapper(mappers[tier])
+                part[3] = tier
+
+    def onStartFrame(self, obj, event):
+        self.started = time.perf_counter()
+
+    def onEndFrame(self, obj, event):
+        # adapt to the wall time of the frame that just finished
+        if self.started is None:
+            return
+        seconds = time.perf_counter() - self.started
+        self.started = None
+        if self.settling:
+            self.settling = False
+            return
+        if seconds > self.frame_budget:
+            self.bias = min(self.bias + 1, len(MIN_PIXELS))
+        elif seconds < self.frame_budget * 0.5 and self.bias > 0:
+            self.bias -= 1
+        # restart the idle countdown: it runs out only when no frame follows this one
+        if self.interactor is not None and self.interactor.GetInitialized():
+            if self.idle_timer is not None:
+                self.interactor.DestroyTimer(self.idle_timer)
+                self.idle_timer = None
+            if self.bias:
+                self.idle_timer = self.interactor.CreateOneShotTimer(IDLE_MS)
+
+    def tier_counts(self):
+        counts = [0] * (len(MIN_PIXELS) + 1)
+        for part in self.parts:
+            counts[part[3]] += 1
+        return counts
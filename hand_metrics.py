@@ -0,0 +1,229 @@
+# ================================================================================
+#   Per-frame metrics, on-screen HUD and file export
+#
+#   FrameMetrics keeps rolling windows of four timings:
+#     frame    time between the ends of consecutive frames
+#     render   render window StartEvent -> EndEvent: the whole frame, every
+#              renderer, the HUD overlay and the buffer swap
+#     events   time spent in the style's mouse and key handlers
+#     pick     time spent in Picker.pick()
+#   and reports their p50 / p95 / p99. Everything hooks in from outside
+#   (observer priorities around the style's own handlers, a timing wrapper
+#   around the picker), so with the HUD and export off nothing is measured.
+#
+#   MetricsHUD draws the percentiles as a text overlay in the renderer.
+#   MetricsExporter writes them once per interval from a background thread:
+#   .prom -> Prometheus text format (replaced atomically, for a textfile
+#   scraper), anything else -> CSV rows, rotated like logging's
+#   RotatingFileHandler (path, path.1, ... path.N).
+# ================================================================================
+
+import collections
+import os
+import queue
+import threading
+import time
+
+COUNTERS = ('frame', 'render', 'events', 'pick')
+QUANTILES = (0.5, 0.95, 0.99)
+
+# style events timed as 'events'
+HANDLED_EVENTS = ('LeftButtonPressEvent', 'MouseMoveEvent', 'KeyPressEvent')
+
+
+class FrameMetrics:
+
+    def __init__(self, window=300):
+        self.samples = {name: collections.deque(maxlen=window) for name in COUNTERS}
+        self.counts = dict.fromkeys(COUNTERS, 0)
+        self.totals = dict.fromkeys(COUNTERS, 0.0)      # seconds, since the start
+        self.last_frame_end = None
+        self.render_start = None
+        self.event_start = None
+
+    def add(self, name, seconds):
+        self.samples[name].append(seconds)
+        self.counts[name] += 1
+        self.totals[name] += seconds
+
+    def percentiles(self, name):
+        # (p50, p95, p99) in milliseconds over the window, zeros before the first sample
+        values = sorted(self.samples[name])
+        if not values:
+            return (0.0,) * len(QUANTILES)
+        return tuple(values[min(len(values) - 1, int(q * len(values)))] * 1000 for q in QUANTILES)
+
+    def snapshot(self):
+        # {counter: (count, total ms, p50, p95, p99)}, taken on the UI thread
+        return {name: (self.counts[name], self.totals[name] * 1000) + self.percentiles(name)
+                for name in COUNTERS}
+
+    def attach(self, renderer, style=None):
+        # renderer's StartEvent/EndEvent leave out the other passes and the swap
+        renwin = renderer.GetRenderWindow()
+        renwin.AddObserver('StartEvent', self.onStartRender)
+        renwin.AddObserver('EndEvent', self.onEndRender)
+        if style is not None:
+            # run just before and just after the style's own handlers (priority 0)
+            for event in HANDLED_EVENTS:
+                style.AddObserver(event, self.onEventStart, 100.0)
+                style.AddObserver(event, self.onEventEnd, -100.0)
+            if style.Picker is not None:
+                style.Picker = TimedPicker(style.Picker, self)
+
+    def onStartRender(self, obj, event):
+        self.render_start = time.perf_counter()
+
+    def onEndRender(self, obj, event):
+        now = time.perf_counter()
+        if self.render_start is not None:
+            self.add('render', now - self.render_start)
+        if self.last_frame_end is not None:
+            self.add('frame', now - self.last_frame_end)
+        self.last_frame_end = now
+
+    def onEventStart(self, obj, event):
+        self.event_start = time.perf_counter()
+
+    def onEventEnd(self, obj, event):
+        if self.event_start is not None:
+            self.add('events', time.perf_counter() - self.event_start)
+            self.event_start = None
+
+
+class TimedPicker:
+    # wraps a picker (AnalyticPicker) and times every pick
+
+    def __init__(self, picker, metrics):
+        self.picker = picker
+        self.metrics = metrics
+
+    def pick(self, x, y):
+        t0 = time.perf_counter()
+        actor = self.picker.pick(x, y)
+        self.metrics.add('pick', time.perf_counter() - t0)
+        return actor
+
+    def __getattr__(self, name):
+        return getattr(self.picker, name)
+
+
+def format_snapshot(snapshot):
+    lines = ['{:7s} {:>7s} {:>7s} {:>7s}  ms'.format('', 'p50', 'p95', 'p99')]
+    for name in COUNTERS:
+        count, total, p50, p95, p99 = snapshot[name]
+        lines.append('{:7s} {:7.2f} {:7.2f} {:7.2f}'.format(name, p50, p95, p99))
+    return '\n'.join(lines)
+
+
+class MetricsHUD:
+    # text overlay in the lower left corner, refreshed a few times per second so the
+    # text texture is not rebuilt on every frame
+
+    def __init__(self, renderer, metrics, refresh=0.25):
+        # text rendering needs the FreeType factories, only loaded with the HUD
+        import vtkmodules.vtkRenderingFreeType  # noqa: F401
+        from vtkmodules.vtkRenderingCore import vtkTextActor
+
+        self.metrics = metrics
+        self.refresh = refresh
+        self.updated = 0.0
+        self.actor = vtkTextActor()
+        self.actor.SetDisplayPosition(10, 10)
+        self.actor.PickableOff()
+        text = self.actor.GetTextProperty()
+        text.SetFontFamilyToCourier()
+        text.SetFontSize(13)
+        text.SetColor(0.1, 0.1, 0.1)
+        self.actor.SetInput(format_snapshot(metrics.snapshot()))
+        renderer.AddViewProp(self.actor)
+        renderer.AddObserver('StartEvent', self.onStartRender)
+
+    def onStartRender(self, obj, event):
+        now = time.perf_counter()
+        if now - self.updated >= self.refresh:
+            self.updated = now
+            self.actor.SetInput(format_snapshot(self.metrics.snapshot()))
+
+
+class MetricsExporter:
+
+    def __init__(self, path, metrics, renderer, interval=1.0, max_bytes=1 << 20, backups=3):
+        self.path = path
+        self.metrics = metrics
+        self.interval = interval
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.prometheus = path.endswith('.prom')
+        self.last = time.perf_counter()
+
+        # the UI thread only snapshots; the file work happens on the writer thread
+        self.snapshots = queue.Queue()
+        self.writer = threading.Thread(target=self._run, name='metrics-exporter', daemon=True)
+        self.writer.start()
+        renderer.AddObserver('EndEvent', self.onEndRender)
+
+    def onEndRender(self, obj, event):
+        now = time.perf_counter()
+        if now - self.last >= self.interval:
+            self.last = now
+            self.snapshots.put((time.time(), self.metrics.snapshot()))
+
+    def close(self):
+        self.snapshots.put((time.time(), self.metrics.snapshot()))
+        self.snapshots.put(None)
+        self.writer.join()
+
+    def _run(self):
+        while True:
+            item = self.snapshots.get()
+            if item is None:
+                return
+            if self.prometheus:
+                self._write_prometheus(*item)
+            else:
+                self._write_csv(*item)
+
+    def _write_prometheus(self, stamp, snapshot):
+        lines = []
+        for name in COUNTERS:
+            metric = 'hand_{}_milliseconds'.format(name)
+            count, total, *values = snapshot[name]
+            lines.append('# HELP {} Rolling {} time of the hand app.'.format(metric, name))
+            lines.append('# TYPE {} summary'.format(metric))
+            for q, value in zip(QUANTILES, values):
+                lines.append('{}{{quantile="{}"}} {:.4f}'.format(metric, q, value))
+            lines.append('{}_sum {:.4f}'.format(metric, total))
+            lines.append('{}_count {}'.format(metric, count))
+        lines.append('# HELP hand_metrics_timestamp_seconds Unix time of this export.')
+        lines.append('# TYPE hand_metrics_timestamp_seconds gauge')
+        lines.append('hand_metrics_timestamp_seconds {:.3f}'.format(stamp))
+        # written next to the target and renamed over it, so a scraper never reads half a file
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(tmp, self.path)
+
+    def _write_csv(self, stamp, snapshot):
+        if os.path.exists(self.path) and os.path.getsize(self.path) >= self.max_bytes:
+            self._rotate()
+        new = not os.path.exists(self.path)
+        with open(self.path, 'a') as f:
+            if new:
+                f.write(','.join(['time'] + ['{}_{}'.format(name, column) for name in COUNTERS
+                                             for column in ('count', 'total_ms', 'p50_ms', 'p95_ms', 'p99_ms')]) + '\n')
+            row = ['{:.3f}'.format(stamp)]
+            for name in COUNTERS:
+                count, *values = snapshot[name]
+                row += [str(count)] + ['{:.4f}'.format(value) for value in values]
+            f.write(','.join(row) + '\n')
+
+    def _rotate(self):
+        # path -> path.1 -> ... -> path.<backups>, the oldest is dropped
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists('{}.{}'.format(self.path, i)):
+                os.replace('{}.{}'.format(self.path, i), '{}.{}'.format(self.path, i + 1))
+        if self.backups > 0:
+            os.replace(self.path, self.path + '.1')
+        else:
+            os.remove(self.path)
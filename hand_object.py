@@ -0,0 +1,295 @@
+# ================================================================================
+#   Contacts between the hand and an imported object mesh
+#
+#   load_mesh() reads STL, OBJ or VTP. DistanceField samples the object's
+#   signed distance (negative inside) on a regular grid once, so a query
+#   costs the same for 100 triangles or 1M: the triangles only matter while
+#   the grid is built.
+#
+#   The grid is filled from points on the surface (dense meshes clustered
+#   down to the grid spacing, large triangles split below it): each cell
+#   takes the closest point propagated from its neighbours (jump flooding)
+#   and stores its distance to that point's tangent plane, within a band of
+#   `band` around the surface. Cells further out only keep the sign, read
+#   along each grid line from the band cells before them, and hold +/-band.
+#   Triangles are expected to face outwards, as STL/OBJ exporters write them.
+#
+#   ObjectContacts samples every hand capsule (hand_collision) along its
+#   axis and looks all samples up in one trilinear interpolation: a capsule
+#   touches the object where the distance of its axis drops below its
+#   radius, and the difference is the depth. A capsule within CONTACT_TOLERANCE
+#   of the surface counts as touching, in the app and in the grasp search
+#   (hand_grasp) alike.
+# ================================================================================
+
+import importlib
+import itertools
+import os
+import time
+
+import numpy as np
+
+from hand_collision import Capsules
+
+# extension -> (vtkmodules submodule, reader class)
+READERS = {
+    '.stl': ('vtkIOGeometry', 'vtkSTLReader'),
+    '.obj': ('vtkIOGeometry', 'vtkOBJReader'),
+    '.vtp': ('vtkIOXML', 'vtkXMLPolyDataReader'),
+}
+
+# gap to the surface that still counts as a contact (depth >= -CONTACT_TOLERANCE)
+CONTACT_TOLERANCE = 0.25
+
+# the 8 corners of a grid cell, as offsets along x, y, z
+_CORNERS = np.array(list(itertools.product((0, 1), repeat=3)))
+
+# the 26 neighbours of a grid cell
+_NEIGHBOURS = [offset for offset in itertools.product((-1, 0, 1), repeat=3) if any(offset)]
+
+
+def load_mesh(path, offset=(0.0, 0.0, 0.0)):
+    # vtkPolyData of the triangles in path, moved by offset (hand coordinates)
+    from vtkmodules.vtkCommonTransforms import vtkTransform
+    from vtkmodules.vtkFiltersCore import vtkTriangleFilter
+    from vtkmodules.vtkFiltersGeneral import vtkTransformPolyDataFilter
+
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in READERS:
+        raise ValueError('unsupported mesh format {!r}, expected one of {}'.format(
+            extension, ', '.join(READERS)))
+    if not os.path.exists(path):
+        raise FileNotFoundError(path)
+    module, name = READERS[extension]
+    reader = getattr(importlib.import_module('vtkmodules.' + module), name)()
+    reader.SetFileName(path)
+
+    triangles = vtkTriangleFilter()
+    triangles.SetInputConnection(reader.GetOutputPort())
+    transform = vtkTransform()
+    transform.Translate(*offset)
+    place = vtkTransformPolyDataFilter()
+    place.SetInputConnection(triangles.GetOutputPort())
+    place.SetTransform(transform)
+    place.Update()
+    polydata = place.GetOutput()
+    if not polydata.GetNumberOfPolys():
+        raise ValueError('{} has no triangles'.format(path))
+    return polydata
+
+
+def _triangles(polydata):
+    # (points (P, 3), triangles (T, 3) point indices) of a triangle-only vtkPolyData
+    from vtkmodules.util.numpy_support import vtk_to_numpy
+    points = vtk_to_numpy(polydata.GetPoints().GetData()).astype(float)
+    connectivity = vtk_to_numpy(polydata.GetPolys().GetConnectivityArray())
+    return points, connectivity.reshape(-1, 3)
+
+
+def _barycentric(m):
+    # (m * m, 2) centres of the sub-triangles of a triangle split m times along every edge
+    i, j = np.indices((m, m)).reshape(2, -1)
+    up, down = i + j <= m - 1, i + j <= m - 2
+    return np.vstack([np.stack([i[up], j[up]], axis=1) + 1 / 3,
+                      np.stack([i[down], j[down]], axis=1) + 2 / 3]) / m
+
+
+def surface_samples(polydata, spacing):
+    # (points (N, 3), unit normals (N, 3)) on the surface, about spacing apart: the
+    # centres of the triangles, split into smaller ones where an edge is longer
+    from vtkmodules.vtkFiltersCore import vtkQuadricClustering
+
+    points, triangles = _triangles(polydata)
+    corners = points[triangles]
+    if len(triangles) > 4 * _area(corners) / spacing ** 2:
+        # far finer than the grid: cluster to about one vertex per cell first
+        bounds = np.array(polydata.GetBounds()).reshape(3, 2)
+        divisions = np.maximum(np.ceil((bounds[:, 1] - bounds[:, 0]) / spacing), 1).astype(int)
+        cluster = vtkQuadricClustering()
+        cluster.SetInputData(polydata)
+        cluster.AutoAdjustNumberOfDivisionsOff()
+        cluster.SetNumberOfDivisions(*divisions)
+        cluster.Update()
+        points, triangles = _triangles(cluster.GetOutput())
+        corners = points[triangles]
+
+    u, v = corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0]
+    normals = np.cross(u, v)
+    length = np.linalg.norm(normals, axis=1)
+    keep = length > 0
+    corners, u, v, normals = corners[keep], u[keep], v[keep], normals[keep] / length[keep, None]
+
+    longest = np.linalg.norm(np.stack([u, v, v - u], axis=1), axis=-1).max(axis=1)
+    splits = np.maximum(np.ceil(longest / spacing), 1).astype(int)
+    samples, sample_normals = [], []
+    for m in np.unique(splits):
+        group = splits == m
+        uv = _barycentric(m)
+        samples.append((corners[group, None, 0] + uv[:, :1] * u[group, None] + uv[:, 1:] * v[group, None])
+                       .reshape(-1, 3))
+        sample_normals.append(np.repeat(normals[group], len(uv), axis=0))
+    return np.vstack(samples), np.vstack(sample_normals)
+
+
+def _area(corners):
+    return np.linalg.norm(np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0]), axis=1).sum() / 2
+
+
+class DistanceField:
+
+    def __init__(self, polydata, resolution=64, band=3.0):
+        # resolution: cells along the longest side of the grid; band: distance from
+        # the surface that is stored exactly (the deepest contact that can be measured)
+        bounds = np.array(polydata.GetBounds()).reshape(3, 2)
+        low, high = bounds[:, 0] - band, bounds[:, 1] + band
+        self.spacing = (high - low).max() / resolution
+        self.shape = tuple(np.ceil((high - low) / self.spacing).astype(int) + 1)
+        self.origin = low
+        self.band = band
+        self.last = np.array(self.shape) - 1
+        self.values = self._build(*surface_samples(polydata, self.spacing / 2), self.spacing / 2)
+        self.flat = self.values.ravel()
+        self.strides = np.array([self.shape[1] * self.shape[2], self.shape[2], 1])
+        self.corners = _CORNERS @ self.strides
+
+    def _build(self, samples, normals, sample_spacing):
+        shape = self.shape
+        centres = self.origin + self.spacing * np.stack(np.indices(shape), axis=-1)
+
+        # seeds: every cell with samples in it takes the one closest to its centre
+        cell = np.clip(np.rint((samples - self.origin) / self.spacing).astype(int), 0, self.last)
+        flat = np.ravel_multi_index(cell.T, shape)
+        gap = np.linalg.norm(samples - centres.reshape(-1, 3)[flat], axis=1)
+        order = np.lexsort((gap, flat))
+        first = order[np.r_[True, flat[order][1:] != flat[order][:-1]]]
+        nearest = np.full(shape, -1)
+        nearest.flat[flat[first]] = first
+        distance = np.full(shape, np.inf)
+        distance.flat[flat[first]] = gap[first]
+
+        # jump flooding: halving steps, then a final pass of 1 to fix the rest
+        steps = int(np.ceil(self.band / self.spacing)) + 1
+        jumps = [1 << k for k in range(int(steps).bit_length() - 1, -1, -1)] + [1]
+        for jump in jumps:
+            for offset in _NEIGHBOURS:
+                candidate = self._shifted(nearest, np.array(offset) * jump)
+                valid = candidate >= 0
+                d = np.where(valid, np.linalg.norm(samples[candidate] - centres, axis=-1), np.inf)
+                better = d < distance
+                nearest[better] = candidate[better]
+                distance[better] = d[better]
+
+        # distance to the tangent plane of the closest sample (exact on flat parts), or to the
+        # sample itself less the most a surface point can be from its closest sample (corners)
+        inside_band = distance <= self.band
+        offset = centres - samples[nearest]
+        plane = np.einsum('...i,...i->...', offset, normals[nearest])
+        # the side from the mean normal of the samples in the closest sample's cell: at an edge
+        # that points between the faces, so cells past the end of a face get the right sign
+        mean = np.stack([np.bincount(flat, normals[:, k], len(distance.flat)) for k in range(3)], axis=1)
+        side = np.einsum('...i,...i->...', offset, mean[flat][nearest])
+        side = np.where(side != 0, side, plane)
+        values = np.sign(side) * np.maximum(np.abs(plane), distance - 0.6 * sample_spacing)
+        values = np.clip(values, -self.band, self.band)
+
+        # outside the band: the sign of the last band cell before along z, outside at the border
+        index = np.where(inside_band, np.arange(shape[2]), -1)
+        index = np.maximum.accumulate(index, axis=2)
+        previous = np.take_along_axis(values, np.maximum(index, 0), axis=2)
+        far = np.where((index >= 0) & (previous < 0), -self.band, self.band)
+        return np.where(inside_band, values, far)
+
+    @staticmethod
+    def _shifted(grid, offset):
+        # grid moved by offset cells: out[i] = grid[i + offset], -1 where that is outside
+        out = np.full_like(grid, -1)
+        target, source = [], []
+        for size, o in zip(grid.shape, offset):
+            target.append(slice(max(0, -o), size - max(0, o)))
+            source.append(slice(max(0, o), size - max(0, -o)))
+        out[tuple(target)] = grid[tuple(source)]
+        return out
+
+    def distance(self, points):
+        # (..., 3) points -> (...,) signed distance, trilinear between the grid cells;
+        # points off the grid add their distance to it
+        g = (np.asarray(points, dtype=float) - self.origin) / self.spacing
+        clamped = np.minimum(np.maximum(g, 0.0), self.last)
+        off_grid = np.sqrt(((g - clamped) ** 2).sum(axis=-1)) * self.spacing
+        cell = np.minimum(clamped.astype(int), self.last - 1)
+        f = (clamped - cell)[..., None, :]
+        values = self.flat[(cell @ self.strides)[..., None] + self.corners]
+        weights = np.where(_CORNERS, f, 1.0 - f).prod(axis=-1)
+        return (values * weights).sum(axis=-1) + off_grid
+
+
+class ObjectContacts:
+
+    def __init__(self, field, skeleton=None):
+        self.field = field
+        self.capsules = Capsules(skeleton)
+        # axis samples no further apart than the capsule radius, the same count for all
+        count = int(np.ceil((np.linalg.norm(self.capsules.end - self.capsules.start, axis=1)
+                             / self.capsules.radius).max())) + 1
+        self.t = np.linspace(0.0, 1.0, count)[:, None]
+
+    def depth(self, poses):
+        # (..., DOF) poses -> (..., capsules) how deep each capsule is in the object,
+        # positive when touching, at most the radius plus the field's band
+        return self.segment_depth(*self.capsules.segments(poses))
+
+    def segment_depth(self, start, end):
+        # depth() of already posed capsules, from Capsules.segments()
+        points = start[..., None, :] + self.t * (end - start)[..., None, :]
+        return self.capsules.radius - self.field.distance(points).min(axis=-1)
+
+    def contacts(self, pose, tolerance=CONTACT_TOLERANCE):
+        # [(capsule name, depth)] of the capsules touching the object, deepest first;
+        # capsules up to `tolerance` away touch with a negative depth
+        depth = self.depth(pose)
+        touching = np.flatnonzero(depth >= -tolerance)
+        return [(self.capsules.names[i], float(depth[i])) for i in touching[np.argsort(-depth[touching])]]
+
+
+class GraspObject:
+    # the object in the app: drawn next to the hand and checked against it before
+    # every frame that shows a new pose; contacts are printed when they change and
+    # the object is tinted while the hand touches it
+
+    COLOR = (0.55, 0.7, 0.85)
+    TOUCHED = (0.95, 0.55, 0.2)
+
+    def __init__(self, renderer, hand, polydata, resolution=64, tolerance=CONTACT_TOLERANCE):
+        from vtkmodules.vtkRenderingCore import vtkActor, vtkPolyDataMapper
+
+        t0 = time.perf_counter()
+        self.contacts = ObjectContacts(DistanceField(polydata, resolution), hand.skeleton)
+        print('object: {} triangles, distance field {} built in {:.1f} s'.format(
+            polydata.GetNumberOfPolys(), 'x'.join(map(str, self.contacts.field.shape)),
+            time.perf_counter() - t0))
+        self.hand = hand
+        self.tolerance = tolerance
+        self.pose = None
+        self.current = []           # [(capsule name, depth)] at self.pose
+
+        mapper = vtkPolyDataMapper()
+        mapper.SetInputData(polydata)
+        self.actor = vtkActor()
+        self.actor.SetMapper(mapper)
+        self.actor.PickableOff()
+        self.actor.GetProperty().SetColor(*self.COLOR)
+        self.actor.GetProperty().SetOpacity(0.6)
+        renderer.AddActor(self.actor)
+        renderer.AddObserver('StartEvent', self.onStartRender)
+
+    def onStartRender(self, obj, event):
+        pose = self.hand.get_pose_vector()
+        if self.pose is not None and np.array_equal(pose, self.pose):
+            return
+        self.pose = pose
+        contacts = self.contacts.contacts(pose, self.tolerance)
+        if [name for name, _ in contacts] != [name for name, _ in self.current]:
+            print('contacts (depth, gaps up to {:.2f} count):'.format(self.tolerance),
+                  ', '.join('{} {:.2f}'.format(name, depth) for name, depth in contacts) or 'none')
+        self.current = contacts
+        self.actor.GetProperty().SetColor(*(self.TOUCHED if contacts else self.COLOR))
@@ -0,0 +1,137 @@
+# ================================================================================
+#   Analytic picking
+#
+#   Every pickable part of the hand is a sphere (joints, wrist, tips), a
+#   cylinder (phalanges) or a box (palm, carpal bars). Instead of a
+#   render-based vtkPropPicker pass over all actors, the picker casts the
+#   camera ray through the mouse position and intersects it with the exact
+#   shapes placed by the current joint matrices, all parts at once in NumPy.
+#   Cheap enough to run on every mouse move for hover highlighting.
+# ================================================================================
+
+import numpy as np
+
+import hand_kinematics
+
+
+class AnalyticPicker:
+
+    def __init__(self, renderer, joints, joint_matrices):
+        # joints: name -> Joint of the scene, joint_matrices(): (16, 4, 4) world
+        # transforms in hand_kinematics.JOINT_NAMES order
+        self.renderer = renderer
+        self.joint_matrices = joint_matrices
+
+        owners = {joints[name].transform.GetAddressAsString('vtkTransform'): i
+                  for i, name in enumerate(hand_kinematics.JOINT_NAMES)}
+        parts = {'sphere': [], 'cylinder': [], 'cube': []}
+        actors = renderer.GetActors()
+        actors.InitTraversal()
+        for _ in range(actors.GetNumberOfItems()):
+            actor = actors.GetNextActor()
+            transform = actor.GetUserTransform()
+            owner = owners.get(transform.GetAddressAsString('vtkTransform')) if transform else None
+            source = actor.GetMapper().GetInputAlgorithm()
+            if owner is None or source is None:
+                continue
+            if source.IsA('vtkSphereSource'):
+                kind, half = 'sphere', (source.GetRadius(), 0.0, 0.0)
+            elif source.IsA('vtkCylinderSource'):
+                kind, half = 'cylinder', (source.GetRadius(), source.GetHeight() / 2, 0.0)
+            elif source.IsA('vtkCubeSource'):
+                kind, half = 'cube', (source.GetXLength() / 2, source.GetYLength() / 2, source.GetZLength() / 2)
+            else:
+                continue
+            # the actor's own placement: its matrix with the joint transform taken off,
+            # moved to the source's center
+            placement = np.linalg.solve(_matrix(transform.GetMatrix()), _matrix(actor.GetMatrix()))
+            placement[:3, 3] += placement[:3, :3] @ source.GetCenter()
+            parts[kind].append((actor, owner, placement, half))
+
+        # parts are laid out spheres first, then cylinders, then boxes; on equal
+        # distances the earlier part wins
+        ordered = parts['sphere'] + parts['cylinder'] + parts['cube']
+        self.sphere_count = len(parts['sphere'])
+        self.cylinder_count = len(parts['cylinder'])
+        self.part_actors = [p[0] for p in ordered]
+        self.owner = np.array([p[1] for p in ordered], dtype=int)
+        self.placement = np.array([p[2] for p in ordered]).reshape(-1, 4, 4)
+        # sphere (radius, -, -), cylinder (radius, half height along Y, -), box half sizes
+        self.half = np.array([p[3] for p in ordered]).reshape(-1, 3)
+
+    def ray(self, x, y):
+        # camera ray through the center of display pixel (x, y): origin and unit direction
+        points = []
+        for depth in (0.0, 1.0):
+            self.renderer.SetDisplayPoint(x + 0.5, y + 0.5, depth)
+            self.renderer.DisplayToWorld()
+            wx, wy, wz, w = self.renderer.GetWorldPoint()
+            points.append(np.array((wx, wy, wz)) / (w or 1.0))
+        direction = points[1] - points[0]
+        return points[0], direction / np.linalg.norm(direction)
+
+    def distances(self, origin, direction):
+        # ray parameter of the first hit on every part, inf where the ray misses.
+        # The ray is moved into every part's own frame, where the part is a sphere,
+        # a Y-axis cylinder or a box around the origin; the parameter t is the same
+        # in both frames since the direction is not renormalized.
+        # joints and placements only rotate and translate: the inverse rotation is R^T
+        M = self.joint_matrices()[self.owner] @ self.placement
+        o = np.einsum('pji,pj->pi', M[:, :3, :3], origin - M[:, :3, 3])
+        d = np.einsum('pji,j->pi', M[:, :3, :3], direction)
+        near = np.empty(len(o))
+        far = np.empty(len(o))
+        n, m = self.sphere_count, self.sphere_count + self.cylinder_count
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # spheres: |o + t d| = r
+            near[:n], far[:n] = _quadratic(d[:n], o[:n], self.half[:n, 0])
+
+            # cylinders: within the radius in XZ and between the two end planes in Y
+            xz = [0, 2]
+            radial = _quadratic(d[n:m][:, xz], o[n:m][:, xz], self.half[n:m, 0])
+            axial = _slab(d[n:m, 1], o[n:m, 1], self.half[n:m, 1])
+            near[n:m] = np.maximum(radial[0], axial[0])
+            far[n:m] = np.minimum(radial[1], axial[1])
+
+            # boxes: between the planes of all three slabs
+            slabs = _slab(d[m:], o[m:], self.half[m:])
+            near[m:] = slabs[0].max(axis=1, initial=-np.inf)
+            far[m:] = slabs[1].min(axis=1, initial=np.inf)
+
+            hit = (near <= far) & (far >= 0)
+        return np.where(hit, np.maximum(near, 0.0), np.inf)
+
+    def pick(self, x, y):
+        # nearest part under display position (x, y), or None
+        if not self.part_actors:
+            return None
+        hits = self.distances(*self.ray(x, y))
+        nearest = int(np.argmin(hits))
+        return self.part_actors[nearest] if np.isfinite(hits[nearest]) else None
+
+
+def _matrix(vtk_matrix):
+    return np.array([[vtk_matrix.GetElement(i, j) for j in range(4)] for i in range(4)])
+
+
+def _quadratic(d, o, radius):
+    # t interval where |o + t d| <= radius (rows of d and o); empty as (inf, -inf).
+    # A ray parallel to a cylinder axis (d = 0) is inside everywhere or nowhere.
+    a = np.einsum('ij,ij->i', d, d)
+    b = np.einsum('ij,ij->i', d, o)
+    c = np.einsum('ij,ij->i', o, o) - radius ** 2
+    root = np.sqrt(np.maximum(b ** 2 - a * c, 0.0))
+    inside = (b ** 2 - a * c >= 0) & (a > 1e-18)
+    parallel = (a <= 1e-18) & (c <= 0)
+    near = np.where(inside, (-b - root) / a, np.where(parallel, -np.inf, np.inf))
+    far = np.where(inside, (-b + root) / a, np.where(parallel, np.inf, -np.inf))
+    return near, far
+
+
+def _slab(d, o, half):
+    # t interval where -half <= o + t d <= half, per coordinate; a direction of 0
+    # gives (-inf, inf) inside the slab and an empty interval outside
+    t0 = (-half - o) / d
+    t1 = (half - o) / d
+    return np.minimum(t0, t1), np.maximum(t0, t1)
@@ -0,0 +1,166 @@
+# ================================================================================
+#   Binary pose recording and replay
+#
+#   File layout (little endian):
+#     header, 32 bytes   magic b'HANDPOSE', version u2, dof u2, record size u4,
+#                        wall-clock start time f8 (unix seconds), reserved 8 bytes
+#     records            time f8 (seconds since start), pose f4[dof]
+#                        (hand_kinematics.DOF_NAMES order, degrees)
+#
+#   The recorder only appends (time, pose) to an in-memory deque on the event
+#   path; a background thread drains it and writes whole batches, so the UI
+#   thread never touches the file.
+# ================================================================================
+
+import argparse
+import collections
+import struct
+import threading
+import time
+
+import numpy as np
+
+import hand_kinematics
+
+MAGIC = b'HANDPOSE'
+VERSION = 1
+HEADER = struct.Struct('<8sHHId8x')
+
+
+def record_dtype(dof=hand_kinematics.DOF):
+    return np.dtype([('time', '<f8'), ('pose', '<f4', (dof,))])
+
+
+def write_header(f, dof=hand_kinematics.DOF, start=None):
+    f.write(HEADER.pack(MAGIC, VERSION, dof, record_dtype(dof).itemsize,
+                        time.time() if start is None else start))
+
+
+def read_header(f):
+    # returns (dof, record dtype, start time) and leaves f at the first record
+    data = f.read(HEADER.size)
+    if len(data) < HEADER.size:
+        raise ValueError('not a pose recording: file too short')
+    magic, version, dof, size, start = HEADER.unpack(data)
+    if magic != MAGIC:
+        raise ValueError('not a pose recording: bad magic {!r}'.format(magic))
+    if version != VERSION:
+        raise ValueError('unsupported pose recording version {}'.format(version))
+    dtype = record_dtype(dof)
+    if dtype.itemsize != size:
+        raise ValueError('record size {} does not match {} angles'.format(size, dof))
+    return dof, dtype, start
+
+
+class PoseRecorder:
+
+    def __init__(self, path, flush_interval=0.25):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.pending = collections.deque()
+        self.records = 0
+        self.t0 = time.perf_counter()
+
+        self.file = open(path, 'wb')
+        write_header(self.file)
+        self.dtype = record_dtype()
+
+        self.stopping = threading.Event()
+        self.writer = threading.Thread(target=self._run, name='pose-recorder', daemon=True)
+        self.writer.start()
+
+    def record(self, pose):
+        # cheap enough for the event path: a timestamp and a deque append
+        self.pending.append((time.perf_counter() - self.t0, np.array(pose, dtype=np.float32)))
+
+    def _run(self):
+        while not self.stopping.wait(self.flush_interval):
+            self._flush()
+        self._flush()
+
+    def _flush(self):
+        count = len(self.pending)
+        if not count:
+            return
+        batch = np.empty(count, dtype=self.dtype)
+        for i in range(count):
+            batch[i] = self.pending.popleft()
+        self.file.write(batch.tobytes())
+        self.file.flush()
+        self.records += count
+
+    def close(self):
+        self.stopping.set()
+        self.writer.join()
+        self.file.close()
+
+
+class PoseLog:
+    # A recording read into memory, playable with hand_animation.AnimationPlayer.
+    # Use hand_stream for files too large to load.
+
+    loop = False
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.dof, dtype, self.start = read_header(f)
+            records = np.fromfile(f, dtype=dtype)
+        self.times = records['time'].astype(float)
+        self.poses = records['pose'].astype(float)
+        self.flexion, self.abduction = hand_kinematics.split_pose(self.poses)
+
+    def __len__(self):
+        return len(self.times)
+
+    @property
+    def duration(self):
+        return self.times[-1] - self.times[0] if len(self.times) else 0.0
+
+    @property
+    def fps(self):
+        # timer rate for playback: the typical record rate, at most 120 Hz
+        if len(self.times) < 2:
+            return 60
+        step = np.median(np.diff(self.times))
+        return min(120, 1 / step) if step > 0 else 120
+
+    def frame_at(self, seconds):
+        # last record at or before `seconds` after the first one
+        return max(0, int(np.searchsorted(self.times, self.times[0] + seconds, side='right')) - 1)
+
+    def time_of(self, frame):
+        if not len(self.times):
+            raise ValueError('the recording has no records')
+        return self.times[frame] - self.times[0]
+
+    def angles(self, frame):
+        if not len(self.times):
+            raise ValueError('the recording has no records')
+        return self.flexion[frame], self.abduction[frame]
+
+
+def write_log(path, times, poses, start=None, chunk_size=65536):
+    # writes a whole recording at once, e.g. converted motion capture
+    times = np.asarray(times)
+    dtype = record_dtype(np.shape(poses)[1])
+    with open(path, 'wb') as f:
+        write_header(f, dtype['pose'].shape[0], start)
+        for lo in range(0, len(times), chunk_size):
+            batch = np.empty(min(chunk_size, len(times) - lo), dtype=dtype)
+            batch['time'] = times[lo:lo + len(batch)]
+            batch['pose'] = poses[lo:lo + len(batch)]
+            f.write(batch.tobytes())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Print a summary of a pose recording.')
+    parser.add_argument('recording')
+    args = parser.parse_args(argv)
+
+    log = PoseLog(args.recording)
+    print('{}: {} records, {} angles, {:.2f} s, recorded {}'.format(
+        args.recording, len(log), log.dof, log.duration, time.ctime(log.start)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+# ================================================================================
+#   Headless pose -> image rendering
+#
+#   Renders the hand offscreen (no interactor, no on-screen window) for every
+#   pose in a file and writes one image per pose. Works with software OpenGL:
+#   pick --backend osmesa on machines without a GPU or X server.
+#
+#   poses file: .npy, or .csv/.txt with one pose per row, each pose being the
+#   21 angles of hand_kinematics.DOF_NAMES in degrees
+#
+#   python hand_render.py poses.npy -o frames --size 640 480 --azimuth 30
+# ================================================================================
+
+import argparse
+import os
+
+import numpy as np
+
+# window classes that need no display; read when the first render window is created
+BACKENDS = {
+    'auto': None,
+    'osmesa': 'vtkOSOpenGLRenderWindow',
+    'egl': 'vtkEGLRenderWindow',
+}
+
+WRITERS = {
+    '.png': 'vtkPNGWriter',
+    '.jpg': 'vtkJPEGWriter',
+    '.jpeg': 'vtkJPEGWriter',
+    '.tif': 'vtkTIFFWriter',
+    '.tiff': 'vtkTIFFWriter',
+    '.bmp': 'vtkBMPWriter',
+}
+
+
+def load_poses(path, mmap=False):
+    # mmap: map .npy files instead of reading them, for workers that only need a slice
+    if path.endswith('.npy'):
+        poses = np.load(path, mmap_mode='r' if mmap else None)
+        if mmap:
+            return poses
+    elif path.endswith('.csv'):
+        poses = np.loadtxt(path, delimiter=',', ndmin=2)
+    else:
+        poses = np.loadtxt(path, ndmin=2)
+    return np.atleast_2d(poses).astype(float)
+
+
+class OffscreenRenderer:
+    # Builds the hand scene once in an offscreen window and renders poses into it.
+    # The camera is fitted to the rest pose and then kept fixed for every pose.
+
+    def __init__(self, size=(640, 480), camera=None, backend='auto', image_format='.png', hand=None):
+        if BACKENDS[backend]:
+            os.environ['VTK_DEFAULT_OPENGL_WINDOW'] = BACKENDS[backend]
+
+        # imported here so the backend choice above is in place before VTK loads
+        import hand_robot_final
+        from hand_skeleton import Skeleton
+        from vtkmodules import vtkIOImage
+        from vtkmodules.vtkRenderingCore import vtkWindowToImageFilter
+
+        self.renwin, self.renderer = hand_robot_final.create_window(size, offscreen=True)
+        self.hand = hand_robot_final.Hand(self.renderer, Skeleton.load(hand) if hand else None)
+        self.setup_camera(camera or {})
+
+        self.grabber = vtkWindowToImageFilter()
+        self.grabber.SetInput(self.renwin)
+        self.grabber.ReadFrontBufferOff()
+
+        self.extension = image_format
+        self.writer = getattr(vtkIOImage, WRITERS[image_format])()
+        self.writer.SetInputConnection(self.grabber.GetOutputPort())
+
+    def setup_camera(self, camera):
+        renderer = self.renderer
+        renderer.ResetCamera()
+        cam = renderer.GetActiveCamera()
+        if camera.get('position') is not None:
+            cam.SetPosition(*camera['position'])
+        if camera.get('focal_point') is not None:
+            cam.SetFocalPoint(*camera['focal_point'])
+        if camera.get('view_up') is not None:
+            cam.SetViewUp(*camera['view_up'])
+        if camera.get('view_angle') is not None:
+            cam.SetViewAngle(camera['view_angle'])
+        cam.Azimuth(camera.get('azimuth', 0.0))
+        cam.Elevation(camera.get('elevation', 0.0))
+        cam.OrthogonalizeViewUp()
+        cam.Zoom(camera.get('zoom', 1.0))
+        renderer.ResetCameraClippingRange()
+
+    def render(self, pose):
+        self.hand.set_pose(pose)
+        self.renwin.Render()
+
+    def write(self, pose, path):
+        self.render(pose)
+        self.grabber.Modified()
+        self.writer.SetFileName(path)
+        self.writer.Write()
+
+    def render_all(self, poses, out_dir, start=0, prefix='pose_'):
+        # writes poses[i] to out_dir/<prefix><start + i>.<ext>, returns the paths
+        os.makedirs(out_dir, exist_ok=True)
+        paths = []
+        for i, pose in enumerate(poses):
+            path = os.path.join(out_dir, '{}{:07d}{}'.format(prefix, start + i, self.extension))
+            self.write(pose, path)
+            paths.append(path)
+        return paths
+
+    def close(self):
+        self.renwin.Finalize()
+
+
+def add_render_arguments(parser):
+    # window, camera and backend options shared by the render CLIs
+    parser.add_argument('--size', nargs=2, type=int, default=(640, 480), metavar=('W', 'H'))
+    parser.add_argument('--hand', help='skeleton spec (JSON) to render, or the name of one in hands/')
+    parser.add_argument('--backend', choices=sorted(BACKENDS), default='auto',
+                        help='offscreen OpenGL window; osmesa needs no GPU or display')
+    parser.add_argument('--format', choices=sorted(WRITERS), default='.png')
+    parser.add_argument('--camera-position', nargs=3, type=float, metavar=('X', 'Y', 'Z'))
+    parser.add_argument('--focal-point', nargs=3, type=float, metavar=('X', 'Y', 'Z'))
+    parser.add_argument('--view-up', nargs=3, type=float, metavar=('X', 'Y', 'Z'))
+    parser.add_argument('--view-angle', type=float)
+    parser.add_argument('--azimuth', type=float, default=0.0)
+    parser.add_argument('--elevation', type=float, default=0.0)
+    parser.add_argument('--zoom', type=float, default=1.0)
+
+
+def camera_from_args(args):
+    return {
+        'position': args.camera_position,
+        'focal_point': args.focal_point,
+        'view_up': args.view_up,
+        'view_angle': args.view_angle,
+        'azimuth': args.azimuth,
+        'elevation': args.elevation,
+        'zoom': args.zoom,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Render hand poses to images without a display.')
+    parser.add_argument('poses', help='.npy, .csv or whitespace separated text, one pose per row')
+    parser.add_argument('-o', '--output', default='frames', help='output directory')
+    add_render_arguments(parser)
+    args = parser.parse_args(argv)
+
+    poses = load_poses(args.poses)
+    renderer = OffscreenRenderer(tuple(args.size), camera_from_args(args), args.backend, args.format,
+                                 args.hand)
+    paths = renderer.render_all(poses, args.output)
+    renderer.close()
+    print('{} images written to {}'.format(len(paths), args.output))
+
+
+if __name__ == '__main__':
+    main()
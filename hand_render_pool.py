@@ -0,0 +1,147 @@
+# ================================================================================
+#   Sharded multi-process offscreen rendering
+#
+#   Splits a pose file into fixed-size shards and renders them on a process
+#   pool. Every worker builds the hand scene once and then renders whole shards
+#   into out/shard_XXXXX/. A shard is marked finished by a DONE file written
+#   after its last image, so re-running the same command only renders the
+#   shards that are missing or failed. A worker that dies (e.g. a crash in the
+#   OpenGL driver) stops the run; its shards and all unfinished ones are
+#   reported as failed instead of waiting for them forever.
+#
+#   python hand_render_pool.py poses.npy -o frames --workers 8 --shard-size 1000
+# ================================================================================
+
+import argparse
+import json
+import multiprocessing
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+import hand_render
+
+DONE_FILE = 'DONE'
+
+# state of the worker process, set up once by _init_worker
+_worker = {}
+
+
+def shard_dir(out_dir, shard):
+    return os.path.join(out_dir, 'shard_{:05d}'.format(shard))
+
+
+def pending_shards(out_dir, count, shard_size):
+    # shards without a DONE marker, i.e. never rendered or interrupted/failed
+    shards = range((count + shard_size - 1) // shard_size)
+    return [s for s in shards if not os.path.exists(os.path.join(shard_dir(out_dir, s), DONE_FILE))]
+
+
+def _init_worker(poses_path, out_dir, shard_size, size, camera, backend, image_format, gl_threads, hand):
+    # software OpenGL spawns its own threads per context; with one process per
+    # core they only compete with each other
+    if gl_threads:
+        os.environ['LP_NUM_THREADS'] = str(gl_threads)
+    _worker['poses'] = hand_render.load_poses(poses_path, mmap=True)
+    _worker['out_dir'] = out_dir
+    _worker['shard_size'] = shard_size
+    _worker['renderer'] = hand_render.OffscreenRenderer(size, camera, backend, image_format, hand)
+
+
+def _render_shard(shard):
+    # renders one shard; returns (shard, frames, seconds, pid, error)
+    start = shard * _worker['shard_size']
+    poses = _worker['poses'][start:start + _worker['shard_size']]
+    out = shard_dir(_worker['out_dir'], shard)
+    t0 = time.perf_counter()
+    try:
+        _worker['renderer'].render_all(poses, out, start=start)
+    except Exception:
+        return shard, 0, time.perf_counter() - t0, os.getpid(), traceback.format_exc()
+
+    seconds = time.perf_counter() - t0
+    with open(os.path.join(out, DONE_FILE), 'w') as f:
+        json.dump({'first': start, 'frames': len(poses), 'seconds': seconds}, f)
+    return shard, len(poses), seconds, os.getpid(), None
+
+
+def render_sharded(poses_path, out_dir, workers=None, shard_size=1000, size=(640, 480),
+                   camera=None, backend='auto', image_format='.png', gl_threads=1, hand=None, log=print):
+    # Renders every pending shard and returns a report with per-worker throughput.
+    # Failed shards are listed in the report and left without a DONE marker.
+    workers = workers or os.cpu_count()
+    count = len(hand_render.load_poses(poses_path, mmap=True))
+    shards = pending_shards(out_dir, count, shard_size)
+    os.makedirs(out_dir, exist_ok=True)
+
+    report = {'poses': count, 'shards': len(shards), 'workers': workers,
+              'frames': 0, 'failed': [], 'per_worker': {}}
+    if not shards:
+        log('nothing to do, all shards of {} are done'.format(out_dir))
+        return report
+
+    # spawn, not fork: every worker needs its own fresh OpenGL context
+    ctx = multiprocessing.get_context('spawn')
+    initargs = (poses_path, out_dir, shard_size, size, camera or {}, backend, image_format, gl_threads, hand)
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(workers, mp_context=ctx, initializer=_init_worker, initargs=initargs) as pool:
+        futures = {pool.submit(_render_shard, shard): shard for shard in shards}
+        for future in as_completed(futures):
+            try:
+                shard, frames, seconds, pid, error = future.result()
+            except BrokenProcessPool as e:
+                # a worker died; the pool fails this and every other unfinished shard
+                shard, error = futures[future], 'worker process died: {}'.format(e)
+            if error:
+                report['failed'].append(shard)
+                log('shard {} failed:\n{}'.format(shard, error))
+                continue
+            worker = report['per_worker'].setdefault(pid, {'frames': 0, 'seconds': 0.0})
+            worker['frames'] += frames
+            worker['seconds'] += seconds
+            report['frames'] += frames
+            log('shard {} done, {} frames in {:.2f} s'.format(shard, frames, seconds))
+    report['seconds'] = time.perf_counter() - t0
+
+    for worker in report['per_worker'].values():
+        worker['fps'] = worker['frames'] / worker['seconds'] if worker['seconds'] else 0.0
+    report['fps'] = report['frames'] / report['seconds'] if report['seconds'] else 0.0
+    return report
+
+
+def print_report(report):
+    print('{} frames from {} shards on {} workers in {:.2f} s: {:.1f} fps total'.format(
+        report['frames'], report['shards'], report['workers'], report.get('seconds', 0.0),
+        report.get('fps', 0.0)))
+    for pid, worker in sorted(report['per_worker'].items()):
+        print('  worker {}: {} frames, {:.1f} fps'.format(pid, worker['frames'], worker['fps']))
+    if report['failed']:
+        print('failed shards (re-run to resume): {}'.format(sorted(report['failed'])))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Render a pose file on a process pool, sharded and resumable.')
+    parser.add_argument('poses', help='.npy (memory-mapped by the workers), .csv or text')
+    parser.add_argument('-o', '--output', default='frames', help='output directory for the shards')
+    parser.add_argument('--workers', type=int, default=None, help='processes, default: all cores')
+    parser.add_argument('--shard-size', type=int, default=1000)
+    parser.add_argument('--gl-threads', type=int, default=1,
+                        help='LP_NUM_THREADS for software OpenGL in each worker, 0 leaves it alone')
+    parser.add_argument('--report', help='also write the throughput report as JSON')
+    hand_render.add_render_arguments(parser)
+    args = parser.parse_args(argv)
+
+    report = render_sharded(args.poses, args.output, args.workers, args.shard_size, tuple(args.size),
+                            hand_render.camera_from_args(args), args.backend, args.format, args.gl_threads,
+                            args.hand)
+    print_report(report)
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+    return 1 if report['failed'] else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -10,71 +10,125 @@
 #   - 하측 버튼(↓): 손가락 펴기, 손목 관절과 각 손가락 관절에 적용 가능
 #   - 좌측 버튼(←): 손가락 벌리기/모으기, 손목 관절과 각 손가락의 첫번째 관절만 적용 가능
 #   - 우측 버튼(←): 손가락 벌리기/모으기, 손목 관절과 각 손가락의 첫번째 관절만 적용 가능
+#   - Shift + 손가락 드래그: 역기구학(IK)으로 손가락 끝이 마우스를 따라감
+#   - n / b: --grasps 로 불러온 파지 자세의 다음/이전
 # ================================================================================
 
-import vtk
+import argparse
+import time
+
+_IMPORT_START = time.perf_counter()
+
+# only the VTK modules in use, not the whole vtk package (most of the cold start);
+# vtkRenderingOpenGL2 registers the render window / renderer implementations and
+# vtkInteractionStyle the default interactor styles
 from vtkmodules.vtkCommonColor import vtkNamedColors
-from vtkmodules.vtkFiltersSources import (
-    vtkSphereSource,
-    vtkCubeSource,
-    vtkCylinderSource
-)
+from vtkmodules.vtkCommonTransforms import vtkTransform
 from vtkmodules.vtkInteractionStyle import vtkInteractorStyleTrackballCamera
 from vtkmodules.vtkRenderingCore import (
     vtkActor,
-    vtkPolyDataMapper,
-    vtkPropPicker,
     vtkProperty,
     vtkRenderWindow,
     vtkRenderWindowInteractor,
     vtkRenderer
 )
+import vtkmodules.vtkRenderingOpenGL2  # noqa: F401
 
+import hand_kinematics
+from hand_collision import SelfCollision
+from hand_geometry import GeometryCache
+from hand_ik import IKDrag
+from hand_picking import AnalyticPicker
+from hand_scheduler import FrameScheduler
+from hand_skeleton import Skeleton
+from hand_startup import StartupReport
 
-colors = vtkNamedColors()
-NUMBER_OF_SPHERES = 10
-
-renderer = vtkRenderer()
-renderer.SetBackground(colors.GetColor3d('White'))
+_IMPORT_END = time.perf_counter()
 
-renwin = vtkRenderWindow()
-renwin.AddRenderer(renderer)
-renwin.SetSize(640, 480)
-renwin.SetWindowName('Final Project_Hand')
 
-# An interactor
-interactor = vtkRenderWindowInteractor()
-interactor.SetRenderWindow(renwin)
+colors = vtkNamedColors()
+NUMBER_OF_SPHERES = 10
 
-thumb_jnt1Actor = vtkActor()
-thumb_jnt2Actor = vtkActor()
-thumb_jnt3Actor = vtkActor()
 
-index_jnt3Actor = vtkActor()
-middle_jnt3Actor = vtkActor()
-ring_jnt3Actor = vtkActor()
-pinky_jnt3Actor = vtkActor()
+class Joint:
+    # A joint keeps its own angles and rebuilds its local matrix from them on every
+    # change, so the transform never grows no matter how many keys were pressed.
+    # The parent transform (SetInput) is left untouched by Identity().
+
+    def __init__(self, transform, pivot, base_angle=0.0, coupling=0.0, spread=False,
+                 flexion_limits=(-180.0, 180.0), spread_limits=(-180.0, 180.0)):
+        self.transform = transform
+        self.pivot = tuple(pivot)
+        self.base_angle = base_angle    # fixed rotation about Z (thumb)
+        self.coupling = coupling        # thumb: flexion also rolls this many deg about Z per deg
+        self.spread = spread            # Left/Right keys spread it (the jnt1 joints)
+        self.flexion_limits = flexion_limits
+        self.spread_limits = spread_limits
+        self.flexion = 0.0              # rotation about X, degrees
+        self.abduction = 0.0            # rotation about Z, degrees
+        self.update()
+
+    def rotate(self, flexion=0.0, abduction=0.0):
+        self.set_angles(self.flexion + flexion, self.abduction + abduction)
+
+    def set_angles(self, flexion, abduction=0.0):
+        # clamped to the joint limits of the skeleton spec
+        self.flexion = min(max(flexion, self.flexion_limits[0]), self.flexion_limits[1])
+        self.abduction = min(max(abduction, self.spread_limits[0]), self.spread_limits[1])
+        self.update()
+
+    def update(self):
+        x, y, z = self.pivot
+        angleZ = self.base_angle + self.abduction + self.flexion * self.coupling
+
+        self.transform.Identity()
+        self.transform.Translate(x, y, z)
+        self.transform.RotateZ(angleZ)
+        self.transform.RotateX(self.flexion)
+        self.transform.Translate(-x, -y, -z)
 
 
 class CustomInteractorStyle(vtkInteractorStyleTrackballCamera):
 
     def __init__(self, parent=None):
-        self.parent = interactor
         self.AddObserver("LeftButtonPressEvent", self.leftButtonPressEvent)
+        self.AddObserver("LeftButtonReleaseEvent", self.leftButtonReleaseEvent)
+        self.AddObserver("MouseMoveEvent", self.mouseMoveEvent)
         self.AddObserver("KeyPressEvent", self.keyPressEvent)
 
+        self.Hand = None
+        self.Picker = None
         self.LastPickedActor = None
         self.LastPickedProperty = vtkProperty()
+        self.HoveredActor = None
+        self.HoveredColor = None
+        self.Scheduler = None
+        self.Player = None
+        self.Recorder = None
+        self.Drag = None
+        self.Metrics = None
+        self.Exporter = None
+        self.Tracer = None
+        self.Object = None
+        self.Control = None
+        self.Channel = None
+        self.Grasps = None          # (k, DOF) poses of --grasps, stepped through with n / b
+        self.GraspIndex = -1
 
 
     def leftButtonPressEvent(self, obj, event):
         clickPos = self.GetInteractor().GetEventPosition()
 
-        picker = vtkPropPicker()
-        picker.Pick(clickPos[0], clickPos[1], 0, self.GetDefaultRenderer())
+        # drop the hover color first so it is not saved as the actor's own
+        self.setHovered(None)
+
+        # Shift + drag on a finger moves its tip (inverse kinematics) instead of the camera
+        if self.Drag is not None and self.GetInteractor().GetShiftKey():
+            if self.Drag.begin(self.Picker.pick(clickPos[0], clickPos[1])):
+                return
 
         # get the new
-        self.NewPickedActor = picker.GetActor()
+        self.NewPickedActor = self.Picker.pick(clickPos[0], clickPos[1])
 
         # If something was selected
         if self.NewPickedActor:
@@ -95,1003 +149,379 @@ class CustomInteractorStyle(vtkInteractorStyleTrackballCamera):
             self.LastPickedActor = self.NewPickedActor
             name = self.LastPickedActor.GetObjectName()
             print('{} was clicked'.format(name))
+            self.requestRender()
 
         self.OnLeftButtonDown()
 
         return
 
-    def rotationTransform(self, actor, angle):
-        transform = self.actor.GetUserTransform()
-        pos = self.actor.GetPosition()
-
-        transform.Translate(pos[0], pos[1], pos[2])
-        transform.RotateX(angle)
-        transform.Translate(-pos[0], -pos[1], -pos[2])
-
-
-
+    def leftButtonReleaseEvent(self, obj, event):
+        if self.Drag is not None and self.Drag.active:
+            self.Drag.end()
+            return
+        self.OnLeftButtonUp()
+
+    def mouseMoveEvent(self, obj, event):
+        if self.Drag is not None and self.Drag.active:
+            pos = self.GetInteractor().GetEventPosition()
+            self.Drag.move(pos[0], pos[1])
+            return
+        # hover highlight, only while no button drags the camera
+        if self.Picker is not None and self.GetState() == 0:
+            pos = self.GetInteractor().GetEventPosition()
+            self.setHovered(self.Picker.pick(pos[0], pos[1]))
+        self.OnMouseMove()
+
+    def setHovered(self, actor):
+        if actor is self.LastPickedActor:
+            actor = None
+        if actor is self.HoveredActor:
+            return
+        if self.HoveredActor is not None:
+            self.HoveredActor.GetProperty().SetColor(self.HoveredColor)
+        self.HoveredActor = actor
+        if actor is not None:
+            self.HoveredColor = actor.GetProperty().GetColor()
+            actor.GetProperty().SetColor(colors.GetColor3d('Orange'))
+        self.requestRender()
 
     def keyPressEvent(self, obj, event):
-        key = self.parent.GetKeySym()
-        transform = self.LastPickedActor.GetUserTransform()
-        pos = self.LastPickedActor.GetPosition()
+        key = self.GetInteractor().GetKeySym()
+        if self.Player is not None and key in ('space', 'bracketleft', 'bracketright'):
+            if key == 'space':
+                self.Player.toggle()
+            else:
+                # [ and ] seek 10 seconds back / ahead
+                self.Player.seek(self.Player.position() + (10 if key == 'bracketright' else -10))
+            return
+        if self.Grasps is not None and key in ('n', 'b'):
+            self.GraspIndex = (self.GraspIndex + (1 if key == 'n' else -1)) % len(self.Grasps)
+            self.applyAngles(*hand_kinematics.split_pose(self.Grasps[self.GraspIndex]))
+            self.requestRender()
+            print('grasp {} of {}'.format(self.GraspIndex + 1, len(self.Grasps)))
+            return
+        if self.LastPickedActor is None:
+            return
         name = self.LastPickedActor.GetObjectName()
-
-        if key == 'Up':
-            i = 0
-            while i >= -2:
-                transform.Translate(pos[0], pos[1], pos[2])
-                if 'jnt' in name:
-                    if 'thumb' in name:
-                        transform.RotateZ(i * 0.3)
-                        transform.RotateX(i)
-                    else:
-                        transform.RotateX(i)
-                transform.Translate(-pos[0], -pos[1], -pos[2])
-                renwin.Render()
-                i -= 2
-            print(key, 'was pressed')
-
-        if key == 'Down':
-            i = 0
-            while i <= 2:
-                transform.Translate(pos[0], pos[1], pos[2])
-                if 'jnt' in name:
-                    if 'thumb' in name:
-                        transform.RotateX(i)
-                        transform.RotateZ(i * 0.3)
-                    else:
-                        transform.RotateX(i)
-                transform.Translate(-pos[0], -pos[1], -pos[2])
-                renwin.Render()
-                i += 2
-            print(key, 'was pressed')
-
-        if key == 'Left':
-            i = 0
-            while i <= 2:
-                if 'jnt1' in name:
-                    transform.Translate(pos[0], pos[1], pos[2])
-                    transform.RotateZ(i)
-                    transform.Translate(-pos[0], -pos[1], -pos[2])
-                renwin.Render()
-                i += 2
-            print(key, 'was pressed')
-
-        if key == 'Right':
-            i = 0
-            while i >= -2:
-                if 'jnt1' in name:
-                    transform.Translate(pos[0], pos[1], pos[2])
-                    transform.RotateZ(i)
-                    transform.Translate(-pos[0], -pos[1], -pos[2])
-                renwin.Render()
-                i -= 2
+        joint = self.Hand.joints.get(name)
+
+        if joint is not None:
+            if key == 'Up':
+                self.Hand.rotate(name, flexion=-2)
+            if key == 'Down':
+                self.Hand.rotate(name, flexion=2)
+            if key == 'Left' and joint.spread:
+                self.Hand.rotate(name, abduction=2)
+            if key == 'Right' and joint.spread:
+                self.Hand.rotate(name, abduction=-2)
+
+        if key in ('Up', 'Down', 'Left', 'Right'):
+            if self.Recorder is not None:
+                self.Recorder.record(self.Hand.get_pose_vector())
+            self.requestRender()
             print(key, 'was pressed')
         return
 
-
-
-
-def main():
+    def applyAngles(self, flexion, abduction):
+        # pose updates from players go through here so they are recorded as well
+        self.Hand.set_joint_angles(flexion, abduction)
+        if self.Recorder is not None:
+            self.Recorder.record(self.Hand.get_pose_vector())
+
+    def requestRender(self):
+        # with a scheduler the frame is drawn on its next tick, coalesced with other changes
+        if self.Scheduler is not None:
+            self.Scheduler.request_render()
+        else:
+            self.GetInteractor().GetRenderWindow().Render()
+
+
+def create_window(size=(640, 480), offscreen=False):
+    # a render window with one white-background renderer, returns both
+    renderer = vtkRenderer()
+    renderer.SetBackground(colors.GetColor3d('White'))
+    renwin = vtkRenderWindow()
+    renwin.AddRenderer(renderer)
+    renwin.SetSize(size[0], size[1])
+    renwin.SetWindowName('Final Project_Hand')
+    if offscreen:
+        # no interactor and no on-screen window; works with OSMesa/EGL builds
+        renwin.SetOffScreenRendering(1)
+    return renwin, renderer
+
+
+class Hand:
+    # One hand in a renderer: owns its transforms, actors and joints, so any number
+    # of them can live side by side. Hands built with the same GeometryCache share
+    # their meshes and mappers.
+
+    def __init__(self, renderer, skeleton=None, geometry=None):
+        self.renderer = renderer
+        self.skeleton = skeleton or hand_kinematics.SKELETON
+        # parts with identical shape and resolution share one mesh and mapper
+        self.geometry = geometry or GeometryCache()
+        self.joints = {}            # name -> Joint
+        self.collisions = None      # hand_collision.SelfCollision that stops rotate() at contacts
+        self.actors = self.build()
+
+    def build(self):
+        # builds every part described by the skeleton spec and fills in joints
+        skeleton = self.skeleton
+        color = {part: colors.GetColor3d(name) for part, name in skeleton.colors.items()}
+
+        # one transform per joint, chained to the parent's (wrist -> jnt1 -> jnt2 -> jnt3)
+        transforms = []
+        for spec in skeleton.joints:
+            transform = vtkTransform()
+            if spec['parent'] is not None:
+                transform.SetInput(transforms[hand_kinematics.JOINT_NAMES.index(spec['parent'])])
+            transforms.append(transform)
+
+            # every joint rebuilds its transform from its angles, the thumb base rotations included
+            self.joints[spec['name']] = Joint(transform, tuple(map(float, spec['position'])),
+                                              spec['base_angle'], spec['coupling'], spec['spread'],
+                                              spec['flexion_limits'], spec['spread_limits'])
+
+        # palm and carpal bars, then the spheres, bones and tips
+        actors = []
+        for part in skeleton.parts():
+            actor = vtkActor()
+            actor.SetMapper(self.geometry.get(part['kind'], part['size'], part['resolution'])[1])
+            actor.SetUserTransform(transforms[part['joint']])
+            actor.GetProperty().SetColor(color[part['color']])
+            if part['name']:
+                actor.SetObjectName(part['name'])
+            actor.SetPosition(*part['position'])
+            if part['angle']:
+                actor.SetOrigin(*part['pivot'])
+                actor.RotateZ(part['angle'])
+            actors.append(actor)
+
+        for actor in actors:
+            self.renderer.AddActor(actor)
+        return actors
+
+    def get_pose(self):
+        # current (flexion, abduction) of every joint, read straight from the joint state
+        return {name: (joint.flexion, joint.abduction) for name, joint in self.joints.items()}
+
+    def get_pose_vector(self):
+        # the current pose in the hand_kinematics.DOF_NAMES layout
+        flexion = [self.joints[name].flexion for name in hand_kinematics.JOINT_NAMES]
+        abduction = [self.joints[name].abduction for name in hand_kinematics.JOINT_NAMES]
+        return hand_kinematics.join_pose(flexion, abduction)
+
+    def set_pose(self, pose):
+        # apply a pose vector in the hand_kinematics.DOF_NAMES layout
+        self.set_joint_angles(*hand_kinematics.split_pose(pose))
+
+    def joint_matrices(self):
+        # world transforms of all joints, (16, 4, 4) in hand_kinematics.JOINT_NAMES order
+        flexion = [self.joints[name].flexion for name in hand_kinematics.JOINT_NAMES]
+        abduction = [self.joints[name].abduction for name in hand_kinematics.JOINT_NAMES]
+        return hand_kinematics.joint_transforms(flexion, abduction, self.skeleton)
+
+    def rotate(self, name, flexion=0.0, abduction=0.0):
+        # one step of one joint (arrow keys), cut short at the first contact
+        joint = self.joints[name]
+        if self.collisions is None:
+            joint.rotate(flexion, abduction)
+            return
+        start = self.get_pose_vector()
+        flexion0, abduction0 = joint.flexion, joint.abduction
+        joint.rotate(flexion, abduction)
+        t = self.collisions.fraction(start, self.get_pose_vector())
+        if t < 1.0:
+            joint.set_angles(flexion0 + t * (joint.flexion - flexion0),
+                             abduction0 + t * (joint.abduction - abduction0))
+
+    def set_joint_angles(self, flexion, abduction):
+        # flexion/abduction of all joints in hand_kinematics.JOINT_NAMES order
+        for i, name in enumerate(hand_kinematics.JOINT_NAMES):
+            self.joints[name].set_angles(flexion[i], abduction[i])
+
+
+def make_parser():
+    parser = argparse.ArgumentParser(description='3D robotic hand, click a joint and use the arrow keys.')
+    parser.add_argument('--hand', help='skeleton spec (JSON) to build, or the name of one in hands/')
+    parser.add_argument('--max-fps', type=float, default=60, help='upper bound of frames drawn per second')
+    playback = parser.add_mutually_exclusive_group()
+    playback.add_argument('--clip', help='keyframe clip (JSON) to play, space pauses/resumes')
+    playback.add_argument('--replay', help='pose recording to stream, space pauses/resumes, [ ] seek')
+    parser.add_argument('--seek', type=float, default=0.0, help='start playback this many seconds in')
+    parser.add_argument('--record', help='append every pose change to this recording file')
+    parser.add_argument('--lod', action='store_true',
+                        help='coarser spheres/cylinders when small on screen, slow or while rotating')
+    parser.add_argument('--frame-budget', type=float, default=1000 / 60.0,
+                        help='target frame time in ms for --lod')
+    parser.add_argument('--skinned', action='store_true',
+                        help='draw the hand as one skinned mesh instead of one actor per part')
+    parser.add_argument('--no-collisions', action='store_true',
+                        help='let arrow keys and drags move fingers through each other')
+    parser.add_argument('--object', metavar='MESH',
+                        help='object mesh (STL, OBJ or VTP) to grasp, contacts are printed as they change')
+    parser.add_argument('--object-offset', type=float, nargs=3, default=(0.0, 0.0, 0.0), metavar=('X', 'Y', 'Z'),
+                        help='move the object by this much (hand coordinates)')
+    parser.add_argument('--contact-tolerance', type=float, default=0.25,
+                        help='gap to the object that counts as a contact, as hand_grasp.py --tolerance')
+    parser.add_argument('--grasps', metavar='NPY',
+                        help='poses from hand_grasp.py, n / b step to the next / previous one')
+    parser.add_argument('--control', type=int, nargs='?', const=7450, metavar='PORT',
+                        help='accept joint commands as JSON lines on localhost:PORT (default 7450)')
+    parser.add_argument('--shm', metavar='NAME',
+                        help='create a shared-memory pose channel NAME and show the newest pose every frame')
+    parser.add_argument('--hud', action='store_true',
+                        help='overlay frame, render, event and pick time percentiles')
+    parser.add_argument('--metrics', metavar='PATH',
+                        help='export the same percentiles every second: .prom (Prometheus text) or CSV')
+    parser.add_argument('--trace', metavar='PATH',
+                        help='write input-to-frame spans as Chrome trace-event JSON')
+    parser.add_argument('--startup', action='store_true', help='quit after the first frame (startup timing)')
+    return parser
+
+
+def build_app(args, startup=None, offscreen=False):
+    # everything main() sets up before the first frame: window, interactor, style,
+    # hand and the features selected by args; returns (renwin, interactor, style).
+    # offscreen uses a generic interactor that needs no display (benchmarks).
+    startup = startup or StartupReport()
+    renwin, renderer = create_window(offscreen=offscreen)
+
+    # An interactor
+    if offscreen:
+        from vtkmodules.vtkRenderingUI import vtkGenericRenderWindowInteractor
+        interactor = vtkGenericRenderWindowInteractor()
+    else:
+        interactor = vtkRenderWindowInteractor()
+    interactor.SetRenderWindow(renwin)
 
     # add the custom style
     style = CustomInteractorStyle()
     style.SetDefaultRenderer(renderer)
     interactor.SetInteractorStyle(style)
-
-    #======================================== palm ========================================
-
-    palm = vtkCubeSource()
-    palm.SetXLength(12.5)
-    palm.SetYLength(10)
-    palm.SetZLength(1)
-
-    palmMapper = vtkPolyDataMapper()
-    palmMapper.SetInputConnection(palm.GetOutputPort())
-
-    palmTransform = vtk.vtkTransform()
-    palmActor = vtkActor()
-    palmActor.SetUserTransform(palmTransform)
-    palmActor.SetMapper(palmMapper)
-    palmActor.GetProperty().SetColor(colors.GetColor3d("RoyalBLue"))
-
-    palmPos = palmActor.GetPosition()
-
-    # carpal1
-    carpal1 = vtkCubeSource()
-    carpal1.SetXLength(1)
-    carpal1.SetYLength(12)
-    carpal1.SetZLength(1)
-
-    carpal1Mapper = vtkPolyDataMapper()
-    carpal1Mapper.SetInputConnection(carpal1.GetOutputPort())
-
-    carpal1Actor = vtkActor()
-    carpal1Actor.SetOrigin(palmPos[0], palmPos[1] - palm.GetYLength() / 2, palmPos[2])
-    carpal1Actor.RotateZ(25)
-    carpal1Actor.SetUserTransform(palmTransform)
-    carpal1Actor.SetMapper(carpal1Mapper)
-    carpal1Actor.GetProperty().SetColor(colors.GetColor3d("RoyalBLue"))
-
-    # carpal2
-    carpal2 = vtkCubeSource()
-    carpal2.SetXLength(1)
-    carpal2.SetYLength(12)
-    carpal2.SetZLength(1)
-
-    carpal2Mapper = vtkPolyDataMapper()
-    carpal2Mapper.SetInputConnection(carpal2.GetOutputPort())
-
-    carpal2Actor = vtkActor()
-    carpal2Actor.SetOrigin(palmPos[0], palmPos[1] - palm.GetYLength() / 2, palmPos[2])
-    carpal2Actor.RotateZ(7.5)
-    carpal2Actor.SetUserTransform(palmTransform)
-    carpal2Actor.SetMapper(carpal2Mapper)
-    carpal2Actor.GetProperty().SetColor(colors.GetColor3d("RoyalBLue"))
-
-    carpal1Actor.SetPosition(palmPos[0], palmPos[1], palmPos[2])
-
-    # carpal3
-    carpal3 = vtkCubeSource()
-    carpal3.SetXLength(1)
-    carpal3.SetYLength(12)
-    carpal3.SetZLength(1)
-
-    carpal3Mapper = vtkPolyDataMapper()
-    carpal3Mapper.SetInputConnection(carpal3.GetOutputPort())
-
-    carpal3Actor = vtkActor()
-    carpal3Actor.SetOrigin(palmPos[0], palmPos[1] - palm.GetYLength() / 2, palmPos[2])
-    carpal3Actor.RotateZ(-7.5)
-    carpal3Actor.SetUserTransform(palmTransform)
-    carpal3Actor.SetMapper(carpal3Mapper)
-    carpal3Actor.GetProperty().SetColor(colors.GetColor3d("RoyalBLue"))
-
-    # carpal4
-    carpal4 = vtkCubeSource()
-    carpal4.SetXLength(1)
-    carpal4.SetYLength(12)
-    carpal4.SetZLength(1)
-
-    carpal4Mapper = vtkPolyDataMapper()
-    carpal4Mapper.SetInputConnection(carpal4.GetOutputPort())
-
-    carpal4Actor = vtkActor()
-    carpal4Actor.SetOrigin(palmPos[0], palmPos[1] - palm.GetYLength() / 2, palmPos[2])
-    carpal4Actor.RotateZ(-25)
-    carpal4Actor.SetUserTransform(palmTransform)
-    carpal4Actor.SetMapper(carpal4Mapper)
-    carpal4Actor.GetProperty().SetColor(colors.GetColor3d("RoyalBLue"))
-
-    # carpal0
-    carpal0 = vtkCubeSource()
-    carpal0.SetXLength(1)
-    carpal0.SetYLength(6)
-    carpal0.SetZLength(1)
-
-    carpal0Mapper = vtkPolyDataMapper()
-    carpal0Mapper.SetInputConnection(carpal0.GetOutputPort())
-
-    carpal0Actor = vtkActor()
-    carpal0Actor.SetOrigin(palmPos[0] + 1.5, palmPos[1] - palm.GetYLength() / 2, palmPos[2])
-    carpal0Actor.RotateZ(80)
-    carpal0Actor.SetUserTransform(palmTransform)
-    carpal0Actor.SetMapper(carpal0Mapper)
-    carpal0Actor.GetProperty().SetColor(colors.GetColor3d("RoyalBLue"))
-
-    # wrist jnt
-    wrist_jnt = vtkSphereSource()
-    wrist_jnt.SetRadius(1.75)
-    wrist_jnt.SetPhiResolution(20)
-    wrist_jnt.SetThetaResolution(20)
-
-    wrist_jntMapper = vtkPolyDataMapper()
-    wrist_jntMapper.SetInputConnection(wrist_jnt.GetOutputPort())
-
-    wrist_jntActor = vtkActor()
-    wrist_jntActor.SetUserTransform(palmTransform)
-    wrist_jntActor.SetMapper(wrist_jntMapper)
-    wrist_jntActor.SetObjectName('wrist_jnt')
-    wrist_jntActor.GetProperty().SetColor(colors.GetColor3d('Grey'))
-
-    wrist_jntActor.SetPosition(palmPos[0], palmPos[1] - palm.GetYLength() * 0.6, palmPos[2])
-
-
-    #==================================== finger_jnt1 ====================================
-
-    # index_jnt1
-    index_jnt1 = vtkSphereSource()
-    index_jnt1.SetRadius(1.5)
-    index_jnt1.SetPhiResolution(20)
-    index_jnt1.SetThetaResolution(20)
-
-    index_jnt1Mapper = vtkPolyDataMapper()
-    index_jnt1Mapper.SetInputConnection(index_jnt1.GetOutputPort())
-
-    index_jnt1Transform = vtk.vtkTransform()
-    index_jnt1Transform.SetInput(palmTransform)
-
-    index_jnt1Actor = vtkActor()
-    index_jnt1Actor.SetUserTransform(index_jnt1Transform)
-    index_jnt1Actor.SetMapper(index_jnt1Mapper)
-    index_jnt1Actor.SetObjectName('index_jnt1')
-    index_jnt1Actor.GetProperty().SetColor(colors.GetColor3d('Grey'))
-
-    index_jnt1Actor.SetPosition(palmPos[0] - palm.GetXLength()/2 + index_jnt1.GetRadius(),
-                                palmPos[1] + palm.GetYLength()/2 + index_jnt1.GetRadius() * 0.75,
-                                palmPos[2])
-
-    # middle_jnt1
-    middle_jnt1 = vtkSphereSource()
-    middle_jnt1.SetRadius(1.5)
-    middle_jnt1.SetPhiResolution(20)
-    middle_jnt1.SetThetaResolution(20)
-
-    middle_jnt1Mapper = vtkPolyDataMapper()
-    middle_jnt1Mapper.SetInputConnection(middle_jnt1.GetOutputPort())
-
-    middle_jnt1Transform = vtk.vtkTransform()
-    middle_jnt1Transform.SetInput(palmTransform)
-
-    middle_jnt1Actor = vtkActor()
-    middle_jnt1Actor.SetUserTransform(middle_jnt1Transform)
-    middle_jnt1Actor.SetMapper(middle_jnt1Mapper)
-    middle_jnt1Actor.SetObjectName('middle_jnt1')
-    middle_jnt1Actor.GetProperty().SetColor(colors.GetColor3d('Grey'))
-
-    middle_jnt1Actor.SetPosition(palmPos[0] - palm.GetXLength() * 0.25 + index_jnt1.GetRadius(), palmPos[1] + palm.GetYLength() / 2 + middle_jnt1.GetRadius() * 0.75, palmPos[2])
-
-    # ring_jnt1
-    ring_jnt1 = vtkSphereSource()
-    ring_jnt1.SetRadius(1.5)
-    ring_jnt1.SetPhiResolution(20)
-    ring_jnt1.SetThetaResolution(20)
-
-    ring_jnt1Mapper = vtkPolyDataMapper()
-    ring_jnt1Mapper.SetInputConnection(ring_jnt1.GetOutputPort())
-
-    ring_jnt1Transform = vtk.vtkTransform()
-    ring_jnt1Transform.SetInput(palmTransform)
-
-    ring_jnt1Actor = vtkActor()
-    ring_jnt1Actor.SetUserTransform(ring_jnt1Transform)
-    ring_jnt1Actor.SetMapper(ring_jnt1Mapper)
-    ring_jnt1Actor.SetObjectName('ring_jnt1')
-    ring_jnt1Actor.GetProperty().SetColor(colors.GetColor3d('Grey'))
-
-    ring_jnt1Actor.SetPosition(palmPos[0] + palm.GetXLength() * 0.25 - index_jnt1.GetRadius(),
-                               palmPos[1] + palm.GetYLength() / 2 + ring_jnt1.GetRadius() * 0.75,
-                               palmPos[2])
-
-    # pinky_jnt1
-    pinky_jnt1 = vtkSphereSource()
-    pinky_jnt1.SetRadius(1.5)
-    pinky_jnt1.SetPhiResolution(20)
-    pinky_jnt1.SetThetaResolution(20)
-
-    pinky_jnt1Mapper = vtkPolyDataMapper()
-    pinky_jnt1Mapper.SetInputConnection(pinky_jnt1.GetOutputPort())
-
-    pinky_jnt1Transform = vtk.vtkTransform()
-    pinky_jnt1Transform.SetInput(palmTransform)
-
-    pinky_jnt1Actor = vtkActor()
-    pinky_jnt1Actor.SetUserTransform(pinky_jnt1Transform)
-    pinky_jnt1Actor.SetMapper(pinky_jnt1Mapper)
-    pinky_jnt1Actor.SetObjectName('pinky_jnt1')
-    pinky_jnt1Actor.GetProperty().SetColor(colors.GetColor3d('Grey'))
-
-    pinky_jnt1Actor.SetPosition(palmPos[0] + palm.GetXLength() / 2 - pinky_jnt1.GetRadius(),
-                             palmPos[1] + palm.GetYLength() / 2 + pinky_jnt1.GetRadius() * 0.75,
-                             palmPos[2])
-
-    # thumb_jnt1
-    thumb_jnt1 = vtkSphereSource()
-    thumb_jnt1.SetRadius(1.5)
-    thumb_jnt1.SetPhiResolution(20)
-    thumb_jnt1.SetThetaResolution(20)
-
-    thumb_jnt1Mapper = vtkPolyDataMapper()
-    thumb_jnt1Mapper.SetInputConnection(thumb_jnt1.GetOutputPort())
-
-    thumb_jnt1Transform = vtk.vtkTransform()
-    thumb_jnt1Transform.SetInput(palmTransform)
-
-    # thumb_jnt1Actor = vtkActor()
-    thumb_jnt1Actor.SetUserTransform(thumb_jnt1Transform)
-    thumb_jnt1Actor.SetMapper(thumb_jnt1Mapper)
-    thumb_jnt1Actor.SetObjectName('thumb_jnt1')
-    thumb_jnt1Actor.GetProperty().SetColor(colors.GetColor3d('Grey'))
-
-    thumb_jnt1Actor.SetPosition(palmPos[0] - palm.GetXLength() / 2 + thumb_jnt1.GetRadius() * 0.5, palmPos[1] - palm.GetYLength() / 2, palmPos[2])
-
-    thumb_jnt1Pos = thumb_jnt1Actor.GetPosition()
-    thumb_jnt1Transform.Translate(thumb_jnt1Pos[0], thumb_jnt1Pos[1], thumb_jnt1Pos[2])
-    thumb_jnt1Transform.RotateZ(35)
-    thumb_jnt1Transform.Translate(-thumb_jnt1Pos[0], -thumb_jnt1Pos[1], -thumb_jnt1Pos[2])
-
-
-    #====================================== finger1 ======================================
-
-    # index1
-    index1 = vtkCylinderSource()
-    index1.SetRadius(1.5)
-    index1.SetHeight(4.5)
-    index1.SetResolution(20)
-
-    index1Mapper = vtkPolyDataMapper()
-    index1Mapper.SetInputConnection(index1.GetOutputPort())
-
-    index1Actor = vtkActor()
-    index1Actor.SetUserTransform(index_jnt1Transform)
-    index1Actor.SetMapper(index1Mapper)
-    index1Actor.GetProperty().SetColor(colors.GetColor3d("RoyalBLue"))
-
-    index_jnt1Pos = index_jnt1Actor.GetPosition()
-    index1Actor.SetPosition(index_jnt1Pos[0],
-                         index_jnt1Pos[1] + index_jnt1.GetRadius() / 2 + index1.GetHeight() / 2,
-                         index_jnt1Pos[2])
-
-    # middle1
-    middle1 = vtkCylinderSource()
-    middle1.SetRadius(1.5)
-    middle1.SetHeight(5)
-    middle1.SetResolution(20)
-
-    middle1Mapper = vtkPolyDataMapper()
-    middle1Mapper.SetInputConnection(middle1.GetOutputPort())
-
-    middle1Actor = vtkActor()
-    middle1Actor.SetUserTransform(middle_jnt1Transform)
-    middle1Actor.SetMapper(middle1Mapper)
-    middle1Actor.GetProperty().SetColor(colors.GetColor3d("RoyalBLue"))
-
-    middle_jnt1Pos = middle_jnt1Actor.GetPosition()
-    middle1Actor.SetPosition(middle_jnt1Pos[0],
-                             middle_jnt1Pos[1] + middle_jnt1.GetRadius() / 2 + middle1.GetHeight() / 2,
-                             middle_jnt1Pos[2])
-
-    # ring1
-    ring1 = vtkCylinderSource()
-    ring1.SetRadius(1.5)
-    ring1.SetHeight(4.5)
-    ring1.SetResolution(20)
-
-    ring1Mapper = vtkPolyDataMapper()
-    ring1Mapper.SetInputConnection(ring1.GetOutputPort())
-
-    ring1Actor = vtkActor()
-    ring1Actor.SetUserTransform(ring_jnt1Transform)
-    ring1Actor.SetMapper(ring1Mapper)
-    ring1Actor.GetProperty().SetColor(colors.GetColor3d("RoyalBLue"))
-
-    ring_jnt1Pos = ring_jnt1Actor.GetPosition()
-    ring1Actor.SetPosition(ring_jnt1Pos[0],
-                           ring_jnt1Pos[1] + ring_jnt1.GetRadius() / 2 + ring1.GetHeight()/2,
-                           ring_jnt1Pos[2])
-
-    # pinky1
-    pinky1 = vtkCylinderSource()
-    pinky1.SetRadius(1.5)
-    pinky1.SetHeight(3.5)
-    pinky1.SetResolution(20)
-
-    pinky1Mapper = vtkPolyDataMapper()
-    pinky1Mapper.SetInputConnection(pinky1.GetOutputPort())
-
-    pinky1Actor = vtkActor()
-    pinky1Actor.SetUserTransform(pinky_jnt1Transform)
-    pinky1Actor.SetMapper(pinky1Mapper)
-    pinky1Actor.GetProperty().SetColor(colors.GetColor3d("RoyalBLue"))
-
-    pinky_jnt1Pos = pinky_jnt1Actor.GetPosition()
-    pinky1Actor.SetPosition(pinky_jnt1Pos[0],
-                        pinky_jnt1Pos[1] + pinky_jnt1.GetRadius() / 2 + pinky1.GetHeight() / 2,
-                        pinky_jnt1Pos[2])
-    
-    # thumb1
-    thumb1 = vtkCylinderSource()
-    thumb1.SetRadius(1.5)
-    thumb1.SetHeight(3)
-    thumb1.SetResolution(20)
-
-    thumb1Mapper = vtkPolyDataMapper()
-    thumb1Mapper.SetInputConnection(thumb1.GetOutputPort())
-
-    thumb1Actor = vtkActor()
-    thumb1Actor.SetUserTransform(thumb_jnt1Transform)
-    thumb1Actor.SetMapper(thumb1Mapper)
-    thumb1Actor.GetProperty().SetColor(colors.GetColor3d("RoyalBLue"))
-
-    thumb1Actor.SetPosition(thumb_jnt1Pos[0],
-                        thumb_jnt1Pos[1] + thumb_jnt1.GetRadius() / 2 + thumb1.GetHeight() / 2,
-                        thumb_jnt1Pos[2])
-
-
-    #==================================== finger_jnt2 ====================================
-
-    # index_jnt2
-    index_jnt2 = vtkSphereSource()
-    index_jnt2.SetRadius(1.5)
-    index_jnt2.SetPhiResolution(20)
-    index_jnt2.SetThetaResolution(20)
-
-    index_jnt2Mapper = vtkPolyDataMapper()
-    index_jnt2Mapper.SetInputConnection(index_jnt2.GetOutputPort())
-
-    index_jnt2Transform = vtk.vtkTransform()
-    index_jnt2Transform.SetInput(index_jnt1Transform)
-
-    index_jnt2Actor = vtkActor()
-    index_jnt2Actor.SetUserTransform(index_jnt2Transform)
-    index_jnt2Actor.SetMapper(index_jnt2Mapper)
-    index_jnt2Actor.SetObjectName('index_jnt2')
-    index_jnt2Actor.GetProperty().SetColor(colors.GetColor3d('Grey'))
-
-    index1Pos = index1Actor.GetPosition()
-    index_jnt2Actor.SetPosition(index1Pos[0],
-                         index1Pos[1] + index1.GetHeight() / 2 + index_jnt2.GetRadius() * 0.75,
-                         index1Pos[2])
-
-    # middle_jnt2
-    middle_jnt2 = vtkSphereSource()
-    middle_jnt2.SetRadius(1.5)
-    middle_jnt2.SetPhiResolution(20)
-    middle_jnt2.SetThetaResolution(20)
-
-    middle_jnt2Mapper = vtkPolyDataMapper()
-    middle_jnt2Mapper.SetInputConnection(middle_jnt2.GetOutputPort())
-
-    middle_jnt2Transform = vtk.vtkTransform()
-    middle_jnt2Transform.SetInput(middle_jnt1Transform)
-
-    middle_jnt2Actor = vtkActor()
-    middle_jnt2Actor.SetUserTransform(middle_jnt2Transform)
-    middle_jnt2Actor.SetMapper(middle_jnt2Mapper)
-    middle_jnt2Actor.SetObjectName('middle_jnt2')
-    middle_jnt2Actor.GetProperty().SetColor(colors.GetColor3d('Grey'))
-
-    middle1Pos = middle1Actor.GetPosition()
-    middle_jnt2Actor.SetPosition(middle1Pos[0],
-                       middle1Pos[1] + middle1.GetHeight() / 2 + middle_jnt2.GetRadius() * 0.75,
-                       middle1Pos[2])
-
-    # ring_jnt2
-    ring_jnt2 = vtkSphereSource()
-    ring_jnt2.SetRadius(1.5)
-    ring_jnt2.SetPhiResolution(20)
-    ring_jnt2.SetThetaResolution(20)
-
-    ring_jnt2Mapper = vtkPolyDataMapper()
-    ring_jnt2Mapper.SetInputConnection(ring_jnt2.GetOutputPort())
-
-    ring_jnt2Transform = vtk.vtkTransform()
-    ring_jnt2Transform.SetInput(ring_jnt1Transform)
-
-    ring_jnt2Actor = vtkActor()
-    ring_jnt2Actor.SetUserTransform(ring_jnt2Transform)
-    ring_jnt2Actor.SetMapper(ring_jnt2Mapper)
-    ring_jnt2Actor.SetObjectName('ring_jnt2')
-    ring_jnt2Actor.GetProperty().SetColor(colors.GetColor3d('Grey'))
-
-    ring1Pos = ring1Actor.GetPosition()
-    ring_jnt2Actor.SetPosition(ring1Pos[0],
-                          ring1Pos[1] + ring1.GetHeight() / 2 + ring_jnt2.GetRadius() * 0.75,
-                          ring1Pos[2])
-
-    # pinky_jnt2
-    pinky_jnt2 = vtkSphereSource()
-    pinky_jnt2.SetRadius(1.5)
-    pinky_jnt2.SetPhiResolution(20)
-    pinky_jnt2.SetThetaResolution(20)
-
-    pinky_jnt2Mapper = vtkPolyDataMapper()
-    pinky_jnt2Mapper.SetInputConnection(pinky_jnt2.GetOutputPort())
-
-    pinky_jnt2Transform = vtk.vtkTransform()
-    pinky_jnt2Transform.SetInput(pinky_jnt1Transform)
-
-    pinky_jnt2Actor = vtkActor()
-    pinky_jnt2Actor.SetUserTransform(pinky_jnt2Transform)
-    pinky_jnt2Actor.SetMapper(pinky_jnt2Mapper)
-    pinky_jnt2Actor.SetObjectName('pinky_jnt2')
-    pinky_jnt2Actor.GetProperty().SetColor(colors.GetColor3d('Grey'))
-
-    pinky1Pos = pinky1Actor.GetPosition()
-    pinky_jnt2Actor.SetPosition(pinky1Pos[0],
-                          pinky1Pos[1] + pinky1.GetHeight() / 2 + pinky_jnt2.GetRadius() * 0.75,
-                          pinky1Pos[2])
-
-    # thumb_jnt2
-    thumb_jnt2 = vtkSphereSource()
-    thumb_jnt2.SetRadius(1.5)
-    thumb_jnt2.SetPhiResolution(20)
-    thumb_jnt2.SetThetaResolution(20)
-
-    thumb_jnt2Mapper = vtkPolyDataMapper()
-    thumb_jnt2Mapper.SetInputConnection(thumb_jnt2.GetOutputPort())
-
-    thumb_jnt2Transform = vtk.vtkTransform()
-    thumb_jnt2Transform.SetInput(thumb_jnt1Transform)
-
-    # thumb_jnt2Actor = vtkActor()
-    thumb_jnt2Actor.SetUserTransform(thumb_jnt2Transform)
-    thumb_jnt2Actor.SetMapper(thumb_jnt2Mapper)
-    thumb_jnt2Actor.SetObjectName('thumb_jnt2')
-    thumb_jnt2Actor.GetProperty().SetColor(colors.GetColor3d('Grey'))
-
-    thumb1Pos = thumb1Actor.GetPosition()
-    thumb_jnt2Actor.SetPosition(thumb1Pos[0],
-                           thumb1Pos[1] + thumb1.GetHeight() / 2 + thumb_jnt2.GetRadius() * 0.75,
-                           thumb1Pos[2])
-
-    thumb_jnt2Pos = thumb_jnt2Actor.GetPosition()
-    thumb_jnt2Transform.Translate(thumb_jnt2Pos[0], thumb_jnt2Pos[1], thumb_jnt2Pos[2])
-    thumb_jnt2Transform.RotateZ(-15)
-    thumb_jnt2Transform.Translate(-thumb_jnt2Pos[0], -thumb_jnt2Pos[1], -thumb_jnt2Pos[2])
-
-
-    # ====================================== finger2 ======================================
-
-    # index2
-    index2 = vtkCylinderSource()
-    index2.SetRadius(1.5)
-    index2.SetHeight(3.5)
-    index2.SetResolution(20)
-
-    index2Mapper = vtkPolyDataMapper()
-    index2Mapper.SetInputConnection(index2.GetOutputPort())
-
-    index2Actor = vtkActor()
-    index2Actor.SetUserTransform(index_jnt2Transform)
-    index2Actor.SetMapper(index2Mapper)
-    index2Actor.GetProperty().SetColor(colors.GetColor3d("RoyalBLue"))
-
-    index_jnt2Pos = index_jnt2Actor.GetPosition()
-    index2Actor.SetPosition(index_jnt2Pos[0],
-                         index_jnt2Pos[1] + index_jnt2.GetRadius() / 2 + index2.GetHeight() / 2,
-                         index_jnt2Pos[2])
-
-    # middle2
-    middle2 = vtkCylinderSource()
-    middle2.SetRadius(1.5)
-    middle2.SetHeight(4)
-    middle2.SetResolution(20)
-
-    middle2Mapper = vtkPolyDataMapper()
-    middle2Mapper.SetInputConnection(middle2.GetOutputPort())
-
-    middle2Actor = vtkActor()
-    middle2Actor.SetUserTransform(middle_jnt2Transform)
-    middle2Actor.SetMapper(middle2Mapper)
-    middle2Actor.GetProperty().SetColor(colors.GetColor3d("RoyalBLue"))
-
-    middle_jnt2Pos = middle_jnt2Actor.GetPosition()
-    middle2Actor.SetPosition(middle_jnt2Pos[0],
-                      middle_jnt2Pos[1] + middle_jnt2.GetRadius() / 2 + middle2.GetHeight() / 2,
-                      middle_jnt2Pos[2])
-
-    # ring2
-    ring2 = vtkCylinderSource()
-    ring2.SetRadius(1.5)
-    ring2.SetHeight(3.5)
-    ring2.SetResolution(20)
-
-    ring2Mapper = vtkPolyDataMapper()
-    ring2Mapper.SetInputConnection(ring2.GetOutputPort())
-
-    ring2Actor = vtkActor()
-    ring2Actor.SetUserTransform(ring_jnt2Transform)
-    ring2Actor.SetMapper(ring2Mapper)
-    ring2Actor.GetProperty().SetColor(colors.GetColor3d("RoyalBLue"))
-
-    ring_jnt2Pos = ring_jnt2Actor.GetPosition()
-    ring2Actor.SetPosition(ring_jnt2Pos[0],
-                           ring_jnt2Pos[1] + ring_jnt2.GetRadius() / 2 + ring2.GetHeight() / 2,
-                           ring_jnt2Pos[2])
-
-    # pinky2
-    pinky2 = vtkCylinderSource()
-    pinky2.SetRadius(1.5)
-    pinky2.SetHeight(3)
-    pinky2.SetResolution(20)
-
-    pinky2Mapper = vtkPolyDataMapper()
-    pinky2Mapper.SetInputConnection(pinky2.GetOutputPort())
-
-    pinky2Actor = vtkActor()
-    pinky2Actor.SetUserTransform(pinky_jnt2Transform)
-    pinky2Actor.SetMapper(pinky2Mapper)
-    pinky2Actor.GetProperty().SetColor(colors.GetColor3d("RoyalBLue"))
-
-    pinky_jnt2Pos = pinky_jnt2Actor.GetPosition()
-    pinky2Actor.SetPosition(pinky_jnt2Pos[0],
-                         pinky_jnt2Pos[1] + pinky_jnt2.GetRadius() / 2 + pinky2.GetHeight() / 2,
-                         pinky_jnt2Pos[2])
-    
-    # thumb2
-    thumb2 = vtkCylinderSource()
-    thumb2.SetRadius(1.5)
-    thumb2.SetHeight(3)
-    thumb2.SetResolution(20)
-
-    thumb2Mapper = vtkPolyDataMapper()
-    thumb2Mapper.SetInputConnection(thumb2.GetOutputPort())
-
-    thumb2Actor = vtkActor()
-    thumb2Actor.SetUserTransform(thumb_jnt2Transform)
-    thumb2Actor.SetMapper(thumb2Mapper)
-    thumb2Actor.GetProperty().SetColor(colors.GetColor3d("RoyalBLue"))
-
-    thumb2Actor.SetPosition(thumb_jnt2Pos[0],
-                       thumb_jnt2Pos[1] + thumb_jnt2.GetRadius() / 2 + thumb2.GetHeight() / 2,
-                       thumb_jnt2Pos[2])
-
-
-    # ==================================== finger_jnt3 ====================================
-
-    # index_jnt3
-    index_jnt3 = vtkSphereSource()
-    index_jnt3.SetRadius(1.5)
-    index_jnt3.SetPhiResolution(20)
-    index_jnt3.SetThetaResolution(20)
-
-    index_jnt3Mapper = vtkPolyDataMapper()
-    index_jnt3Mapper.SetInputConnection(index_jnt3.GetOutputPort())
-
-    index_jnt3Transform = vtk.vtkTransform()
-    index_jnt3Transform.SetInput(index_jnt2Transform)
-
-    # index_jnt3Actor = vtkActor()
-    index_jnt3Actor.SetUserTransform(index_jnt3Transform)
-    index_jnt3Actor.SetMapper(index_jnt3Mapper)
-    index_jnt3Actor.SetObjectName('index_jnt3')
-    index_jnt3Actor.GetProperty().SetColor(colors.GetColor3d('Grey'))
-
-    index2Pos = index2Actor.GetPosition()
-    index_jnt3Actor.SetPosition(index2Pos[0],
-                          index2Pos[1] + index2.GetHeight() / 2 + index_jnt3.GetRadius() * 0.75,
-                          index2Pos[2])
-
-
-    # middle_jnt3
-    middle_jnt3 = vtkSphereSource()
-    middle_jnt3.SetRadius(1.5)
-    middle_jnt3.SetPhiResolution(20)
-    middle_jnt3.SetThetaResolution(20)
-
-    middle_jnt3Mapper = vtkPolyDataMapper()
-    middle_jnt3Mapper.SetInputConnection(middle_jnt3.GetOutputPort())
-
-    middle_jnt3Transform = vtk.vtkTransform()
-    middle_jnt3Transform.SetInput(middle_jnt2Transform)
-
-    middle_jnt3Actor.SetUserTransform(middle_jnt3Transform)
-    middle_jnt3Actor.SetMapper(middle_jnt3Mapper)
-    middle_jnt3Actor.SetObjectName('middle_jnt3')
-    middle_jnt3Actor.GetProperty().SetColor(colors.GetColor3d('Grey'))
-
-    middle2Pos = middle2Actor.GetPosition()
-    middle_jnt3Actor.SetPosition(middle2Pos[0],
-                       middle2Pos[1] + middle2.GetHeight() / 2 + middle_jnt3.GetRadius() * 0.75,
-                       middle2Pos[2])
-
-    # ring_jnt3
-    ring_jnt3 = vtkSphereSource()
-    ring_jnt3.SetRadius(1.5)
-    ring_jnt3.SetPhiResolution(20)
-    ring_jnt3.SetThetaResolution(20)
-
-    ring_jnt3Mapper = vtkPolyDataMapper()
-    ring_jnt3Mapper.SetInputConnection(ring_jnt3.GetOutputPort())
-
-    ring_jnt3Transform = vtk.vtkTransform()
-    ring_jnt3Transform.SetInput(ring_jnt2Transform)
-
-    ring_jnt3Actor.SetUserTransform(ring_jnt3Transform)
-    ring_jnt3Actor.SetMapper(ring_jnt3Mapper)
-    ring_jnt3Actor.SetObjectName('ring_jnt3')
-    ring_jnt3Actor.GetProperty().SetColor(colors.GetColor3d('Grey'))
-
-    ring2Pos = ring2Actor.GetPosition()
-    ring_jnt3Actor.SetPosition(ring2Pos[0],
-                           ring2Pos[1] + ring2.GetHeight() / 2 + ring_jnt3.GetRadius() * 0.75,
-                           ring2Pos[2])
-
-    # pinky_jnt3
-    pinky_jnt3 = vtkSphereSource()
-    pinky_jnt3.SetRadius(1.5)
-    pinky_jnt3.SetPhiResolution(20)
-    pinky_jnt3.SetThetaResolution(20)
-
-    pinky_jnt3Mapper = vtkPolyDataMapper()
-    pinky_jnt3Mapper.SetInputConnection(pinky_jnt3.GetOutputPort())
-
-    pinky_jnt3Transform = vtk.vtkTransform()
-    pinky_jnt3Transform.SetInput(pinky_jnt2Transform)
-
-    pinky_jnt3Actor.SetUserTransform(pinky_jnt3Transform)
-    pinky_jnt3Actor.SetMapper(pinky_jnt3Mapper)
-    pinky_jnt3Actor.SetObjectName('pinky_jnt3')
-    pinky_jnt3Actor.GetProperty().SetColor(colors.GetColor3d('Grey'))
-
-    pinky2Pos = pinky2Actor.GetPosition()
-    pinky_jnt3Actor.SetPosition(pinky2Pos[0],
-                          pinky2Pos[1] + pinky2.GetHeight() / 2 + pinky_jnt3.GetRadius() * 0.75,
-                          pinky2Pos[2])
-    
-    # thumb_jnt3
-    thumb_jnt3 = vtkSphereSource()
-    thumb_jnt3.SetRadius(1.5)
-    thumb_jnt3.SetPhiResolution(20)
-    thumb_jnt3.SetThetaResolution(20)
-
-    thumb_jnt3Mapper = vtkPolyDataMapper()
-    thumb_jnt3Mapper.SetInputConnection(thumb_jnt3.GetOutputPort())
-
-    thumb_jnt3Transform = vtk.vtkTransform()
-    thumb_jnt3Transform.SetInput(thumb_jnt2Transform)
-
-    thumb_jnt3Actor.SetUserTransform(thumb_jnt3Transform)
-    thumb_jnt3Actor.SetMapper(thumb_jnt3Mapper)
-    thumb_jnt3Actor.SetObjectName('thumb_jnt3')
-    thumb_jnt3Actor.GetProperty().SetColor(colors.GetColor3d('Grey'))
-
-    thumb2Pos = thumb2Actor.GetPosition()
-    thumb_jnt3Actor.SetPosition(thumb2Pos[0],
-                          thumb2Pos[1] + thumb2.GetHeight() / 2 + thumb_jnt3.GetRadius() * 0.75,
-                          thumb2Pos[2])
-
-
-    # ====================================== finger3 ======================================
-
-    # index3
-    index3 = vtkCylinderSource()
-    index3.SetRadius(1.5)
-    index3.SetHeight(2)
-    index3.SetResolution(20)
-
-    index3Mapper = vtkPolyDataMapper()
-    index3Mapper.SetInputConnection(index3.GetOutputPort())
-
-    index3Actor = vtkActor()
-    index3Actor.SetUserTransform(index_jnt3Transform)
-    index3Actor.SetMapper(index3Mapper)
-    index3Actor.GetProperty().SetColor(colors.GetColor3d("RoyalBLue"))
-
-    index_jnt3Pos = index_jnt3Actor.GetPosition()
-    index3Actor.SetPosition(index_jnt3Pos[0],
-                         index_jnt3Pos[1] + index_jnt3.GetRadius() / 2 + index3.GetHeight() / 2,
-                         index_jnt3Pos[2])
-
-    # middle3
-    middle3 = vtkCylinderSource()
-    middle3.SetRadius(1.5)
-    middle3.SetHeight(2)
-    middle3.SetResolution(20)
-
-    middle3Mapper = vtkPolyDataMapper()
-    middle3Mapper.SetInputConnection(middle3.GetOutputPort())
-
-    middle3Actor = vtkActor()
-    middle3Actor.SetUserTransform(middle_jnt3Transform)
-    middle3Actor.SetMapper(middle3Mapper)
-    middle3Actor.GetProperty().SetColor(colors.GetColor3d("RoyalBLue"))
-
-    middle_jnt3Pos = middle_jnt3Actor.GetPosition()
-    middle3Actor.SetPosition(middle_jnt3Pos[0],
-                      middle_jnt3Pos[1] + middle_jnt3.GetRadius() / 2 + middle3.GetHeight() / 2,
-                      middle_jnt3Pos[2])
-
-    # ring3
-    ring3 = vtkCylinderSource()
-    ring3.SetRadius(1.5)
-    ring3.SetHeight(2)
-    ring3.SetResolution(20)
-
-    ring3Mapper = vtkPolyDataMapper()
-    ring3Mapper.SetInputConnection(ring3.GetOutputPort())
-
-    ring3Actor = vtkActor()
-    ring3Actor.SetUserTransform(ring_jnt3Transform)
-    ring3Actor.SetMapper(ring3Mapper)
-    ring3Actor.GetProperty().SetColor(colors.GetColor3d("RoyalBLue"))
-
-    ring_jnt3Pos = ring_jnt3Actor.GetPosition()
-    ring3Actor.SetPosition(ring_jnt3Pos[0],
-                           ring_jnt3Pos[1] + ring_jnt3.GetRadius() / 2 + ring3.GetHeight() / 2,
-                           ring_jnt3Pos[2])
-
-    # pinky3
-    pinky3 = vtkCylinderSource()
-    pinky3.SetRadius(1.5)
-    pinky3.SetHeight(2)
-    pinky3.SetResolution(20)
-
-    pinky3Mapper = vtkPolyDataMapper()
-    pinky3Mapper.SetInputConnection(pinky3.GetOutputPort())
-
-    pinky3Actor = vtkActor()
-    pinky3Actor.SetUserTransform(pinky_jnt3Transform)
-    pinky3Actor.SetMapper(pinky3Mapper)
-    pinky3Actor.GetProperty().SetColor(colors.GetColor3d("RoyalBLue"))
-
-    pinky_jnt3Pos = pinky_jnt3Actor.GetPosition()
-    pinky3Actor.SetPosition(pinky_jnt3Pos[0],
-                          pinky_jnt3Pos[1] + pinky_jnt3.GetRadius() / 2 + pinky3.GetHeight() / 2,
-                          pinky_jnt3Pos[2])
-
-    # thumb3
-    thumb3 = vtkCylinderSource()
-    thumb3.SetRadius(1.5)
-    thumb3.SetHeight(2)
-    thumb3.SetResolution(20)
-
-    thumb3Mapper = vtkPolyDataMapper()
-    thumb3Mapper.SetInputConnection(thumb3.GetOutputPort())
-
-    thumb3Actor = vtkActor()
-    thumb3Actor.SetUserTransform(thumb_jnt3Transform)
-    thumb3Actor.SetMapper(thumb3Mapper)
-    thumb3Actor.GetProperty().SetColor(colors.GetColor3d("RoyalBLue"))
-
-    thumb_jnt3Pos = thumb_jnt3Actor.GetPosition()
-    thumb3Actor.SetPosition(thumb_jnt3Pos[0],
-                          thumb_jnt3Pos[1] + thumb_jnt3.GetRadius() / 2 + thumb3.GetHeight() / 2,
-                          thumb_jnt3Pos[2])
-
-    # ==================================== finger_tip ====================================
-
-    # index_tip
-    index_tip = vtkSphereSource()
-    index_tip.SetRadius(1.5)
-    index_tip.SetPhiResolution(20)
-    index_tip.SetThetaResolution(20)
-
-    index_tipMapper = vtkPolyDataMapper()
-    index_tipMapper.SetInputConnection(index_tip.GetOutputPort())
-
-    index_tipActor = vtkActor()
-    index_tipActor.SetUserTransform(index_jnt3Transform)
-    index_tipActor.SetMapper(index_tipMapper)
-    index_tipActor.GetProperty().SetColor(colors.GetColor3d('RoyalBLue'))
-
-    index3Pos = index3Actor.GetPosition()
-    index_tipActor.SetPosition(index3Pos[0],
-                               index3Pos[1] + index3.GetHeight() / 2,
-                               index3Pos[2])
-
-    # middle_tip
-    middle_tip = vtkSphereSource()
-    middle_tip.SetRadius(1.5)
-    middle_tip.SetPhiResolution(20)
-    middle_tip.SetThetaResolution(20)
-
-    middle_tipMapper = vtkPolyDataMapper()
-    middle_tipMapper.SetInputConnection(middle_tip.GetOutputPort())
-
-    middle_tipActor = vtkActor()
-    middle_tipActor.SetUserTransform(middle_jnt3Transform)
-    middle_tipActor.SetMapper(middle_tipMapper)
-    middle_tipActor.GetProperty().SetColor(colors.GetColor3d('RoyalBLue'))
-
-    middle3Pos = middle3Actor.GetPosition()
-    middle_tipActor.SetPosition(middle3Pos[0],
-                                middle3Pos[1] + middle3.GetHeight() / 2,
-                                middle3Pos[2])
-
-    # ring_tip
-    ring_tip = vtkSphereSource()
-    ring_tip.SetRadius(1.5)
-    ring_tip.SetPhiResolution(20)
-    ring_tip.SetThetaResolution(20)
-
-    ring_tipMapper = vtkPolyDataMapper()
-    ring_tipMapper.SetInputConnection(ring_tip.GetOutputPort())
-
-    ring_tipActor = vtkActor()
-    ring_tipActor.SetUserTransform(ring_jnt3Transform)
-    ring_tipActor.SetMapper(ring_tipMapper)
-    ring_tipActor.GetProperty().SetColor(colors.GetColor3d('RoyalBLue'))
-
-    ring3Pos = ring3Actor.GetPosition()
-    ring_tipActor.SetPosition(ring3Pos[0],
-                              ring3Pos[1] + ring3.GetHeight() / 2,
-                              ring3Pos[2])
-
-    # pinky_tip
-    pinky_tip = vtkSphereSource()
-    pinky_tip.SetRadius(1.5)
-    pinky_tip.SetPhiResolution(20)
-    pinky_tip.SetThetaResolution(20)
-
-    pinky_tipMapper = vtkPolyDataMapper()
-    pinky_tipMapper.SetInputConnection(pinky_tip.GetOutputPort())
-
-    pinky_tipActor = vtkActor()
-    pinky_tipActor.SetUserTransform(pinky_jnt3Transform)
-    pinky_tipActor.SetMapper(pinky_tipMapper)
-    pinky_tipActor.GetProperty().SetColor(colors.GetColor3d('RoyalBLue'))
-
-    pinky3Pos = pinky3Actor.GetPosition()
-    pinky_tipActor.SetPosition(pinky3Pos[0],
-                               pinky3Pos[1] + pinky3.GetHeight() / 2,
-                               pinky3Pos[2])
-    
-    # thumb_tip
-    thumb_tip = vtkSphereSource()
-    thumb_tip.SetRadius(1.5)
-    thumb_tip.SetPhiResolution(20)
-    thumb_tip.SetThetaResolution(20)
-
-    thumb_tipMapper = vtkPolyDataMapper()
-    thumb_tipMapper.SetInputConnection(thumb_tip.GetOutputPort())
-
-    thumb_tipActor = vtkActor()
-    thumb_tipActor.SetUserTransform(thumb_jnt3Transform)
-    thumb_tipActor.SetMapper(thumb_tipMapper)
-    thumb_tipActor.GetProperty().SetColor(colors.GetColor3d('RoyalBLue'))
-
-    thumb3Pos = thumb3Actor.GetPosition()
-    thumb_tipActor.SetPosition(thumb3Pos[0],
-                               thumb3Pos[1] + thumb3.GetHeight() / 2,
-                               thumb3Pos[2])
-
-    # renderer.AddActor(palmActor)
-    renderer.AddActor(carpal1Actor)
-    renderer.AddActor(carpal2Actor)
-    renderer.AddActor(carpal3Actor)
-    renderer.AddActor(carpal4Actor)
-    renderer.AddActor(carpal0Actor)
-    renderer.AddActor(wrist_jntActor)
-    #---------------------------------#
-    renderer.AddActor(index_jnt1Actor)
-    renderer.AddActor(middle_jnt1Actor)
-    renderer.AddActor(ring_jnt1Actor)
-    renderer.AddActor(pinky_jnt1Actor)
-    renderer.AddActor(thumb_jnt1Actor)
-    #---------------------------------#
-    renderer.AddActor(index1Actor)
-    renderer.AddActor(middle1Actor)
-    renderer.AddActor(ring1Actor)
-    renderer.AddActor(pinky1Actor)
-    renderer.AddActor(thumb1Actor)
-    #---------------------------------#
-    renderer.AddActor(index_jnt2Actor)
-    renderer.AddActor(middle_jnt2Actor)
-    renderer.AddActor(ring_jnt2Actor)
-    renderer.AddActor(pinky_jnt2Actor)
-    renderer.AddActor(thumb_jnt2Actor)
-    #---------------------------------#
-    renderer.AddActor(index2Actor)
-    renderer.AddActor(middle2Actor)
-    renderer.AddActor(ring2Actor)
-    renderer.AddActor(pinky2Actor)
-    renderer.AddActor(thumb2Actor)
-    #---------------------------------#
-    renderer.AddActor(index_jnt3Actor)
-    renderer.AddActor(middle_jnt3Actor)
-    renderer.AddActor(ring_jnt3Actor)
-    renderer.AddActor(pinky_jnt3Actor)
-    renderer.AddActor(thumb_jnt3Actor)
-    #---------------------------------#
-    renderer.AddActor(index3Actor)
-    renderer.AddActor(middle3Actor)
-    renderer.AddActor(ring3Actor)
-    renderer.AddActor(pinky3Actor)
-    renderer.AddActor(thumb3Actor)
-    #---------------------------------#
-    renderer.AddActor(index_tipActor)
-    renderer.AddActor(middle_tipActor)
-    renderer.AddActor(ring_tipActor)
-    renderer.AddActor(pinky_tipActor)
-    renderer.AddActor(thumb_tipActor)
-
+    startup.mark('window')
+
+    t0 = time.perf_counter()
+    # hand_kinematics has loaded the default spec already
+    skeleton = Skeleton.load(args.hand) if args.hand else hand_kinematics.SKELETON
+    hand_kinematics.use_skeleton(skeleton)
+    hand = Hand(renderer, skeleton)
+    if not args.no_collisions:
+        hand.collisions = SelfCollision(skeleton)
+    print('hand {!r} built in {:.1f} ms, {}'.format(skeleton.name, (time.perf_counter() - t0) * 1000,
+                                                     hand.geometry.summary()))
+    style.Hand = hand
+    style.Picker = AnalyticPicker(renderer, hand.joints, hand.joint_matrices)
+
+    # the optional features are imported only when asked for
+    if args.skinned:
+        from hand_skinning import SkinnedHand
+        # the part actors stay in the scene (hidden) for picking and highlight colors
+        SkinnedHand(renderer, hand.joints, hand.joint_matrices).attach(renderer)
+
+    if args.object:
+        from hand_object import GraspObject, load_mesh
+        style.Object = GraspObject(renderer, hand, load_mesh(args.object, args.object_offset),
+                                   tolerance=args.contact_tolerance)
+
+    if args.grasps:
+        import numpy as np
+        style.Grasps = np.atleast_2d(np.load(args.grasps))
+
+    # key and mouse handlers only mark the scene dirty, the scheduler draws it
+    scheduler = FrameScheduler(interactor, args.max_fps)
+    style.Scheduler = scheduler
+
+    # the tracer wraps scheduler.request_render: attach it before anything keeps a reference
+    if args.trace:
+        from hand_trace import Tracer
+        style.Tracer = Tracer(args.trace)
+        style.Tracer.attach(interactor, style, renwin, renderer, hand, scheduler)
+    style.Drag = IKDrag(renderer, hand, style.applyAngles, scheduler.request_render)
+
+    if args.lod:
+        from hand_lod import LevelOfDetail
+        lod = LevelOfDetail(renderer, args.frame_budget / 1000.0, hand.geometry.mapper)
+        lod.attach(style, scheduler.request_render)
+
+    if args.hud or args.metrics:
+        from hand_metrics import FrameMetrics, MetricsExporter, MetricsHUD
+        style.Metrics = FrameMetrics()
+        style.Metrics.attach(renderer, style)
+        if args.hud:
+            MetricsHUD(renderer, style.Metrics)
+        if args.metrics:
+            style.Exporter = MetricsExporter(args.metrics, style.Metrics, renderer)
+    startup.mark('scene build')
 
     interactor.Initialize()
+    scheduler.start()
+
+    if args.record:
+        from hand_recording import PoseRecorder
+        style.Recorder = PoseRecorder(args.record)
+        style.Recorder.record(hand.get_pose_vector())
+
+    if args.clip or args.replay:
+        from hand_animation import AnimationPlayer, Clip
+        from hand_stream import PoseStream
+        style.Player = AnimationPlayer(interactor, style.applyAngles, scheduler.request_render)
+        style.Player.play(Clip.load(args.clip) if args.clip else PoseStream(args.replay))
+        if not style.Player.clip:
+            print('{} has no frames, nothing to play'.format(args.clip or args.replay))
+        if args.seek:
+            style.Player.seek(args.seek)
+
+    if args.control is not None:
+        from hand_control import ControlServer
+        style.Control = ControlServer(args.control).start()
+        style.Control.attach(interactor, renderer, hand.get_pose_vector, style.applyAngles,
+                             scheduler.request_render, args.max_fps)
+        print('control server on {}:{}'.format(style.Control.host, style.Control.port))
+
+    if args.shm:
+        from hand_shm import PoseReader
+        style.Channel = PoseReader(args.shm)
+        style.Channel.attach(interactor, style.applyAngles, scheduler.request_render, args.max_fps)
+        print('pose channel {!r}, {} slots'.format(args.shm, style.Channel.slots))
+    startup.mark('interactor')
+    return renwin, interactor, style
+
+
+def main(argv=None):
+    parser = make_parser()
+    args = parser.parse_args(argv)
+    if args.skinned and args.lod:
+        parser.error('--lod works on the per-part actors, it cannot be combined with --skinned')
+
+    startup = StartupReport(_IMPORT_START)
+    startup.mark('imports', _IMPORT_END)
+    startup.mark('arguments')
+    renwin, interactor, style = build_app(args, startup)
+
     renwin.Render()
+    startup.mark('first render')
+    print(startup.summary())
+    if args.startup:
+        return
     interactor.Start()
+    print(style.Scheduler.summary())
+
+    if style.Control is not None:
+        style.Control.close()
+        print(style.Control.summary())
+    if style.Channel is not None:
+        print(style.Channel.summary())
+        style.Channel.close()
+    if style.Recorder is not None:
+        style.Recorder.close()
+        print('{} poses recorded to {}'.format(style.Recorder.records, args.record))
+    if style.Exporter is not None:
+        style.Exporter.close()
+    if style.Tracer is not None:
+        style.Tracer.close()
+        print('{} trace events written to {}'.format(style.Tracer.events, args.trace))
+
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,70 @@
+# ================================================================================
+#   Frame scheduler with dirty-flag render coalescing
+#
+#   Event handlers only call request_render(). A repeating interactor timer
+#   renders at most once per tick, and only when something changed since the
+#   last frame, so key auto-repeat can no longer queue renders faster than
+#   frames finish. The time from the first request to the end of the frame
+#   that shows it is kept as the input-to-display latency.
+# ================================================================================
+
+import time
+from collections import deque
+
+
+class FrameScheduler:
+
+    def __init__(self, interactor, max_fps=60):
+        self.interactor = interactor
+        self.max_fps = max_fps
+        self.timer_id = None
+        self.dirty = False
+        self.dirty_since = None     # perf_counter() of the first request since the last frame
+        self.frames = 0
+        self.requests = 0
+        self.latencies = deque(maxlen=1000)   # seconds, request -> frame done
+
+    def start(self):
+        # call after interactor.Initialize(); timers need an initialized interactor
+        self.interactor.AddObserver('TimerEvent', self.onTimer)
+        self.timer_id = self.interactor.CreateRepeatingTimer(max(1, int(1000 / self.max_fps)))
+
+    def stop(self):
+        if self.timer_id is not None:
+            self.interactor.DestroyTimer(self.timer_id)
+            self.timer_id = None
+
+    def request_render(self):
+        self.requests += 1
+        if not self.dirty:
+            self.dirty = True
+            self.dirty_since = time.perf_counter()
+
+    def onTimer(self, obj, event):
+        if self.interactor.GetTimerEventId() != self.timer_id or not self.dirty:
+            return
+        self.render_now()
+
+    def render_now(self):
+        # clear the flag first so requests made during the render go into the next frame
+        since = self.dirty_since
+        self.dirty = False
+        self.dirty_since = None
+        self.interactor.GetRenderWindow().Render()
+        self.frames += 1
+        if since is not None:
+            self.latencies.append(time.perf_counter() - since)
+
+    def latency_stats(self):
+        # (p50, p95, max) latency in milliseconds over the recent frames
+        if not self.latencies:
+            return 0.0, 0.0, 0.0
+        values = sorted(self.latencies)
+        pick = lambda q: values[min(len(values) - 1, int(q * len(values)))] * 1000
+        return pick(0.5), pick(0.95), values[-1] * 1000
+
+    def summary(self):
+        p50, p95, worst = self.latency_stats()
+        return ('{} render requests coalesced into {} frames, input-to-frame latency '
+                'p50 {:.1f} ms, p95 {:.1f} ms, max {:.1f} ms').format(
+                    self.requests, self.frames, p50, p95, worst)
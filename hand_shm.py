@@ -0,0 +1,246 @@
+# ================================================================================
+#   Shared-memory pose channel
+#
+#   For controllers in another process that write poses faster than a socket
+#   carries them (1 kHz and up). The app creates a named shared memory block
+#   holding a ring of float32 pose vectors; one external writer fills it and
+#   the app reads the newest pose once per frame. Nothing blocks either side:
+#
+#     header   magic, DOF, slots, head (poses written so far), and the
+#              reader's counters (reads, dropped, torn), all uint64
+#     seq      per slot: 2k + 1 while pose k is being written, 2k + 2 after
+#     time     per slot: perf_counter() of the writer (system-wide on Linux)
+#     poses    per slot: DOF float32 angles (hand_kinematics.DOF_NAMES)
+#
+#   A seqlock per slot: the reader copies the slot of the newest pose into a
+#   preallocated buffer and keeps it only if the slot's seq was even and
+#   unchanged around the copy; otherwise the read was torn and is counted
+#   and retried. Poses written between two frames are counted as dropped.
+#   The writer never waits; it relies on stores becoming visible in the order
+#   they are made (as on x86).
+#
+#   python hand_robot_final.py --shm hand
+#   python hand_shm.py write hand --rate 1000 --seconds 10
+#   python hand_shm.py stats hand
+# ================================================================================
+
+import argparse
+import time
+from collections import deque
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+import hand_kinematics
+
+MAGIC = 0x48414e44504f5345     # 'HANDPOSE'
+HEADER = 8                      # uint64 fields
+MAGIC_, DOF_, SLOTS_, HEAD, READS, DROPPED, TORN = range(7)
+
+
+def _size(slots, dof):
+    return 8 * HEADER + 8 * slots + 8 * slots + 4 * slots * dof
+
+
+class PoseChannel:
+    # numpy views of the shared block; PoseReader creates it, PoseWriter attaches
+
+    def __init__(self, name, create=False, slots=64):
+        dof = hand_kinematics.DOF
+        if create:
+            try:
+                self.shm = shared_memory.SharedMemory(name, create=True, size=_size(slots, dof))
+            except FileExistsError:
+                _remove_stale(name)
+                self.shm = shared_memory.SharedMemory(name, create=True, size=_size(slots, dof))
+        else:
+            self.shm = _attach(name)
+        buf = self.shm.buf
+        self.header = np.ndarray((HEADER,), np.uint64, buf)
+        if create:
+            self.header[:] = 0
+            self.header[[MAGIC_, DOF_, SLOTS_]] = MAGIC, dof, slots
+        elif self.header[MAGIC_] != MAGIC or self.header[DOF_] != dof:
+            self.shm.close()
+            raise ValueError('{} is not a pose channel of {} angles'.format(name, dof))
+        slots = int(self.header[SLOTS_])
+        self.name = name
+        self.slots = slots
+        self.owner = create
+        offset = 8 * HEADER
+        self.seq = np.ndarray((slots,), np.uint64, buf, offset)
+        self.time = np.ndarray((slots,), np.float64, buf, offset + 8 * slots)
+        self.poses = np.ndarray((slots, dof), np.float32, buf, offset + 16 * slots)
+
+    def close(self):
+        # drops the views first: the block cannot be unmapped while they exist
+        self.header = self.seq = self.time = self.poses = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+    def stats(self):
+        # counters as the reader last published them
+        return {'written': int(self.header[HEAD]), 'reads': int(self.header[READS]),
+                'dropped': int(self.header[DROPPED]), 'torn': int(self.header[TORN])}
+
+
+def _remove_stale(name):
+    # a block left by a run that did not get to unlink it; only pose channels are removed
+    stale = shared_memory.SharedMemory(name)
+    magic = int(np.frombuffer(bytes(stale.buf[:8]), np.uint64)[0]) if stale.size >= 8 else None
+    stale.close()
+    if magic != MAGIC:
+        raise FileExistsError('shared memory block {!r} exists and is not a pose channel, '
+                              'pick another name'.format(name))
+    print('removing stale pose channel {!r}'.format(name))
+    stale.unlink()
+
+
+def _attach(name):
+    # attaches without registering the block with this process's resource tracker,
+    # which would otherwise unlink it when an attached process exits
+    try:
+        return shared_memory.SharedMemory(name, track=False)    # Python 3.13+
+    except TypeError:
+        shm = shared_memory.SharedMemory(name)
+        resource_tracker.unregister(shm._name, 'shared_memory')
+        return shm
+
+
+class PoseWriter(PoseChannel):
+    # the one writer of a channel; continues the ring where a previous writer left it
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.head = int(self.header[HEAD])
+
+    def write(self, pose, timestamp=None):
+        k = self.head
+        i = k % self.slots
+        self.seq[i] = 2 * k + 1
+        self.poses[i] = pose
+        self.time[i] = time.perf_counter() if timestamp is None else timestamp
+        self.seq[i] = 2 * k + 2
+        self.head = k + 1
+        self.header[HEAD] = k + 1
+
+
+class PoseReader(PoseChannel):
+
+    def __init__(self, name, slots=64, retries=3):
+        super().__init__(name, create=True, slots=slots)
+        self.retries = retries
+        self.pose = np.zeros(hand_kinematics.DOF)    # the latest complete pose, reused
+        self.head = 0               # poses written when the last one was read
+        self.reads = 0
+        self.dropped = 0
+        self.torn = 0
+        self.ages = deque(maxlen=1000)   # seconds, written -> read
+        self.interactor = None
+        self.timer_id = None
+
+    def read(self):
+        # copies the newest complete pose into self.pose; False if nothing new was written
+        # or every retry was torn (the writer lapped the ring during the copy)
+        for _ in range(self.retries):
+            head = int(self.header[HEAD])
+            if head == self.head:
+                return False
+            i = (head - 1) % self.slots
+            seq = self.seq[i]
+            np.copyto(self.pose, self.poses[i])
+            written = self.time[i]
+            if seq == 2 * head and self.seq[i] == seq:
+                break
+            self.torn += 1
+        else:
+            self._publish()
+            return False
+        self.dropped += head - self.head - 1
+        self.head = head
+        self.reads += 1
+        self.ages.append(time.perf_counter() - written)
+        self._publish()
+        return True
+
+    def _publish(self):
+        self.header[[READS, DROPPED, TORN]] = self.reads, self.dropped, self.torn
+
+    # ---- in the app ----
+
+    def attach(self, interactor, apply, request_render, max_fps=60):
+        # reads once per tick and applies a new pose with apply(flexion, abduction)
+        # (the style's applyAngles); call after Initialize()
+        self.interactor = interactor
+        self.apply = apply
+        self.request_render = request_render
+        interactor.AddObserver('TimerEvent', self.onTimer)
+        self.timer_id = interactor.CreateRepeatingTimer(max(1, int(1000 / max_fps)))
+
+    def onTimer(self, obj, event):
+        if self.interactor.GetTimerEventId() != self.timer_id or not self.read():
+            return
+        self.apply(*hand_kinematics.split_pose(self.pose))
+        self.request_render()
+
+    def close(self):
+        if self.timer_id is not None:
+            self.interactor.DestroyTimer(self.timer_id)
+            self.timer_id = None
+        super().close()
+
+    def summary(self):
+        ages = sorted(self.ages) or [0.0]
+        pick = lambda q: ages[min(len(ages) - 1, int(q * len(ages)))] * 1000
+        return ('{} poses written, {} read, {} dropped, {} torn reads, pose age p50 {:.2f} ms, '
+                'p95 {:.2f} ms').format(int(self.header[HEAD]), self.reads, self.dropped, self.torn,
+                                        pick(0.5), pick(0.95))
+
+
+def main(argv=None):
+    from hand_control import wave
+
+    parser = argparse.ArgumentParser(description='Test writer and counters of a shared-memory pose channel '
+                                                 '(hand_robot_final.py --shm NAME creates it).')
+    sub = parser.add_subparsers(dest='command', required=True)
+    write = sub.add_parser('write', help='write a test motion at a fixed rate')
+    write.add_argument('name')
+    write.add_argument('--rate', type=float, default=1000, help='poses per second')
+    write.add_argument('--seconds', type=float, default=10)
+    stats = sub.add_parser('stats', help="print the channel's counters")
+    stats.add_argument('name')
+    args = parser.parse_args(argv)
+
+    if args.command == 'stats':
+        channel = PoseChannel(args.name)
+        print(', '.join('{} {}'.format(key, value) for key, value in channel.stats().items()))
+        channel.close()
+        return
+
+    writer = PoseWriter(args.name)
+    count = int(args.rate * args.seconds)
+    poses = np.array([wave(i, args.rate) for i in range(int(args.rate))], dtype=np.float32)
+    busy = 0.0
+    t0 = time.perf_counter()
+    for i in range(count):
+        # sleep to the next slot, spin the last bit of it: sleep() overshoots
+        due = t0 + i / args.rate
+        while True:
+            now = time.perf_counter()
+            if now >= due:
+                break
+            if due - now > 0.002:
+                time.sleep(due - now - 0.001)
+        t = time.perf_counter()
+        writer.write(poses[i % len(poses)], t)
+        busy += time.perf_counter() - t
+    seconds = time.perf_counter() - t0
+    print('{} poses in {:.2f} s ({:.0f}/s), {:.2f} us per write'.format(count, seconds, count / seconds,
+                                                                    busy / count * 1e6))
+    print(', '.join('{} {}'.format(key, value) for key, value in writer.stats().items()))
+    writer.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+# ================================================================================
+#   Skeleton spec of the hand
+#
+#   The proportions of the hand live in a JSON file (hands/default.json)
+#   instead of code: palm and carpal bars, and for every joint its parent,
+#   position, radius, the length of the bone above it, fixed base rotation,
+#   thumb coupling, degrees of freedom and their limits. A joint without a
+#   position sits on top of its parent's bone. Variants are just other files:
+#
+#   python hand_robot_final.py --hand hands/slender.json
+#
+#   The joint tree itself is fixed (wrist, five fingers of three joints each)
+#   because the 21-angle pose layout of hand_kinematics depends on it.
+# ================================================================================
+
+import json
+import os
+
+import numpy as np
+
+FINGERS = ('index', 'middle', 'ring', 'pinky', 'thumb')
+
+# the 16 rotating joints, in the order of the flexion/abduction arrays
+JOINT_NAMES = ['wrist_jnt'] + ['{}_jnt{}'.format(f, k) for k in (1, 2, 3) for f in FINGERS]
+
+# every node with a world frame: wrist, then jnt1, jnt2, jnt3 and tip of each finger
+NODE_NAMES = ['wrist_jnt'] + ['{}_{}'.format(f, n) for f in FINGERS
+                             for n in ('jnt1', 'jnt2', 'jnt3', 'tip')]
+
+SPEC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'hands')
+DEFAULT_SPEC = os.path.join(SPEC_DIR, 'default.json')
+
+
+def _parent_of(name):
+    # the joint tree the pose layout expects
+    if name == 'wrist_jnt':
+        return None
+    finger, level = name.rsplit('_jnt', 1)
+    return 'wrist_jnt' if level == '1' else '{}_jnt{}'.format(finger, int(level) - 1)
+
+
+def resolve(path):
+    # a spec file, or the name of one in hands/ ('slender' -> hands/slender.json)
+    if path is None:
+        return DEFAULT_SPEC
+    if not os.path.exists(path) and os.path.exists(os.path.join(SPEC_DIR, path + '.json')):
+        return os.path.join(SPEC_DIR, path + '.json')
+    return path
+
+
+class Skeleton:
+
+    def __init__(self, spec, path=None):
+        self.path = path
+        self.name = spec.get('name', os.path.splitext(os.path.basename(path or 'hand'))[0])
+        self.resolution = int(spec.get('resolution', 20))
+        self.colors = dict({'joint': 'Grey', 'bone': 'RoyalBlue', 'tip': 'RoyalBlue', 'palm': 'RoyalBlue'},
+                           **spec.get('colors', {}))
+        self.palm = spec.get('palm', {'size': [12.5, 10, 1], 'visible': False})
+        self.carpals = spec.get('carpals', [])
+
+        by_name = {}
+        for joint in spec.get('joints', []):
+            if joint.get('name') in by_name:
+                raise ValueError('joint {!r} is listed twice'.format(joint.get('name')))
+            by_name[joint.get('name')] = joint
+        missing = [name for name in JOINT_NAMES if name not in by_name]
+        unknown = sorted(set(by_name) - set(JOINT_NAMES), key=str)
+        if missing or unknown:
+            raise ValueError('the spec must list exactly the joints {}; missing {}, unknown {}'.format(
+                ', '.join(JOINT_NAMES), missing, unknown))
+
+        # normalized joints in JOINT_NAMES order (parents before children)
+        self.joints = []
+        placed = {}
+        for name in JOINT_NAMES:
+            joint = by_name[name]
+            parent = joint.get('parent', _parent_of(name))
+            if parent != _parent_of(name):
+                raise ValueError('{} must have parent {!r}, not {!r}'.format(name, _parent_of(name), parent))
+            radius = float(joint.get('radius', 1.5))
+            if 'position' in joint:
+                position = np.array(joint['position'], dtype=float)
+            elif parent is None or placed[parent]['bone'] == 0:
+                raise ValueError('{} needs a position'.format(name))
+            else:
+                # on top of the parent's bone: the bone starts r/2 above the parent,
+                # the joint sits 0.75 r above the bone
+                above = placed[parent]
+                position = above['position'] + (0.0, above['radius'] / 2 + above['bone'] + radius * 0.75, 0.0)
+
+            # a degree of freedom without limits is locked at 0
+            limits = joint.get('limits', {})
+            finger = name.rsplit('_jnt', 1)[0]
+            bone = float(joint.get('bone', 0.0))
+            placed[name] = {
+                'name': name,
+                'parent': parent,
+                'position': position,
+                'radius': radius,
+                'bone': bone,
+                'bone_name': name.replace('_jnt', '') if bone else None,
+                'tip_name': finger + '_tip' if joint.get('tip') else None,
+                'base_angle': float(joint.get('base_angle', 0.0)),
+                'coupling': float(joint.get('coupling', 0.0)),
+                'spread': 'spread' in limits,
+                'flexion_limits': tuple(float(a) for a in limits.get('flexion', (0.0, 0.0))),
+                'spread_limits': tuple(float(a) for a in limits.get('spread', (0.0, 0.0))),
+            }
+            self.joints.append(placed[name])
+        for finger in FINGERS:
+            if placed[finger + '_jnt3']['tip_name'] is None or placed[finger + '_jnt3']['bone'] == 0:
+                raise ValueError('{}_jnt3 needs a bone and a tip'.format(finger))
+
+        # tables in JOINT_NAMES order for hand_kinematics
+        self.pivots = np.array([j['position'] for j in self.joints])
+        self.radius = np.array([j['radius'] for j in self.joints])
+        self.bones = np.array([j['bone'] for j in self.joints])
+        self.base_angles = np.array([j['base_angle'] for j in self.joints])
+        self.coupling = np.array([j['coupling'] for j in self.joints])
+        self.flexion_limits = np.array([j['flexion_limits'] for j in self.joints])
+        self.abduction_limits = np.array([j['spread_limits'] for j in self.joints])
+
+        # rest positions of NODE_NAMES; the tip is the far end of the last bone
+        rest = [self.pivots[0]]
+        for finger in FINGERS:
+            chain = [placed['{}_jnt{}'.format(finger, k)] for k in (1, 2, 3)]
+            rest += [j['position'] for j in chain]
+            rest.append(chain[2]['position'] + (0.0, chain[2]['radius'] / 2 + chain[2]['bone'], 0.0))
+        self.rest = np.array(rest)
+
+    def parts(self):
+        # every visible part, in build order: palm and carpal bars (moved by the wrist),
+        # then per joint its sphere, the bone above it and the finger tip on jnt3.
+        # kind/size/resolution name the mesh (hand_geometry), joint indexes JOINT_NAMES,
+        # and the part sits at position, turned by angle (deg, about Z) around pivot.
+        parts = []
+        if self.palm.get('visible', True):
+            parts.append({'kind': 'cube', 'size': tuple(self.palm['size']), 'resolution': 0, 'color': 'palm',
+                          'name': None, 'joint': 0, 'position': (0.0, 0.0, 0.0), 'pivot': None, 'angle': 0.0})
+        for bar in self.carpals:
+            parts.append({'kind': 'cube', 'size': tuple(bar['size']), 'resolution': 0, 'color': 'palm',
+                          'name': None, 'joint': 0, 'position': (0.0, 0.0, 0.0),
+                          'pivot': tuple(bar['pivot']), 'angle': float(bar['angle'])})
+        for i, joint in enumerate(self.joints):
+            r, h = joint['radius'], joint['bone']
+            x, y, z = map(float, joint['position'])
+            meshes = [('sphere', (r,), 'joint', joint['name'], (x, y, z))]
+            if joint['bone_name']:
+                meshes.append(('cylinder', (r, h), 'bone', joint['bone_name'], (x, y + r / 2 + h / 2, z)))
+            if joint['tip_name']:
+                meshes.append(('sphere', (r,), 'tip', joint['tip_name'], (x, y + r / 2 + h, z)))
+            for kind, size, color, name, position in meshes:
+                parts.append({'kind': kind, 'size': size, 'resolution': self.resolution, 'color': color,
+                              'name': name, 'joint': i, 'position': position, 'pivot': None, 'angle': 0.0})
+        return parts
+
+    @staticmethod
+    def part_matrix(part):
+        # 4x4 placement of a part before any joint moves it, as vtkProp3D composes it:
+        # T(position) T(pivot) Rz(angle) T(-pivot)
+        c, s = np.cos(np.radians(part['angle'])), np.sin(np.radians(part['angle']))
+        M = np.identity(4)
+        M[:2, :2] = ((c, -s), (s, c))
+        pivot = np.array(part['pivot'] or (0.0, 0.0, 0.0))
+        M[:3, 3] = np.array(part['position']) + pivot - M[:3, :3] @ pivot
+        return M
+
+    @classmethod
+    def load(cls, path=None):
+        path = resolve(path)
+        with open(path) as f:
+            return cls(json.load(f), path)
+
+    def joint(self, name):
+        return self.joints[JOINT_NAMES.index(name)]
+
+    def clamp(self, flexion, abduction):
+        # (..., 16) angles clipped to the joint limits
+        flexion = np.clip(flexion, self.flexion_limits[:, 0], self.flexion_limits[:, 1])
+        abduction = np.clip(abduction, self.abduction_limits[:, 0], self.abduction_limits[:, 1])
+        return flexion, abduction
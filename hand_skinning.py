@@ -0,0 +1,196 @@
+# ================================================================================
+#   Single skinned hand mesh
+#
+#   Alternate render path: every part of the hand is merged into one
+#   vtkPolyData with a bone (joint) index per vertex. Each frame the vertex
+#   positions and normals are recomputed from the joint matrices with NumPy
+#   (rigid skinning, one bone per vertex) and written in place into the
+#   arrays VTK renders from, so the whole hand is one actor and one draw call.
+#
+#   python hand_skinning.py --frames 300      compares it with the actor-per-part scene
+# ================================================================================
+
+import argparse
+import time
+
+import numpy as np
+from vtkmodules.util import numpy_support
+from vtkmodules.vtkCommonCore import vtkPoints
+from vtkmodules.vtkCommonDataModel import vtkCellArray, vtkPolyData
+from vtkmodules.vtkFiltersCore import vtkTriangleFilter
+from vtkmodules.vtkRenderingCore import vtkActor, vtkPolyDataMapper
+
+import hand_kinematics
+
+
+class SkinnedHand:
+
+    def __init__(self, renderer, joints, joint_matrices):
+        # merges the visible parts of renderer; joints: name -> Joint,
+        # joint_matrices(): (16, 4, 4) in hand_kinematics.JOINT_NAMES order
+        self.joint_matrices = joint_matrices
+        self.parts = []             # (actor, first vertex, vertex count, property MTime)
+
+        bones = {joints[name].transform.GetAddressAsString('vtkTransform'): i
+                 for i, name in enumerate(hand_kinematics.JOINT_NAMES)}
+        rest, normals, bone, colors, polys = [], [], [], [], []
+        offset = 0
+        actors = renderer.GetActors()
+        actors.InitTraversal()
+        for _ in range(actors.GetNumberOfItems()):
+            actor = actors.GetNextActor()
+            transform = actor.GetUserTransform()
+            owner = bones.get(transform.GetAddressAsString('vtkTransform')) if transform else None
+            if owner is None or not actor.GetVisibility():
+                continue
+
+            triangles = vtkTriangleFilter()
+            triangles.SetInputData(actor.GetMapper().GetInput())
+            triangles.Update()
+            mesh = triangles.GetOutput()
+
+            # the part's own placement (position/orientation) without the joint transform
+            actor.SetUserTransform(None)
+            place = np.array([[actor.GetMatrix().GetElement(r, c) for c in range(4)] for r in range(4)])
+            actor.SetUserTransform(transform)
+
+            points = numpy_support.vtk_to_numpy(mesh.GetPoints().GetData()).astype(float)
+            count = len(points)
+            rest.append(points @ place[:3, :3].T + place[:3, 3])
+            point_normals = mesh.GetPointData().GetNormals()
+            if point_normals is not None:
+                normals.append(numpy_support.vtk_to_numpy(point_normals) @ place[:3, :3].T)
+            else:
+                normals.append(np.zeros((count, 3)))
+            bone.append(np.full(count, owner))
+            colors.append(np.tile(np.array(actor.GetProperty().GetColor()) * 255, (count, 1)))
+            cells = numpy_support.vtk_to_numpy(mesh.GetPolys().GetConnectivityArray())
+            polys.append(cells.reshape(-1, 3) + offset)
+
+            self.parts.append([actor, offset, count, actor.GetProperty().GetMTime()])
+            offset += count
+
+        # sort vertices by bone so skinning is one matmul per bone on a contiguous slice
+        order = np.argsort(np.concatenate(bone), kind='stable')
+        remap = np.empty_like(order)
+        remap[order] = np.arange(len(order))
+        self.rest = np.concatenate(rest)[order]
+        self.rest_normals = np.concatenate(normals)[order]
+        bone = np.concatenate(bone)[order]
+        self.bone_slices = [(b, np.searchsorted(bone, b), np.searchsorted(bone, b, side='right'))
+                            for b in range(len(hand_kinematics.JOINT_NAMES))]
+        self.remap = remap
+        triangles = remap[np.concatenate(polys)]
+
+        self.polydata = vtkPolyData()
+        self.points = numpy_support.numpy_to_vtk(self.rest.copy(), deep=1)
+        vtk_points = vtkPoints()
+        vtk_points.SetData(self.points)
+        self.polydata.SetPoints(vtk_points)
+
+        self.normals = numpy_support.numpy_to_vtk(self.rest_normals.copy(), deep=1)
+        self.normals.SetName('Normals')
+        self.polydata.GetPointData().SetNormals(self.normals)
+
+        self.colors = numpy_support.numpy_to_vtk(np.concatenate(colors)[order].astype(np.uint8), deep=1)
+        self.colors.SetName('Colors')
+        self.polydata.GetPointData().SetScalars(self.colors)
+
+        cells = vtkCellArray()
+        offsets = np.arange(0, 3 * len(triangles) + 1, 3, dtype=np.int64)
+        cells.SetData(numpy_support.numpy_to_vtkIdTypeArray(offsets, deep=1),
+                      numpy_support.numpy_to_vtkIdTypeArray(triangles.ravel().astype(np.int64), deep=1))
+        self.polydata.SetPolys(cells)
+
+        # in-place views of the arrays VTK renders from
+        self.point_view = numpy_support.vtk_to_numpy(self.points)
+        self.normal_view = numpy_support.vtk_to_numpy(self.normals)
+        self.color_view = numpy_support.vtk_to_numpy(self.colors)
+
+        self.mapper = vtkPolyDataMapper()
+        self.mapper.SetInputData(self.polydata)
+        self.mapper.SetColorModeToDirectScalars()
+        self.actor = vtkActor()
+        self.actor.SetMapper(self.mapper)
+        self.actor.PickableOff()
+        self.last = None
+
+    @property
+    def vertex_count(self):
+        return len(self.rest)
+
+    def attach(self, renderer):
+        # swap the per-part actors for the single skinned one and keep it posed
+        for part in self.parts:
+            part[0].VisibilityOff()
+        renderer.AddActor(self.actor)
+        renderer.AddObserver('StartEvent', self.onStartRender)
+        self.update()
+
+    def onStartRender(self, obj, event):
+        self.update()
+
+    def update(self, force=False):
+        W = self.joint_matrices()
+        if force or self.last is None or not np.array_equal(W, self.last):
+            self.last = W
+            for b, lo, hi in self.bone_slices:
+                if hi > lo:
+                    R = W[b, :3, :3]
+                    np.matmul(self.rest[lo:hi], R.T, out=self.point_view[lo:hi])
+                    self.point_view[lo:hi] += W[b, :3, 3]
+                    np.matmul(self.rest_normals[lo:hi], R.T, out=self.normal_view[lo:hi])
+            self.points.Modified()
+            self.normals.Modified()
+        self.sync_colors()
+
+    def sync_colors(self):
+        # picks and hovers recolor the (hidden) part actors; mirror that into the mesh
+        changed = False
+        for part in self.parts:
+            actor, first, count, mtime = part
+            if actor.GetProperty().GetMTime() != mtime:
+                part[3] = actor.GetProperty().GetMTime()
+                rows = self.remap[first:first + count]
+                self.color_view[rows] = np.array(actor.GetProperty().GetColor()) * 255
+                changed = True
+        if changed:
+            self.colors.Modified()
+
+
+def benchmark(frames=300, size=(640, 480)):
+    # per-frame time of random poses, actor-per-part scene vs. the skinned mesh
+    import hand_robot_final
+
+    renwin, renderer = hand_robot_final.create_window(size, offscreen=True)
+    hand = hand_robot_final.Hand(renderer)
+    renderer.ResetCamera()
+    poses = np.random.default_rng(0).uniform(-30, 10, (frames, hand_kinematics.DOF))
+    renwin.Render()
+
+    def run():
+        t0 = time.perf_counter()
+        for pose in poses:
+            hand.set_pose(pose)
+            renwin.Render()
+        return (time.perf_counter() - t0) / frames * 1000
+
+    parts = run()
+    skinned = SkinnedHand(renderer, hand.joints, hand.joint_matrices)
+    skinned.attach(renderer)
+    renwin.Render()
+    merged = run()
+    print('actor per part: {} actors, {:.2f} ms/frame'.format(len(skinned.parts), parts))
+    print('skinned mesh:   1 actor, {} vertices, {:.2f} ms/frame'.format(skinned.vertex_count, merged))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the skinned hand against the actor-per-part scene.')
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--size', nargs=2, type=int, default=(640, 480), metavar=('W', 'H'))
+    args = parser.parse_args(argv)
+    benchmark(args.frames, tuple(args.size))
+
+
+if __name__ == '__main__':
+    main()
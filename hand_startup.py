@@ -0,0 +1,36 @@
+# ================================================================================
+#   Startup time report
+#
+#   Wall time from the start of hand_robot_final's imports to the first frame
+#   on screen, split into phases (imports, window, scene build, interactor,
+#   first render). Printed on every start; with --startup the app quits right
+#   after the first frame so cold starts can be timed from a shell loop:
+#
+#   for i in 1 2 3; do python hand_robot_final.py --startup; done
+# ================================================================================
+
+import time
+
+
+class StartupReport:
+
+    def __init__(self, start=None):
+        # start: perf_counter() taken before the first import worth counting
+        self.start = time.perf_counter() if start is None else start
+        self.last = self.start
+        self.phases = []            # (name, seconds)
+
+    def mark(self, name, now=None):
+        # closes the phase that ran since the previous mark (at now, default: now)
+        now = time.perf_counter() if now is None else now
+        self.phases.append((name, now - self.last))
+        self.last = now
+
+    @property
+    def total(self):
+        return self.last - self.start
+
+    def summary(self):
+        return 'startup {:.0f} ms: {}'.format(
+            self.total * 1000, ', '.join('{} {:.0f} ms'.format(name, seconds * 1000)
+                                         for name, seconds in self.phases))
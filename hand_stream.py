@@ -0,0 +1,136 @@
+# ================================================================================
+#   Memory-mapped streaming playback of long pose recordings
+#
+#   PoseStream maps a hand_recording file instead of reading it. Frames are
+#   looked up through a sparse time index (one timestamp every `stride`
+#   records), so opening and seeking only touch a few pages however long the
+#   file is. Pages more than a few MB behind the play position are released
+#   (MADV_DONTNEED) as playback moves on, which keeps resident memory flat.
+#
+#   python hand_stream.py convert mocap.npy mocap.hpose --rate 120
+# ================================================================================
+
+import argparse
+import mmap
+import os
+import struct
+
+import numpy as np
+
+import hand_kinematics
+import hand_recording
+
+
+class PoseStream:
+    # Plays through hand_animation.AnimationPlayer like a Clip or PoseLog.
+
+    loop = False
+
+    def __init__(self, path, stride=4096, keep_bytes=8 << 20):
+        self.path = path
+        self.stride = stride
+        self.keep_bytes = keep_bytes      # bytes behind the play position left mapped in
+
+        with open(path, 'rb') as f:
+            self.dof, self.dtype, self.start = hand_recording.read_header(f)
+            self.file_size = os.fstat(f.fileno()).st_size
+            self.count = (self.file_size - hand_recording.HEADER.size) // self.dtype.itemsize
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            # sparse index: one timestamp per stride, read with pread rather than
+            # through the mapping, which could fault in whole large folios
+            first = hand_recording.HEADER.size
+            size = self.dtype.itemsize
+            self.index = np.array([struct.unpack('<d', os.pread(f.fileno(), 8, first + i * size))[0]
+                                   for i in range(0, self.count, stride)])
+        self.records = np.frombuffer(self.map, dtype=self.dtype, count=self.count,
+                                     offset=hand_recording.HEADER.size)
+        if hasattr(mmap, 'MADV_SEQUENTIAL'):
+            self.map.madvise(mmap.MADV_SEQUENTIAL)
+        self.released = 0                   # mapping offset below which pages were dropped
+        self.t0 = self.index[0] if self.count else 0.0
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def duration(self):
+        return self.records['time'][-1] - self.t0 if self.count else 0.0
+
+    @property
+    def fps(self):
+        # timer rate for playback, from the first stride of records, at most 120 Hz
+        head = self.records['time'][:min(self.count, self.stride)]
+        if len(head) < 2:
+            return 60
+        step = np.median(np.diff(head))
+        return min(120, 1 / step) if step > 0 else 120
+
+    def frame_at(self, seconds):
+        # last record at or before `seconds` after the first one: a binary search
+        # in the sparse index, then one in a single stride of records
+        t = self.t0 + seconds
+        block = max(0, int(np.searchsorted(self.index, t, side='right')) - 1)
+        lo = block * self.stride
+        times = self.records['time'][lo:lo + self.stride]
+        return max(0, lo + int(np.searchsorted(times, t, side='right')) - 1)
+
+    def time_of(self, frame):
+        if not self.count:
+            raise ValueError('{} has no records'.format(self.path))
+        return self.records['time'][frame] - self.t0
+
+    def angles(self, frame):
+        if not self.count:
+            raise ValueError('{} has no records'.format(self.path))
+        self._release_behind(frame)
+        return hand_kinematics.split_pose(self.records['pose'][frame])
+
+    def _release_behind(self, frame):
+        offset = hand_recording.HEADER.size + frame * self.dtype.itemsize
+        if offset < self.released:
+            # seeked backwards: drop everything and let pages fault in from here
+            self._drop(0, self.file_size)
+            self.released = 0
+            return
+        end = (offset - self.keep_bytes) // mmap.PAGESIZE * mmap.PAGESIZE
+        if end - self.released >= self.keep_bytes:
+            self._drop(self.released, end)
+            self.released = end
+
+    def _drop(self, start, stop):
+        start = start // mmap.PAGESIZE * mmap.PAGESIZE
+        if stop > start and hasattr(mmap, 'MADV_DONTNEED'):
+            self.map.madvise(mmap.MADV_DONTNEED, start, stop - start)
+
+    def close(self):
+        self.records = None
+        self.map.close()
+
+
+def convert(source, target, rate=120.0, delimiter=None):
+    # (N, 21) poses from .npy/.csv/text, sampled at `rate` Hz, to a recording file
+    if source.endswith('.npy'):
+        poses = np.load(source, mmap_mode='r')
+    else:
+        poses = np.loadtxt(source, delimiter=',' if source.endswith('.csv') else delimiter, ndmin=2)
+    if poses.shape[1] != hand_kinematics.DOF:
+        raise ValueError('expected {} angles per pose, got {}'.format(hand_kinematics.DOF, poses.shape[1]))
+    hand_recording.write_log(target, np.arange(len(poses)) / rate, poses)
+    return len(poses)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Prepare long pose files for streaming playback.')
+    sub = parser.add_subparsers(dest='command', required=True)
+    conv = sub.add_parser('convert', help='turn an (N, 21) pose array into a recording file')
+    conv.add_argument('source', help='.npy, .csv or whitespace separated text')
+    conv.add_argument('target')
+    conv.add_argument('--rate', type=float, default=120.0, help='sample rate of the source in Hz')
+    args = parser.parse_args(argv)
+
+    count = convert(args.source, args.target, args.rate)
+    print('{} poses ({:.1f} s at {:g} Hz) written to {}'.format(count, count / args.rate, args.rate, args.target))
+
+
+if __name__ == '__main__':
+    main()
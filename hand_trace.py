@@ -0,0 +1,188 @@
+# ================================================================================
+#   Event-to-frame tracing in Chrome trace-event format
+#
+#   Opt-in (--trace PATH). Records spans for every phase between an input
+#   event and the frame that shows it:
+#
+#     dispatch      interactor -> style, around the whole event
+#     handler       the style's keyPressEvent / leftButtonPressEvent / ...
+#     joint update  Joint.update(), the transform rebuild of a rotated joint
+#     frame         FrameScheduler.render_now()
+#     window        vtkRenderWindow StartEvent -> EndEvent
+#     renderer      vtkRenderer StartEvent -> EndEvent
+#     pipeline      mapper and source StartEvent -> EndEvent (pipeline updates)
+#
+#   and draws a flow arrow from the event that first dirtied a frame to that
+#   frame, plus an "input to frame" row with the full latency of each frame.
+#   Events are streamed to the file by a background thread in the JSON array
+#   format, so long sessions do not grow in memory; open the file in
+#   chrome://tracing or https://ui.perfetto.dev.
+# ================================================================================
+
+import collections
+import json
+import os
+import threading
+import time
+
+# style events traced as dispatch + handler
+TRACED_EVENTS = ('KeyPressEvent', 'LeftButtonPressEvent', 'MouseMoveEvent')
+
+# trace rows (tids)
+MAIN_THREAD = 1
+LATENCY_ROW = 2
+
+
+class Tracer:
+
+    def __init__(self, path, flush_interval=0.5):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.pid = os.getpid()
+        self.t0 = time.perf_counter()
+        self.open_spans = {}        # key -> (name, category, start)
+        self.flow = 0               # id of the frame currently being dirtied, 0 when clean
+        self.flows = 0
+        self.events = 0
+        self.pending = collections.deque()
+
+        self.file = open(path, 'w')
+        self.file.write('[\n')
+        self.metadata(MAIN_THREAD, 'main thread')
+        self.metadata(LATENCY_ROW, 'input to frame')
+
+        self.stopping = threading.Event()
+        self.writer = threading.Thread(target=self._run, name='trace-writer', daemon=True)
+        self.writer.start()
+
+    def now(self):
+        # microseconds since the tracer started, the unit of trace timestamps
+        return (time.perf_counter() - self.t0) * 1e6
+
+    def emit(self, event):
+        event.setdefault('pid', self.pid)
+        event.setdefault('tid', MAIN_THREAD)
+        self.pending.append(event)
+        self.events += 1
+
+    def metadata(self, tid, name):
+        self.emit({'name': 'thread_name', 'ph': 'M', 'tid': tid, 'args': {'name': name}})
+
+    def complete(self, name, category, start, end=None, tid=MAIN_THREAD, args=None):
+        end = self.now() if end is None else end
+        event = {'name': name, 'cat': category, 'ph': 'X', 'ts': start, 'dur': end - start, 'tid': tid}
+        if args:
+            event['args'] = args
+        self.emit(event)
+
+    def begin(self, key, name, category):
+        self.open_spans[key] = (name, category, self.now())
+
+    def end(self, key):
+        span = self.open_spans.pop(key, None)
+        if span is not None:
+            self.complete(*span)
+
+    # ---- hooks ----
+
+    def attach(self, interactor, style, renwin, renderer, hand=None, scheduler=None):
+        for event in TRACED_EVENTS:
+            # interactor observers wrap the dispatch, style observers the handler itself
+            interactor.AddObserver(event, self._spanStart('dispatch', 'dispatch ' + event, 'input'), 100.0)
+            interactor.AddObserver(event, self._spanEnd('dispatch'), -100.0)
+            style.AddObserver(event, self._spanStart('handler', 'handler ' + event, 'input'), 100.0)
+            style.AddObserver(event, self._spanEnd('handler'), -100.0)
+
+        renwin.AddObserver('StartEvent', self._spanStart('window', 'RenderWindow.Render', 'render'))
+        renwin.AddObserver('EndEvent', self._spanEnd('window'))
+        renderer.AddObserver('StartEvent', self._spanStart('renderer', 'Renderer.Render', 'render'))
+        renderer.AddObserver('EndEvent', self._spanEnd('renderer'))
+
+        if hand is not None:
+            for name, joint in hand.joints.items():
+                joint.update = self._traced(joint.update, 'joint update ' + name, 'transform')
+            self.watch_pipeline(hand.actors)
+        if scheduler is not None:
+            scheduler.request_render = self._request(scheduler, scheduler.request_render)
+            scheduler.render_now = self._frame(scheduler, scheduler.render_now)
+
+    def watch_pipeline(self, actors):
+        # every distinct mapper and its source; shared ones are hooked once
+        seen = set()
+        for actor in actors:
+            mapper = actor.GetMapper()
+            for algorithm in (mapper, mapper.GetInputAlgorithm()):
+                if algorithm is None:
+                    continue
+                address = algorithm.GetAddressAsString(algorithm.GetClassName())
+                if address in seen:
+                    continue
+                seen.add(address)
+                key = ('pipeline', address)
+                name = '{} {}'.format(algorithm.GetClassName(), address.replace('Addr=', ''))
+                algorithm.AddObserver('StartEvent', self._spanStart(key, name, 'pipeline'))
+                algorithm.AddObserver('EndEvent', self._spanEnd(key))
+
+    def _spanStart(self, key, name, category):
+        return lambda obj, event: self.begin(key, name, category)
+
+    def _spanEnd(self, key):
+        return lambda obj, event: self.end(key)
+
+    def _traced(self, function, name, category):
+        def traced(*args, **kwargs):
+            start = self.now()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.complete(name, category, start)
+        return traced
+
+    def _request(self, scheduler, request_render):
+        # the request that dirties a clean scheduler starts the flow into the next frame
+        def traced():
+            if not scheduler.dirty:
+                self.flows += 1
+                self.flow = self.flows
+                self.emit({'name': 'input to frame', 'cat': 'latency', 'ph': 's', 'id': self.flow,
+                           'ts': self.now()})
+            request_render()
+        return traced
+
+    def _frame(self, scheduler, render_now):
+        def traced():
+            since, flow = scheduler.dirty_since, self.flow
+            self.flow = 0
+            start = self.now()
+            render_now()
+            end = self.now()
+            if flow:
+                self.emit({'name': 'input to frame', 'cat': 'latency', 'ph': 'f', 'bp': 'e', 'id': flow,
+                           'ts': end - 1})
+            self.complete('frame', 'frame', start, end, args={'frame': scheduler.frames})
+            if since is not None:
+                self.complete('input to frame', 'latency', (since - self.t0) * 1e6, end, tid=LATENCY_ROW)
+        return traced
+
+    # ---- output ----
+
+    def _run(self):
+        while not self.stopping.wait(self.flush_interval):
+            self._flush()
+        self._flush()
+
+    def _flush(self):
+        lines = []
+        while self.pending:
+            lines.append(json.dumps(self.pending.popleft()) + ',\n')
+        if lines:
+            self.file.write(''.join(lines))
+            self.file.flush()
+
+    def close(self):
+        # the trailing ']' is optional in the array format, but makes the file plain JSON
+        self.stopping.set()
+        self.writer.join()
+        self.file.write(json.dumps({'name': 'trace end', 'ph': 'i', 's': 'g', 'ts': self.now(),
+                                    'pid': self.pid, 'tid': MAIN_THREAD}) + '\n]\n')
+        self.file.close()
@@ -0,0 +1,70 @@
+# ================================================================================
+#   hand_kinematics against the VTK scene
+#
+#   A Hand is posed with random poses; the matrices
+#   of its chained vtkTransforms and the centres of its joint and tip spheres
+#   must match joint_transforms() and evaluate_poses().
+#
+#   python -m pytest -q test_kinematics.py
+# ================================================================================
+
+import numpy as np
+import pytest
+from vtkmodules.vtkRenderingCore import vtkRenderer
+
+import hand_kinematics
+from hand_robot_final import Hand
+from hand_skeleton import JOINT_NAMES, NODE_NAMES, Skeleton
+
+TOLERANCE = 1e-9
+
+
+def _random_poses(count=20, seed=0):
+    # flexion up to 90 degrees, spread within 20 degrees
+    rng = np.random.default_rng(seed)
+    poses = rng.uniform(-90.0, 0.0, (count, hand_kinematics.DOF))
+    poses[:, 2::4] = rng.uniform(-20.0, 20.0, (count, 5))
+    return poses
+
+
+def _vtk_matrix(transform):
+    matrix = transform.GetMatrix()
+    return np.array([[matrix.GetElement(i, j) for j in range(4)] for i in range(4)])
+
+
+@pytest.fixture(params=['default', 'slender'])
+def hand(request):
+    return Hand(vtkRenderer(), Skeleton.load(request.param))
+
+
+def test_joint_transforms_match_vtk(hand):
+    for pose in _random_poses():
+        hand.set_pose(pose)
+        expected = hand_kinematics.joint_transforms(*hand_kinematics.split_pose(pose), hand.skeleton)
+        actual = np.array([_vtk_matrix(hand.joints[name].transform) for name in JOINT_NAMES])
+        np.testing.assert_allclose(actual, expected, rtol=0, atol=TOLERANCE)
+
+
+def test_evaluate_poses_match_actor_centres(hand):
+    poses = _random_poses()
+    positions, _ = hand_kinematics.evaluate_poses(poses, skeleton=hand.skeleton)
+    spheres = {actor.GetObjectName(): actor for actor in hand.actors if actor.GetObjectName() in NODE_NAMES}
+    assert sorted(spheres) == sorted(NODE_NAMES)
+
+    for pose, expected in zip(poses, positions):
+        hand.set_pose(pose)
+        actual = np.array([spheres[name].GetCenter() for name in NODE_NAMES])
+        np.testing.assert_allclose(actual, expected, rtol=0, atol=TOLERANCE)
+
+
+def test_rest_positions_match_actor_centres(hand):
+    hand.set_pose(np.zeros(hand_kinematics.DOF))
+    spheres = {actor.GetObjectName(): actor for actor in hand.actors if actor.GetObjectName() in NODE_NAMES}
+    actual = np.array([spheres[name].GetCenter() for name in NODE_NAMES])
+    np.testing.assert_allclose(hand_kinematics.rest_positions(hand.skeleton), actual, rtol=0, atol=TOLERANCE)
+
+
+def test_pose_round_trip(hand):
+    for pose in _random_poses(seed=1):
+        hand.set_pose(pose)
+        np.testing.assert_allclose(hand.get_pose_vector(), pose, rtol=0, atol=1e-12)
@@ -0,0 +1,101 @@
+# ================================================================================
+#   AnalyticPicker against rendered picking
+#
+#   A posed Hand is drawn offscreen with every actor in its own flat color, so
+#   the image says which actor covers each pixel, i.e. what vtkPropPicker
+#   would return there. AnalyticPicker must name the same part on a grid of
+#   pixels, up to the tessellation of the meshes along part outlines.
+#
+#   python -m pytest -q test_picking.py
+# ================================================================================
+
+import numpy as np
+import pytest
+from vtkmodules.util.numpy_support import vtk_to_numpy
+from vtkmodules.vtkRenderingCore import (vtkPropPicker, vtkRenderer, vtkRenderWindow,
+                                         vtkWindowToImageFilter)
+
+import hand_kinematics
+from hand_picking import AnalyticPicker
+from hand_robot_final import Hand
+from hand_skeleton import Skeleton
+
+SIZE = (320, 240)
+STEP = 3
+# pixels whose picked part is not under the pixel or one of its neighbours
+OUTLINE_TOLERANCE = 0.01
+
+
+def _label(actor):
+    # the palm and carpal bars are unnamed and share faces; any of them is the palm
+    return 'none' if actor is None else actor.GetObjectName() or 'palm'
+
+
+@pytest.fixture(params=[('default', 0), ('default', 1), ('slender', 2)])
+def scene(request):
+    name, seed = request.param
+    renderer = vtkRenderer()
+    window = vtkRenderWindow()
+    window.SetOffScreenRendering(1)
+    window.SetMultiSamples(0)
+    window.SetSize(*SIZE)
+    window.AddRenderer(renderer)
+
+    hand = Hand(renderer, Skeleton.load(name))
+    lower, upper = hand_kinematics.dof_limits(hand.skeleton)
+    hand.set_pose(np.random.default_rng(seed).uniform(lower, upper))
+    renderer.ResetCamera()
+    renderer.GetActiveCamera().Azimuth(60 * seed)
+    renderer.GetActiveCamera().Elevation(20)
+    renderer.ResetCameraClippingRange()
+    window.Render()
+    yield window, renderer, hand
+    window.Finalize()
+
+
+def _id_image(window, hand):
+    # labels of the actor drawn at every pixel, rows bottom to top like display y
+    for i, actor in enumerate(hand.actors):
+        actor.GetProperty().LightingOff()
+        actor.GetProperty().SetColor((i + 1) / 255.0, 0.0, 0.0)
+    window.Render()
+    grab = vtkWindowToImageFilter()
+    grab.SetInput(window)
+    grab.SetInputBufferTypeToRGB()
+    grab.ReadFrontBufferOff()
+    grab.Update()
+    red = vtk_to_numpy(grab.GetOutput().GetPointData().GetScalars())[:, 0].astype(int)
+    labels = np.array(['none'] + [_label(actor) for actor in hand.actors])
+    return labels[red.reshape(SIZE[1], SIZE[0])]
+
+
+def test_picks_match_rendered_parts(scene):
+    window, renderer, hand = scene
+    picker = AnalyticPicker(renderer, hand.joints, hand.joint_matrices)
+    image = _id_image(window, hand)
+
+    parts = misses = 0
+    for y in range(0, SIZE[1], STEP):
+        for x in range(0, SIZE[0], STEP):
+            picked = _label(picker.pick(x, y))
+            parts += picked != 'none' or image[y, x] != 'none'
+            if picked not in image[max(y - 1, 0):y + 2, max(x - 1, 0):x + 2]:
+                misses += 1
+    assert parts > 500
+    assert misses <= OUTLINE_TOLERANCE * parts
+
+
+def test_picks_match_prop_picker(scene):
+    # vtkPropPicker itself on pixels well inside one part or the background
+    window, renderer, hand = scene
+    picker = AnalyticPicker(renderer, hand.joints, hand.joint_matrices)
+    image = _id_image(window, hand)
+    prop_picker = vtkPropPicker()
+
+    inside = [(x, y) for y in range(2, SIZE[1] - 2, STEP) for x in range(2, SIZE[0] - 2, STEP)
+              if image[y, x] != 'none' and np.all(image[y - 2:y + 3, x - 2:x + 3] == image[y, x])]
+    assert len(inside) > 100
+    points = inside[::len(inside) // 30] + [(0, 0), (SIZE[0] - 1, SIZE[1] - 1)]
+    for x, y in points:
+        prop_picker.Pick(x, y, 0, renderer)
+        assert picker.pick(x, y) is prop_picker.GetActor(), (x, y)